@@ -0,0 +1,173 @@
+import re
+from datetime import datetime, timedelta
+
+import dateutil.parser
+import dateutil.tz
+
+from togglsync.toggl import TogglEntry
+
+
+class AggregatedTogglEntry(TogglEntry):
+    """
+    Sum of toggl entries of single issue in single bucket, synchronized as one destination entry
+
+        - id: bucket key (eg. "2020-01-31"), destination entries of the bucket are found by it
+        - ids: ids of covered toggl entries
+        - start: start of the earliest entry
+    """
+
+    def __init__(self, key, togglEntries, max_description=None):
+        togglEntries = sorted(togglEntries, key=lambda e: (e.start, e.id))
+        first = togglEntries[0]
+
+        descriptions = []
+        for e in togglEntries:
+            if e.description and e.description not in descriptions:
+                descriptions.append(e.description)
+
+        description = "; ".join(descriptions)
+        if max_description is not None and len(description) > max_description:
+            description = description[: max(0, max_description - 3)] + "..."
+
+        super().__init__(
+            None,
+            sum([e.duration for e in togglEntries]),
+            first.start,
+            key,
+            description,
+            first.config_entry,
+        )
+
+        self.taskId = first.taskId
+        self.ids = set([e.id for e in togglEntries])
+
+    @property
+    def marker(self):
+        return Aggregation.marker(self.id, self.ids)
+
+
+class Aggregation:
+    """
+    Aggregation mode: toggl entries are summed per issue and bucket ("day" or "week" of
+    entry start, local time) into one destination entry. Destination entry is marked with
+    bucket key and ids of covered toggl entries, eg. "[toggl@2020-01-31#1ddjrwn.2s.9b]"
+    (sorted ids, base 36, first one followed by differences).
+    """
+
+    marker_pattern = r"\[toggl@([0-9A-Za-z\-]+)#([0-9a-z\.]+)\]"
+
+    # destination comment length limit (redmine allows 255 chars in older versions)
+    max_comment = 255
+
+    # longest marker, so that it fits into comment with some description; buckets covering
+    # more toggl entries are synchronized as single entries
+    max_marker = 200
+
+    buckets = ("day", "week")
+
+    def __init__(self, bucket="day"):
+        if bucket not in Aggregation.buckets:
+            raise Exception(
+                "Invalid aggregation bucket: {} (expected one of: {})".format(
+                    bucket, ", ".join(Aggregation.buckets)
+                )
+            )
+
+        self.bucket = bucket
+
+    def key(self, togglEntry):
+        day = dateutil.parser.parse(togglEntry.start).astimezone(dateutil.tz.tzlocal()).date()
+
+        if self.bucket == "week":
+            day = day - timedelta(day.weekday())
+
+        return day.isoformat()
+
+    def period(self, key):
+        """(start, end) of bucket as local time iso strings"""
+        start = datetime.combine(dateutil.parser.parse(key).date(), datetime.min.time()).replace(
+            tzinfo=dateutil.tz.tzlocal()
+        )
+        end = start + timedelta(7 if self.bucket == "week" else 1) - timedelta(seconds=1)
+
+        return start.isoformat(), end.isoformat()
+
+    def extend_days(self, days, today=None):
+        """Number of days to download, so that the earliest bucket is complete"""
+        if self.bucket != "week":
+            return days
+
+        today = today or datetime.now(dateutil.tz.tzlocal()).date()
+        return days + (today - timedelta(days)).weekday()
+
+    def shard_days(self, shard_days):
+        """Backfill shard length, so that buckets are not split between shards"""
+        if self.bucket != "week":
+            return shard_days
+
+        return max(7, (shard_days + 6) // 7 * 7)
+
+    def aggregate(self, togglEntries):
+        """
+        Returns AggregatedTogglEntry per bucket (and issue), in order of bucket keys. Entries
+        of bucket whose marker would be longer than max_marker are returned as they are.
+        """
+        groups = {}
+
+        for e in togglEntries:
+            groups.setdefault((self.key(e), e.taskId), []).append(e)
+
+        result = []
+
+        for key, taskId in sorted(groups, key=lambda k: (k[0], str(k[1]))):
+            entries = groups[(key, taskId)]
+            marker = Aggregation.marker(key, [e.id for e in entries])
+            if len(marker) > Aggregation.max_marker:
+                result.extend(sorted(entries, key=lambda e: (e.start, e.id)))
+                continue
+
+            result.append(
+                AggregatedTogglEntry(key, entries, Aggregation.max_comment - len(marker) - 1)
+            )
+
+        return result
+
+    @staticmethod
+    def encode_ids(ids):
+        ids = sorted(set(ids))
+        values = ids[:1] + [b - a for a, b in zip(ids, ids[1:])]
+        return ".".join([Aggregation.base36(v) for v in values])
+
+    @staticmethod
+    def decode_ids(encoded):
+        ids = []
+        for value in encoded.split("."):
+            ids.append(int(value, 36) + (ids[-1] if ids else 0))
+        return set(ids)
+
+    @staticmethod
+    def base36(value):
+        digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+        result = ""
+
+        while True:
+            value, remainder = divmod(value, 36)
+            result = digits[remainder] + result
+            if value == 0:
+                return result
+
+    @staticmethod
+    def marker(key, ids):
+        return "[toggl@{}#{}]".format(key, Aggregation.encode_ids(ids))
+
+    @staticmethod
+    def parse(comment):
+        """Returns (bucket key, toggl ids) from aggregated destination entry comment, None if not aggregated"""
+        if comment is None:
+            return None
+
+        found = re.search(Aggregation.marker_pattern, comment)
+        if not found:
+            return None
+
+        return found.group(1), Aggregation.decode_ids(found.group(2))
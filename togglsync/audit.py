@@ -0,0 +1,168 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from termcolor import colored
+
+from togglsync.config import Colors
+from togglsync.helpers.date_time_helper import DateTimeHelper
+
+
+class AuditCell:
+    """Toggl and destination totals of single issue in single (UTC) day"""
+
+    def __init__(self, issue, day):
+        self.issue = issue
+        self.day = day
+        self.toggl = []
+        self.destination = []
+        self.toggl_amount = 0
+        self.destination_amount = 0
+
+    @property
+    def difference(self):
+        return round(self.destination_amount - self.toggl_amount, 2)
+
+    def __repr__(self):
+        return "{} {}: toggl {}, destination {}".format(
+            self.issue, self.day, self.toggl_amount, self.destination_amount
+        )
+
+
+class Auditor:
+    """
+    Compares toggl and destination totals per (issue, day) without synchronizing
+
+    Toggl entries and destination entries of current user in period are fetched in bulk
+    (concurrently) and summed per cell, in the destination unit (hours for redmine, seconds
+    for jira) as synchronizer would write them (see api helper fingerprints: issue, start,
+    amount, comment). Only mismatched cells are reported, with entry level differences.
+    Only UTC days fully covered by period are compared (redmine time entries are per day).
+    """
+
+    # absolute tolerance of amount comparison (hours are rounded to 2 digits)
+    tolerance = 0.005
+
+    def __init__(self, api_helper, toggl, aggregation=None):
+        self.api_helper = api_helper
+        self.toggl = toggl
+        self.aggregation = aggregation
+
+    def audit(self, days, entries=None):
+        """Returns mismatched cells (sorted by day and issue), prints report"""
+        if days < 0:
+            raise Exception("Invalid days: {}".format(days))
+
+        if self.aggregation:
+            days = self.aggregation.extend_days(days)
+
+        start = DateTimeHelper.get_date_in_past(days)
+        end = DateTimeHelper.get_today_midnight()
+        covered = DateTimeHelper.get_utc_days_within(start, end)
+
+        if covered is None:
+            print("No whole day in period, nothing to audit")
+            return []
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            destination_lookup = executor.submit(
+                lambda: list(self.api_helper.get_range(start, end))
+            )
+
+            togglEntries = [
+                e
+                for e in (entries if entries is not None else self.toggl.get(days))
+                if e.is_valid()
+            ]
+
+            destination_entries = destination_lookup.result()
+
+        cells = self.cells(togglEntries, destination_entries, covered)
+        mismatched = [c for c in cells if abs(c.difference) > self.tolerance]
+
+        print(
+            "Audit {} - {}: {} cells, {} mismatched".format(
+                covered[0], covered[1], len(cells), len(mismatched)
+            )
+        )
+
+        for cell in mismatched:
+            self.__print(cell)
+
+        return mismatched
+
+    def cells(self, togglEntries, destination_entries, covered):
+        """Sums toggl and destination entries per (issue, day) within covered days"""
+        cells = {}
+
+        def cell(issue, day):
+            key = (str(issue), day)
+            if key not in cells:
+                cells[key] = AuditCell(str(issue), day)
+            return cells[key]
+
+        if self.aggregation:
+            togglEntries = self.aggregation.aggregate(togglEntries)
+
+        for e in togglEntries:
+            issue, day, amount = self.api_helper.fingerprint(
+                self.api_helper.dictFromTogglEntry(e)
+            )[:3]
+            if covered[0] <= day[:10] <= covered[1]:
+                c = cell(issue, day[:10])
+                c.toggl.append(e)
+                c.toggl_amount += amount
+
+        for e in destination_entries:
+            issue, day, amount = self.api_helper.fingerprintFromEntry(e)[:3]
+            if day and covered[0] <= day[:10] <= covered[1]:
+                c = cell(issue, day[:10])
+                c.destination.append(e)
+                c.destination_amount += amount or 0
+
+        return sorted(cells.values(), key=lambda c: (c.day, c.issue))
+
+    def __amount(self, entry, destination=False):
+        if destination:
+            return self.api_helper.fingerprintFromEntry(entry)[2]
+        return self.api_helper.fingerprint(self.api_helper.dictFromTogglEntry(entry))[2]
+
+    def __print(self, cell):
+        print(
+            colored(
+                "{} {}: toggl {:g}, destination {:g} ({:+g})".format(
+                    cell.issue,
+                    cell.day,
+                    round(cell.toggl_amount, 2),
+                    round(cell.destination_amount, 2),
+                    cell.difference,
+                ),
+                Colors.ERROR.value,
+            )
+        )
+
+        destination_by_toggl_id = {}
+        for e in cell.destination:
+            destination_by_toggl_id.setdefault(e.toggl_id, []).append(e)
+
+        for e in cell.toggl:
+            found = destination_by_toggl_id.pop(e.id, [])
+
+            if not found:
+                print("\tmissing in destination: {}".format(e))
+            elif len(found) > 1:
+                print("\tduplicated in destination ({}x): {}".format(len(found), e))
+            elif abs(self.__amount(found[0], True) - self.__amount(e)) > self.tolerance:
+                print(
+                    "\tdifferent amount: {:g} vs {:g}: {}".format(
+                        self.__amount(e), self.__amount(found[0], True), e
+                    )
+                )
+
+        for toggl_id, found in destination_by_toggl_id.items():
+            for e in found:
+                print(
+                    "\tnot in toggl{}: {}".format(
+                        "" if toggl_id is not None else " (no toggl id)", e
+                    )
+                )
+
+        print()
@@ -0,0 +1,260 @@
+import base64
+import gzip
+import json
+import threading
+import time
+from argparse import ArgumentParser
+from collections import deque
+from datetime import timedelta
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import requests.adapters
+
+try:
+    # python-redmine sends requests through its own copy of requests
+    import redmine.packages.requests.adapters as redmine_adapters
+except Exception:  # pragma: no cover
+    redmine_adapters = None
+
+
+class Cassette:
+    """
+    Records HTTP exchanges of a run (toggl, redmine, jira, mattermost) to a local file and
+    replays them offline
+
+    Transport adapters of requests (and of the copy bundled with python-redmine) are
+    hooked, so all clients are covered. Cassette is a json lines file (gzipped when path
+    ends with ".gz"), one exchange per line: method, url, request body, status, headers,
+    response body, offset from start of the run and duration.
+
+    Credentials are scrubbed before saving: request headers are not stored at all, values
+    of credential query params and json keys (see scrubbed_keys) and all given `secrets`
+    (eg. api keys from config) are replaced by "***".
+
+    On replay requests are matched by method and scrubbed url (then by method and path, as
+    query params like dates change between runs), in recorded order. Recorded duration of
+    every exchange is slept, scaled by `timing` (0 answers immediately).
+    """
+
+    scrubbed_keys = ("key", "api_key", "apikey", "token", "api_token", "access_token", "password")
+    scrubbed = "***"
+
+    # response headers worth keeping (content type and paging)
+    kept_headers = ("content-type", "link", "x-total-count", "retry-after")
+
+    def __init__(self, path, secrets=None, timing=1.0):
+        self.path = path
+        self.secrets = set(s for s in (secrets or []) if s)
+        self.timing = timing
+        self.interactions = []
+
+        self.__lock = threading.Lock()
+        self.__started = None
+        self.__patched = []
+        self.__queues = None
+
+    @classmethod
+    def load(cls, path, secrets=None, timing=1.0):
+        cassette = cls(path, secrets, timing)
+
+        with Cassette.open(path, "rt") as input:
+            cassette.interactions = [json.loads(line) for line in input if line.strip()]
+
+        return cassette
+
+    @staticmethod
+    def open(path, mode):
+        if path.endswith(".gz"):
+            return gzip.open(path, mode, encoding="utf-8")
+        return open(path, mode, encoding="utf-8")
+
+    def save(self):
+        with Cassette.open(self.path, "wt") as output:
+            for interaction in self.interactions:
+                output.write(json.dumps(self.scrub_interaction(interaction)) + "\n")
+
+    def record(self):
+        """Starts recording (saved on stop)"""
+        self.__started = time.monotonic()
+        self.__patch(self.__record)
+        return self
+
+    def replay(self):
+        """Starts answering requests from cassette"""
+        self.__queues = {}
+        for interaction in self.interactions:
+            for key in Cassette.keys(interaction["method"], interaction["url"]):
+                self.__queues.setdefault(key, deque()).append(interaction)
+
+        self.__patch(self.__replay)
+        return self
+
+    def stop(self):
+        for adapter, send in self.__patched:
+            adapter.send = send
+        self.__patched = []
+
+        if self.__started is not None:
+            self.__started = None
+            self.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def __patch(self, handler):
+        adapters = [requests.adapters.HTTPAdapter]
+        if redmine_adapters and redmine_adapters.HTTPAdapter not in adapters:
+            adapters.append(redmine_adapters.HTTPAdapter)
+
+        for adapter in adapters:
+            original = adapter.send
+            self.__patched.append((adapter, original))
+
+            def send(adapter_self, request, *args, original=original, adapter=adapter, **kwargs):
+                return handler(original, adapter, adapter_self, request, *args, **kwargs)
+
+            adapter.send = send
+
+    def __record(self, original, adapter, adapter_self, request, *args, **kwargs):
+        started = time.monotonic()
+        response = original(adapter_self, request, *args, **kwargs)
+        duration = time.monotonic() - started
+
+        content = response.content
+        interaction = {
+            "method": request.method,
+            "url": request.url,
+            "body": Cassette.text(request.body),
+            "status": response.status_code,
+            "headers": dict(
+                (k, v) for k, v in response.headers.items() if k.lower() in self.kept_headers
+            ),
+            "response": Cassette.text(content),
+            "at": round(started - self.__started, 3),
+            "duration": round(duration, 3),
+        }
+
+        with self.__lock:
+            self.interactions.append(interaction)
+
+        return response
+
+    def __replay(self, original, adapter, adapter_self, request, *args, **kwargs):
+        interaction = None
+
+        with self.__lock:
+            for key in Cassette.keys(request.method, self.scrub(request.url)):
+                queue = self.__queues.get(key)
+                while queue and queue[0].get("replayed"):
+                    queue.popleft()
+                if queue:
+                    interaction = queue.popleft()
+                    interaction["replayed"] = True
+                    break
+
+        if interaction is None:
+            raise Exception(
+                "No recorded response for {} {}".format(request.method, self.scrub(request.url))
+            )
+
+        if self.timing:
+            time.sleep(interaction["duration"] * self.timing)
+
+        module = __import__(adapter.__module__, fromlist=["Response"])
+        response = module.Response()
+        response.status_code = interaction["status"]
+        response.headers = module.CaseInsensitiveDict(interaction["headers"])
+        response._content = Cassette.content(interaction["response"])
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.reason = ""
+        response.elapsed = timedelta(seconds=interaction["duration"])
+        response.connection = adapter_self
+
+        return response
+
+    @staticmethod
+    def keys(method, url):
+        """Match keys of request, from the most specific"""
+        parsed = urlparse(url)
+        return [(method, url), (method, parsed.netloc + parsed.path)]
+
+    def scrub_interaction(self, interaction):
+        interaction = dict(interaction)
+        interaction.pop("replayed", None)
+        interaction["url"] = self.scrub(interaction["url"])
+        interaction["body"] = self.scrub_body(interaction["body"])
+        interaction["response"] = self.scrub_body(interaction["response"])
+        return interaction
+
+    def scrub(self, url):
+        parsed = urlparse(url)
+        query = [
+            (k, self.scrubbed if k.lower() in self.scrubbed_keys else v)
+            for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        ]
+        url = urlunparse(parsed._replace(query=urlencode(sorted(query))))
+        return self.scrub_secrets(url)
+
+    def scrub_body(self, body):
+        if not isinstance(body, str):
+            return body
+
+        try:
+            return self.scrub_secrets(json.dumps(self.scrub_json(json.loads(body))))
+        except ValueError:
+            return self.scrub_secrets(body)
+
+    def scrub_json(self, value):
+        if isinstance(value, dict):
+            return dict(
+                (k, self.scrubbed if k.lower() in self.scrubbed_keys else self.scrub_json(v))
+                for k, v in value.items()
+            )
+        if isinstance(value, list):
+            return [self.scrub_json(v) for v in value]
+        return value
+
+    def scrub_secrets(self, text):
+        for secret in sorted(self.secrets, key=len, reverse=True):
+            text = text.replace(secret, self.scrubbed)
+        return text
+
+    @staticmethod
+    def text(body):
+        """Body as stored in cassette: text, or {"base64": ...} for binary content"""
+        if body is None or isinstance(body, str):
+            return body
+        try:
+            return body.decode("utf-8")
+        except UnicodeDecodeError:
+            return {"base64": base64.b64encode(body).decode("ascii")}
+
+    @staticmethod
+    def content(body):
+        if body is None:
+            return b""
+        if isinstance(body, dict):
+            return base64.b64decode(body["base64"])
+        return body.encode("utf-8")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Prints summary of recorded HTTP exchanges")
+
+    parser.add_argument("-f", "--file", help="Cassette", required=True)
+
+    args = parser.parse_args()
+
+    hosts = {}
+    for i in Cassette.load(args.file).interactions:
+        host = hosts.setdefault(urlparse(i["url"]).netloc, [0, 0.0])
+        host[0] += 1
+        host[1] += i["duration"]
+
+    for host, (count, duration) in sorted(hosts.items()):
+        print("{}: {} calls, {:.2f}s".format(host, count, duration))
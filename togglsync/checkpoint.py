@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+
+
+class Checkpoint:
+    """
+    Progress of a long (backfill) synchronization of a single config entry
+
+    Period is split into date shards processed oldest first, issues of a shard are processed
+    in sorted order. Checkpoint is saved after each completed issue and shard, so interrupted
+    backfill can be resumed without re-reading finished work.
+
+    All config entries share one json file, keyed by config entry label. Without file
+    (`path` None) progress is kept only in memory.
+    """
+
+    def __init__(self, path, label):
+        self.path = path
+        self.label = label
+        self.lock = threading.Lock()
+
+        self.days = None
+        self.shards = []
+        self.shards_done = set()
+        self.issues_done = {}
+
+    @classmethod
+    def load(cls, path, label):
+        """Returns saved checkpoint or None if there is none for given label"""
+        state = Checkpoint.__read(path).get(label)
+
+        if state is None:
+            return None
+
+        checkpoint = cls(path, label)
+        checkpoint.days = state["days"]
+        checkpoint.shards = [tuple(s) for s in state["shards"]]
+        checkpoint.shards_done = set(state["shards_done"])
+        checkpoint.issues_done = {k: set(v) for k, v in state["issues_done"].items()}
+
+        return checkpoint
+
+    def begin(self, days, shards):
+        self.days = days
+        self.shards = list(shards)
+        self.shards_done = set()
+        self.issues_done = {}
+        self.save()
+
+    @property
+    def is_started(self):
+        return len(self.shards) > 0
+
+    @property
+    def is_finished(self):
+        return self.is_started and all(s[0] in self.shards_done for s in self.shards)
+
+    def is_shard_done(self, shard_start):
+        return shard_start in self.shards_done
+
+    def is_issue_done(self, shard_start, issueId):
+        return str(issueId) in self.issues_done.get(shard_start, set())
+
+    def mark_issue_done(self, shard_start, issueId):
+        with self.lock:
+            self.issues_done.setdefault(shard_start, set()).add(str(issueId))
+        self.save()
+
+    def mark_shard_done(self, shard_start):
+        with self.lock:
+            self.shards_done.add(shard_start)
+            # issues of finished shard are not needed anymore
+            self.issues_done.pop(shard_start, None)
+        self.save()
+
+    def save(self):
+        with self.lock:
+            state = Checkpoint.__read(self.path)
+            state[self.label] = {
+                "days": self.days,
+                "shards": self.shards,
+                "shards_done": sorted(self.shards_done),
+                "issues_done": {k: sorted(v) for k, v in self.issues_done.items()},
+            }
+            Checkpoint.__write(self.path, state)
+
+    def remove(self):
+        with self.lock:
+            state = Checkpoint.__read(self.path)
+            state.pop(self.label, None)
+
+            if state:
+                Checkpoint.__write(self.path, state)
+            elif self.path is not None and os.path.exists(self.path):
+                os.remove(self.path)
+
+    @staticmethod
+    def __read(path):
+        if path is None or not os.path.exists(path):
+            return {}
+
+        with open(path) as input:
+            return json.load(input)
+
+    @staticmethod
+    def __write(path, state):
+        if path is None:
+            return
+
+        tmp = path + ".tmp"
+
+        with open(tmp, "w") as output:
+            json.dump(state, output, indent=2, sort_keys=True)
+
+        os.replace(tmp, path)
@@ -0,0 +1,165 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from togglsync.helpers.error_helper import ErrorHelper
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling destination when its circuit is open"""
+
+    pass
+
+
+class AdaptiveLimiter:
+    """
+    Limits number of concurrent units of work (AIMD)
+
+        - limit grows by one after `limit` healthy calls (latency under threshold)
+        - limit is halved on overload
+    """
+
+    def __init__(self, initial=1, maximum=4, latency_threshold=2.0):
+        self.limit = max(1, min(initial, maximum))
+        self.maximum = maximum
+        self.latency_threshold = latency_threshold
+        self.in_flight = 0
+
+        self.__healthy = 0
+        self.__condition = threading.Condition()
+
+    def acquire(self):
+        with self.__condition:
+            while self.in_flight >= self.limit:
+                self.__condition.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self.__condition:
+            self.in_flight -= 1
+            self.__condition.notify_all()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def on_success(self, latency):
+        with self.__condition:
+            if latency > self.latency_threshold:
+                self.__shrink()
+                return
+
+            self.__healthy += 1
+            if self.__healthy >= self.limit and self.limit < self.maximum:
+                self.limit += 1
+                self.__healthy = 0
+                self.__condition.notify_all()
+
+    def on_overload(self):
+        with self.__condition:
+            self.__shrink()
+
+    def __shrink(self):
+        self.limit = max(1, self.limit // 2)
+        self.__healthy = 0
+
+
+class CircuitBreaker:
+    """
+    Opens when share of overload errors in last `window` calls reaches `error_rate`
+    (after at least `min_calls` calls). Once open it stays open for the rest of the run.
+    """
+
+    def __init__(self, error_rate=0.5, window=20, min_calls=5):
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.is_open = False
+
+        self.__results = deque(maxlen=window)
+        self.__lock = threading.Lock()
+
+    def record(self, ok):
+        with self.__lock:
+            self.__results.append(ok)
+
+            failures = len([r for r in self.__results if not r])
+            if (
+                len(self.__results) >= self.min_calls
+                and failures / len(self.__results) >= self.error_rate
+            ):
+                self.is_open = True
+
+
+class DestinationController:
+    """
+    Adaptive concurrency and circuit breaker for a single destination host
+
+    Settings (`concurrency` section in config.yml):
+        - max: max number of issues synchronized in parallel (default 4)
+        - latency: max healthy latency of single call in seconds (default 2)
+        - error_rate: share of failed calls opening the circuit (default 0.5)
+        - window: number of recent calls taken into account (default 20)
+    """
+
+    controllers = {}
+    controllers_lock = threading.Lock()
+
+    def __init__(self, host=None, settings=None):
+        settings = settings or {}
+
+        self.host = host
+        self.limiter = AdaptiveLimiter(
+            maximum=settings.get("max", 4),
+            latency_threshold=settings.get("latency", 2.0),
+        )
+        self.breaker = CircuitBreaker(
+            error_rate=settings.get("error_rate", 0.5),
+            window=settings.get("window", 20),
+        )
+
+    @classmethod
+    def forUrl(cls, url, settings=None):
+        """Returns controller shared by all destinations on the same host"""
+        host = urlparse(url).netloc if url else None
+
+        with cls.controllers_lock:
+            if host not in cls.controllers:
+                cls.controllers[host] = cls(host, settings)
+            return cls.controllers[host]
+
+    @property
+    def maximum(self):
+        return self.limiter.maximum
+
+    def slot(self):
+        return self.limiter.slot()
+
+    def call(self, fn, *args, **kwargs):
+        if self.breaker.is_open:
+            raise CircuitOpenError(
+                "Destination {} is failing, skipped (left for next run)".format(
+                    self.host or ""
+                )
+            )
+
+        started = time.monotonic()
+
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as exc:
+            overload = ErrorHelper.is_overload(exc)
+            if overload:
+                self.limiter.on_overload()
+            self.breaker.record(not overload)
+            raise
+
+        self.limiter.on_success(time.monotonic() - started)
+        self.breaker.record(True)
+
+        return result
@@ -1,5 +1,6 @@
 import os
 from enum import Enum
+from urllib.parse import urlparse
 
 from yaml import safe_load
 
@@ -11,6 +12,62 @@ class Colors(Enum):
     ERROR = "red"
 
 
+class Routes:
+    """
+    Routing tables of config entry ("routes" section), looked up before task patterns:
+
+        - tags: toggl tag -> issue
+        - projects: toggl project id (or project name in exports) -> issue
+        - project_defaults: toggl project id (or name) -> issue used when neither routing
+          table nor task patterns find issue for entry of the project
+    """
+
+    def __init__(self, tags=None, projects=None, project_defaults=None):
+        self.tags = Routes.table(tags)
+        self.projects = Routes.table(projects)
+        self.project_defaults = Routes.table(project_defaults)
+
+    @staticmethod
+    def table(d):
+        # yaml gives int keys for project ids, toggl entries are matched by str
+        return dict((str(k), str(v)) for k, v in (d or {}).items())
+
+    @classmethod
+    def fromDict(cls, d):
+        unknown = set(d) - set(["tags", "projects", "project_defaults"])
+        if unknown:
+            raise Exception("Unknown routing table: {}".format(", ".join(sorted(unknown))))
+
+        return cls(**d)
+
+    def find(self, raw_entry):
+        """Issue of toggl entry (raw api dict) by tag or project, None if not routed"""
+        if self.tags:
+            for tag in raw_entry.get("tags") or []:
+                if tag in self.tags:
+                    return self.tags[tag]
+
+        if self.projects:
+            return Routes.project(raw_entry, self.projects)
+
+        return None
+
+    def default(self, raw_entry):
+        """Default issue of project of toggl entry, None if not defined"""
+        if self.project_defaults:
+            return Routes.project(raw_entry, self.project_defaults)
+
+        return None
+
+    @staticmethod
+    def project(raw_entry, table):
+        for key in ("pid", "project"):
+            if raw_entry.get(key) is not None and str(raw_entry[key]) in table:
+                return table[str(raw_entry[key])]
+
+        return None
+
+
 class Entry:
     def __init__(
         self,
@@ -20,27 +77,85 @@ class Entry:
         jira_username=None,
         jira_url=None,
         task_patterns=None,
+        destinations=None,
+        aggregate=None,
+        routes=None,
+        toggl_user_id=None,
     ):
         self.label = label
         self.redmine_api_key = redmine_api_key
         self.toggl = toggl_api_key
         self.jira_username = jira_username
         self.jira_url = jira_url
-        self.task_patterns = task_patterns
+        self.task_patterns = task_patterns if task_patterns is not None else []
+        # list of Entry (with own task patterns) when toggl entries go to several destinations
+        self.destinations = destinations
+        # "day" or "week" when toggl entries are summed into one destination entry per issue
+        self.aggregate = aggregate
+        # Routes (tag and project tables) resolved before task patterns
+        self.routes = Routes.fromDict(routes) if isinstance(routes, dict) else routes
+        # toggl user whose entries are taken from workspace report in team mode
+        self.toggl_user_id = toggl_user_id
+
+    @classmethod
+    def fromDict(cls, d):
+        """
+        Creates entry from config dict, optional "destinations" list contains destination
+        specific keys (label, task_patterns, routes, redmine_api_key or jira_url/jira_username)
+        """
+        d = dict(d)
+        destinations = d.pop("destinations", None)
+
+        entry = cls(**d)
+
+        if destinations is None:
+            return entry
+
+        if not destinations:
+            raise Exception('Empty "destinations" in entry {}'.format(entry.label))
+
+        entry.destinations = [
+            cls(
+                **dict(
+                    {"aggregate": entry.aggregate, "routes": entry.routes},
+                    **dict(
+                        destination,
+                        label="{} / {}".format(entry.label, destination.get("label", i + 1)),
+                        toggl_api_key=entry.toggl,
+                        toggl_user_id=entry.toggl_user_id,
+                    )
+                )
+            )
+            for i, destination in enumerate(destinations)
+        ]
+
+        if not entry.task_patterns:
+            entry.task_patterns = [
+                p for destination in entry.destinations for p in destination.task_patterns or []
+            ]
+
+        return entry
 
     def __str__(self):
-        if self.redmine_api_key:
+        if self.destinations:
+            return "{}: {}".format(
+                self.toggl, ", ".join([str(d) for d in self.destinations])
+            )
+        elif self.redmine_api_key:
             return "{}: {}".format(self.toggl, self.redmine_api_key)
         else:
             return "{}: {}@{}".format(self.toggl, self.jira_username, self.jira_url)
 
 
 class Config:
-    def __init__(self, toggl, redmine, entries, mattermost):
+    def __init__(self, toggl, redmine, entries, mattermost, concurrency=None, team=None):
         self.toggl = toggl
         self.redmine = redmine
         self.entries = entries
         self.mattermost = mattermost
+        self.concurrency = concurrency
+        # workspace_id and admin toggl_api_key of team mode (one workspace report for all entries)
+        self.team = team
 
     @classmethod
     def fromFile(cls, path="config.yml"):
@@ -85,9 +200,34 @@ class Config:
         entries = []
 
         for entry in deserialized["entries"]:
-            entries.append(Entry(**entry))
+            entries.append(Entry.fromDict(entry))
+
+        concurrency = deserialized.get("concurrency", None)
+
+        team = deserialized.get("team", None)
+
+        if team is not None:
+            for key in ("workspace_id", "toggl_api_key"):
+                if key not in team:
+                    raise Exception('Expected "{}" param in "team" section'.format(key))
+
+        return cls(toggl, redmine, entries, mattermost, concurrency, team)
+
+    def secrets(self):
+        """Credentials found in config: api keys and id of mattermost hook"""
+        secrets = []
+
+        for entry in self.entries:
+            for e in [entry] + (entry.destinations or []):
+                secrets += [e.toggl, e.redmine_api_key]
+
+        if self.team:
+            secrets.append(self.team["toggl_api_key"])
+
+        if self.mattermost:
+            secrets.append(urlparse(self.mattermost["url"]).path.rstrip("/").split("/")[-1])
 
-        return cls(toggl, redmine, entries, mattermost)
+        return [s for s in set(secrets) if s]
 
     def __str__(self):
         return """config:
@@ -0,0 +1,83 @@
+from abc import ABC, abstractmethod
+
+
+class Destination(ABC):
+    """
+    Destination backend of synchronizer (time entries of issues in redmine, jira, ...)
+
+    Reads return destination entries with `id`, `issue` (str), `toggl_id` and `toggl_ids`:
+        - get(issueId): all entries of issue
+        - get_range(start, end): entries of current user in period (iso strings)
+
+    Writes take payload of dictFromTogglEntry (keyword arguments, also replayed from outbox):
+        - put(issueId, ...)
+        - update(id, issueId, ...)
+        - delete(id, issueId)
+
+    Payload and comparison:
+        - dictFromTogglEntry(togglEntry): destination payload of toggl entry
+        - fingerprint(data), fingerprintFromEntry(entry): comparable (issue, day or start,
+          amount, comment) tuples, named by fingerprint_fields
+        - identity: server and user (no secrets)
+
+    Reads, writes and payload methods are abstract.
+
+    Capabilities (class attributes, synchronizer picks the cheapest strategy supported):
+        - bulk_read: get_range reads the period in few calls, not call(s) per issue
+        - filters_user, filters_date: get_range is filtered by user / date on server
+        - concurrent_writes: writes to different issues may be sent in parallel
+    """
+
+    bulk_read = False
+    filters_user = False
+    filters_date = False
+    concurrent_writes = True
+
+    fingerprint_fields = ()
+
+    @property
+    @abstractmethod
+    def identity(self):
+        pass
+
+    def reads_window(self):
+        """
+        Checks if entries of all synchronized issues are read cheaper by one read of period
+        (bulk read filtered by user and date on server) than issue by issue
+        """
+        return self.bulk_read and self.filters_user and self.filters_date
+
+    @classmethod
+    @abstractmethod
+    def dictFromTogglEntry(cls, togglEntry):
+        pass
+
+    @classmethod
+    @abstractmethod
+    def fingerprint(cls, data):
+        pass
+
+    @classmethod
+    @abstractmethod
+    def fingerprintFromEntry(cls, entry):
+        pass
+
+    @abstractmethod
+    def get(self, issueId):
+        pass
+
+    @abstractmethod
+    def get_range(self, start, end):
+        pass
+
+    @abstractmethod
+    def put(self, issueId, *args, **kwargs):
+        pass
+
+    @abstractmethod
+    def update(self, id, issueId, *args, **kwargs):
+        pass
+
+    @abstractmethod
+    def delete(self, id, issueId):
+        pass
@@ -0,0 +1,168 @@
+from datetime import datetime
+
+import dateutil.parser
+import dateutil.tz
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+class TogglEntryStore:
+    """
+    Columnar store of toggl entries (requires optional numpy)
+
+    Built once from fetched entries, keeps one array per attribute, so sums per issue,
+    day or project are vectorized group-by operations instead of passes over python lists.
+
+        - id: toggl entry id
+        - start: start time as epoch seconds (nan if unknown)
+        - duration: duration in seconds
+        - task: interned task id code (-1 if entry has no task id), see task_ids
+        - day: interned start day code ("YYYY-MM-DD", -1 if unknown), see days
+        - project: toggl project id from raw entry (-1 if unknown)
+        - config: interned config entry code, see config_entries
+    """
+
+    def __init__(self, entries):
+        self.task_ids = []
+        self.days = []
+        self.config_entries = []
+
+        task_codes = {}
+        day_codes = {}
+        config_codes = {}
+
+        ids, starts, durations, tasks, days, projects, configs = [], [], [], [], [], [], []
+
+        for e in entries:
+            ids.append(e.id if e.id is not None else -1)
+            starts.append(TogglEntryStore.epoch(e.start))
+            durations.append(e.duration)
+            tasks.append(TogglEntryStore.intern(e.taskId, task_codes, self.task_ids))
+            days.append(
+                TogglEntryStore.intern(e.start[:10] if e.start else None, day_codes, self.days)
+            )
+            projects.append(
+                (e.raw_entry.get("pid") or -1) if isinstance(e.raw_entry, dict) else -1
+            )
+            configs.append(
+                TogglEntryStore.intern(e.config_entry, config_codes, self.config_entries, key=id)
+            )
+
+        self.__day_codes = day_codes
+
+        self.id = np.array(ids, dtype=np.int64)
+        self.start = np.array(starts, dtype=np.float64)
+        self.duration = np.array(durations, dtype=np.int64)
+        self.task = np.array(tasks, dtype=np.int32)
+        self.day = np.array(days, dtype=np.int32)
+        self.project = np.array(projects, dtype=np.int64)
+        self.config = np.array(configs, dtype=np.int32)
+
+    @classmethod
+    def of(cls, entries):
+        """Returns store for given entries (or the store itself), None when numpy is not installed"""
+        if isinstance(entries, cls):
+            return entries
+        if np is None:
+            return None
+        return cls(entries or [])
+
+    @staticmethod
+    def intern(value, codes, values, key=None):
+        if value is None:
+            return -1
+
+        k = key(value) if key else value
+
+        if k not in codes:
+            codes[k] = len(values)
+            values.append(value)
+
+        return codes[k]
+
+    @staticmethod
+    def epoch(start):
+        if not start:
+            return float("nan")
+
+        try:
+            dt = datetime.fromisoformat(start)
+        except ValueError:
+            dt = dateutil.parser.parse(start)
+
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=dateutil.tz.UTC)
+
+        return dt.timestamp()
+
+    def __len__(self):
+        return len(self.id)
+
+    def has_task(self):
+        return self.task >= 0
+
+    def valid(self):
+        """Same as TogglEntry.is_valid(): with task id and positive duration"""
+        return self.has_task() & (self.duration > 0)
+
+    def on_day(self, day):
+        """Entries with positive duration started on given day ("YYYY-MM-DD")"""
+        if day not in self.__day_codes:
+            return np.zeros(len(self), dtype=bool)
+
+        return (self.day == self.__day_codes[day]) & (self.duration > 0)
+
+    def count(self, mask=None):
+        return len(self) if mask is None else int(mask.sum())
+
+    def total(self, mask=None):
+        return int(self.duration.sum() if mask is None else self.duration[mask].sum())
+
+    def sum_by_task(self, mask=None):
+        """Seconds per task id, in order of first occurrence"""
+        return self.__sum_by_code(self.task, self.task_ids, mask)
+
+    def sum_by_day(self, mask=None):
+        """Seconds per start day, in order of first occurrence"""
+        return self.__sum_by_code(self.day, self.days, mask)
+
+    def sum_by_config(self, mask=None):
+        return self.__sum_by_code(self.config, self.config_entries, mask)
+
+    def sum_by_project(self, mask=None):
+        """Seconds per toggl project id (-1 for entries wo/ project), in order of first occurrence"""
+        projects = self.project if mask is None else self.project[mask]
+        durations = self.duration if mask is None else self.duration[mask]
+
+        if len(projects) == 0:
+            return {}
+
+        labels, first, inverse = np.unique(projects, return_index=True, return_inverse=True)
+        sums = np.bincount(inverse, weights=durations, minlength=len(labels))
+
+        return {int(labels[i]): int(sums[i]) for i in np.argsort(first, kind="stable")}
+
+    def __sum_by_code(self, codes, values, mask):
+        if mask is None:
+            mask = np.ones(len(self), dtype=bool)
+
+        mask = mask & (codes >= 0)
+
+        if not mask.any():
+            return {}
+
+        selected = codes[mask]
+        sums = np.bincount(selected, weights=self.duration[mask], minlength=len(values))
+
+        first = np.full(len(values), len(self), dtype=np.int64)
+        np.minimum.at(first, selected, np.nonzero(mask)[0])
+
+        present = np.nonzero(first < len(self))[0]
+
+        return {
+            values[c]: int(sums[c])
+            for c in present[np.argsort(first[present], kind="stable")]
+        }
@@ -0,0 +1,691 @@
+import base64
+import json
+import random
+import re
+import threading
+import time
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import dateutil.parser
+import dateutil.tz
+from yaml import safe_load
+
+
+class EndpointBehaviour:
+    """
+    Class describing how a single fake endpoint misbehaves
+
+        - latency: seconds added to every response (number or [min, max] range)
+        - error_rate: fraction of requests answered with error_status
+        - rate_limit: max requests per second, above that 429 is returned
+        - page_size: max number of items returned in a single page
+    """
+
+    def __init__(
+        self, latency=0, error_rate=0, error_status=500, rate_limit=None, page_size=None
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit = rate_limit
+        self.page_size = page_size
+
+        self.__lock = threading.Lock()
+        self.__hits = []
+
+    @classmethod
+    def fromDict(cls, d):
+        return cls(**d) if d else cls()
+
+    def delay(self, rnd):
+        if isinstance(self.latency, (list, tuple)):
+            return rnd.uniform(self.latency[0], self.latency[1])
+        return self.latency or 0
+
+    def is_rate_limited(self):
+        if not self.rate_limit:
+            return False
+
+        now = time.monotonic()
+
+        with self.__lock:
+            self.__hits = [t for t in self.__hits if now - t < 1.0]
+            if len(self.__hits) >= self.rate_limit:
+                return True
+            self.__hits.append(now)
+
+        return False
+
+
+class FakeState:
+    """
+    In-memory data of all fake backends
+    """
+
+    def __init__(
+        self,
+        toggl_entries=None,
+        toggl_users=None,
+        redmine_time_entries=None,
+        redmine_users=None,
+        redmine_issues=None,
+        jira_worklogs=None,
+        jira_issues=None,
+    ):
+        self.lock = threading.RLock()
+
+        self.toggl_entries = list(toggl_entries or [])
+        # toggl api token -> toggl user id, unknown tokens see all entries
+        self.toggl_users = dict(toggl_users or {})
+
+        self.redmine_time_entries = {}
+        # redmine api key -> user name, unknown keys are named after the key
+        self.redmine_users = dict(redmine_users or {})
+        # when None, every issue exists
+        self.redmine_issues = set(redmine_issues) if redmine_issues else None
+
+        self.jira_worklogs = {}
+        self.jira_issues = set(jira_issues) if jira_issues else None
+        # jira issue key -> numeric issue id, assigned on first use
+        self.jira_issue_ids = {}
+
+        self.mattermost_messages = []
+
+        self.__next_id = 1000
+
+        for e in redmine_time_entries or []:
+            self.add_redmine_time_entry(**e)
+
+        for issue_key, worklogs in (jira_worklogs or {}).items():
+            for w in worklogs:
+                self.add_jira_worklog(issue_key, **w)
+
+    @classmethod
+    def fromDict(cls, d):
+        return cls(**(d or {}))
+
+    def next_id(self):
+        with self.lock:
+            self.__next_id += 1
+            return self.__next_id
+
+    def jira_issue_id(self, issue_key):
+        with self.lock:
+            if issue_key not in self.jira_issue_ids:
+                self.jira_issue_ids[issue_key] = str(10000 + len(self.jira_issue_ids) + 1)
+            return self.jira_issue_ids[issue_key]
+
+    def add_toggl_entry(self, id, start, duration, description="", **kwargs):
+        entry = dict(kwargs, id=id, start=start, duration=duration, description=description)
+        with self.lock:
+            self.toggl_entries.append(entry)
+        return entry
+
+    def add_redmine_time_entry(self, issue, hours, spent_on, comments, user="fake", id=None):
+        entry = {
+            "id": id or self.next_id(),
+            "project": {"id": 1, "name": "Fake"},
+            "issue": {"id": int(issue)},
+            "user": {"id": 1, "name": user},
+            "activity": {"id": 9, "name": "Development"},
+            "hours": float(hours),
+            "comments": comments,
+            "spent_on": spent_on,
+            "created_on": FakeState.now(),
+            "updated_on": FakeState.now(),
+        }
+        with self.lock:
+            self.redmine_time_entries[entry["id"]] = entry
+        return entry
+
+    def add_jira_worklog(self, issue_key, seconds, started, comment, user="fake", id=None):
+        worklog = {
+            "id": str(id or self.next_id()),
+            "issueId": self.jira_issue_id(issue_key),
+            "author": {"name": user, "displayName": user},
+            "updateAuthor": {"name": user, "displayName": user},
+            "comment": comment,
+            "created": FakeState.now(),
+            "updated": FakeState.now(),
+            "started": started,
+            "timeSpent": "{}m".format(int(seconds) // 60),
+            "timeSpentSeconds": int(seconds),
+        }
+        with self.lock:
+            self.jira_worklogs.setdefault(issue_key, []).append(worklog)
+        return worklog
+
+    def seed_toggl(self, count, issues, description="Work on {}", start=None, duration=1800):
+        """Adds count toggl entries spread over given issue ids (formatted into description)"""
+        start = start or datetime.now(dateutil.tz.UTC).replace(hour=8, minute=0, second=0)
+
+        for i in range(count):
+            issue = issues[i % len(issues)]
+            self.add_toggl_entry(
+                self.next_id(),
+                (start + timedelta(minutes=i)).isoformat(),
+                duration,
+                description.format(issue),
+            )
+
+    @staticmethod
+    def now():
+        return datetime.now(dateutil.tz.UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class FakeServer:
+    """
+    Local HTTP stand-in for Toggl, Redmine, Jira and Mattermost APIs used by synchronizer
+
+    All backends are served by a single server under path prefixes:
+        /toggl/api/v8/, /redmine/, /jira/, /mattermost/hooks/
+    Use `urls` to get values for config.yml.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, state=None, endpoints=None, seed=0):
+        self.state = state or FakeState()
+        self.endpoints = {
+            name: EndpointBehaviour.fromDict(b) if isinstance(b, dict) else b
+            for name, b in (endpoints or {}).items()
+        }
+        self.random = random.Random(seed)
+        self.calls = []
+        self.__calls_lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer((host, port), _FakeRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self.__thread = None
+
+    @classmethod
+    def fromYml(cls, yml, port=None):
+        deserialized = safe_load(yml) or {}
+
+        return cls(
+            deserialized.get("host", "127.0.0.1"),
+            port if port is not None else deserialized.get("port", 0),
+            FakeState.fromDict(deserialized.get("state")),
+            deserialized.get("endpoints"),
+            deserialized.get("seed", 0),
+        )
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    @property
+    def urls(self):
+        return {
+            "toggl": self.url + "/toggl/api/v8/",
+            "toggl_reports": self.url + "/toggl/reports/api/v2/",
+            "redmine": self.url + "/redmine/",
+            "jira": self.url + "/jira",
+            "mattermost": self.url + "/mattermost/hooks/fake",
+        }
+
+    def behaviour(self, endpoint):
+        if endpoint not in self.endpoints:
+            backend = endpoint.split(".")[0]
+            return self.endpoints.get(backend) or self.endpoints.setdefault(
+                endpoint, EndpointBehaviour()
+            )
+        return self.endpoints[endpoint]
+
+    def record(self, backend, method, path):
+        with self.__calls_lock:
+            self.calls.append((backend, method, path))
+
+    def count(self, backend=None, method=None):
+        with self.__calls_lock:
+            return len(
+                [
+                    c
+                    for c in self.calls
+                    if (backend is None or c[0] == backend)
+                    and (method is None or c[1] == method)
+                ]
+            )
+
+    def reset_calls(self):
+        with self.__calls_lock:
+            self.calls = []
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        if self.__thread:
+            self.httpd.shutdown()
+            self.__thread = None
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+class _FakeRequestHandler(BaseHTTPRequestHandler):
+    routes = [
+        ("toggl", "toggl.time_entries", "GET", r"/toggl/api/v8/time_entries$", "toggl_time_entries"),
+        ("toggl", "toggl.time_entry", "GET", r"/toggl/api/v8/time_entries/(\d+)$", "toggl_time_entry"),
+        ("toggl", "toggl.details", "GET", r"/toggl/reports/api/v2/details$", "toggl_details"),
+        ("redmine", "redmine.time_entries", "GET", r"/redmine/time_entries\.json$", "redmine_list"),
+        ("redmine", "redmine.time_entries", "POST", r"/redmine/time_entries\.json$", "redmine_create"),
+        ("redmine", "redmine.time_entry", "PUT", r"/redmine/time_entries/(\d+)\.json$", "redmine_update"),
+        ("redmine", "redmine.time_entry", "DELETE", r"/redmine/time_entries/(\d+)\.json$", "redmine_delete"),
+        ("jira", "jira.server_info", "GET", r"/jira/rest/api/2/serverInfo$", "jira_server_info"),
+        ("jira", "jira.fields", "GET", r"/jira/rest/api/2/field$", "jira_fields"),
+        ("jira", "jira.search", "GET", r"/jira/rest/api/2/search$", "jira_search"),
+        ("jira", "jira.worklogs", "GET", r"/jira/rest/api/2/issue/([^/]+)/worklog$", "jira_worklogs"),
+        ("jira", "jira.worklogs", "POST", r"/jira/rest/api/2/issue/([^/]+)/worklog$", "jira_add_worklog"),
+        ("jira", "jira.worklog", "GET", r"/jira/rest/api/2/issue/([^/]+)/worklog/([^/]+)$", "jira_worklog"),
+        ("jira", "jira.worklog", "PUT", r"/jira/rest/api/2/issue/([^/]+)/worklog/([^/]+)$", "jira_update_worklog"),
+        ("jira", "jira.worklog", "DELETE", r"/jira/rest/api/2/issue/([^/]+)/worklog/([^/]+)$", "jira_delete_worklog"),
+        ("mattermost", "mattermost.hooks", "POST", r"/mattermost/hooks/([^/]+)$", "mattermost_hook"),
+    ]
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.__dispatch("GET")
+
+    def do_POST(self):
+        self.__dispatch("POST")
+
+    def do_PUT(self):
+        self.__dispatch("PUT")
+
+    def do_DELETE(self):
+        self.__dispatch("DELETE")
+
+    @property
+    def fake(self):
+        return self.server.fake
+
+    @property
+    def state(self):
+        return self.server.fake.state
+
+    def __dispatch(self, method):
+        parsed = urlparse(self.path)
+        self.query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        self.body = json.loads(body.decode("utf-8")) if body.strip() else {}
+
+        for backend, endpoint, route_method, pattern, handler in self.routes:
+            match = re.match(pattern, parsed.path)
+            if match and route_method == method:
+                self.fake.record(backend, method, parsed.path)
+                self.behaviour = self.fake.behaviour(endpoint)
+
+                time.sleep(self.behaviour.delay(self.fake.random))
+
+                if self.behaviour.is_rate_limited():
+                    return self.respond(429, {"message": "rate limited"}, {"Retry-After": "1"})
+
+                if self.fake.random.random() < self.behaviour.error_rate:
+                    return self.respond(self.behaviour.error_status, {"message": "injected error"})
+
+                return getattr(self, handler)(*match.groups())
+
+        self.respond(404, {"message": "not found: {} {}".format(method, parsed.path)})
+
+    def respond(self, status, payload=None, headers=None):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else b""
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def basic_auth_user(self):
+        auth = self.headers.get("Authorization", "")
+        if not auth.startswith("Basic "):
+            return None
+        return base64.b64decode(auth[6:]).decode("utf-8").split(":")[0]
+
+    def page(self, items, start, requested):
+        limit = requested if requested is not None else len(items)
+        if self.behaviour.page_size:
+            limit = min(limit, self.behaviour.page_size)
+        return items[start : start + limit], limit
+
+    # Toggl
+
+    def toggl_time_entries(self):
+        token = self.basic_auth_user()
+        uid = self.state.toggl_users.get(token)
+        start = self.__parse_dt(self.query.get("start_date"))
+        end = self.__parse_dt(self.query.get("end_date"))
+
+        with self.state.lock:
+            entries = [
+                e
+                for e in self.state.toggl_entries
+                if (uid is None or e.get("uid") == uid)
+                and (start is None or self.__parse_dt(e["start"]) >= start)
+                and (end is None or self.__parse_dt(e["start"]) <= end)
+            ]
+
+        entries, _ = self.page(entries, 0, None)
+        self.respond(200, entries)
+
+    def toggl_time_entry(self, id):
+        token = self.basic_auth_user()
+        uid = self.state.toggl_users.get(token)
+
+        with self.state.lock:
+            found = [
+                e
+                for e in self.state.toggl_entries
+                if e["id"] == int(id) and (uid is None or e.get("uid") == uid)
+            ]
+
+        if not found:
+            return self.respond(404)
+
+        self.respond(200, {"data": found[0]})
+
+    def toggl_details(self):
+        """
+        Detailed report of workspace (dates of since/until inclusive, optionally of user_ids),
+        50 entries per page
+        """
+        since = self.query.get("since")
+        until = self.query.get("until")
+        user_ids = self.query.get("user_ids")
+        page = int(self.query.get("page", 1))
+
+        with self.state.lock:
+            entries = [
+                e
+                for e in self.state.toggl_entries
+                if (since is None or self.__parse_dt(e["start"]).strftime("%Y-%m-%d") >= since)
+                and (until is None or self.__parse_dt(e["start"]).strftime("%Y-%m-%d") <= until)
+                and (user_ids is None or str(e.get("uid")) in user_ids.split(","))
+            ]
+
+        per_page = self.behaviour.page_size or 50
+        rows = [
+            {
+                "id": e["id"],
+                "uid": e.get("uid"),
+                "user": "user {}".format(e.get("uid")),
+                "pid": e.get("pid"),
+                "project": e.get("project"),
+                "description": e.get("description", ""),
+                "start": e["start"],
+                "end": (self.__parse_dt(e["start"]) + timedelta(seconds=max(e["duration"], 0))).isoformat(),
+                "dur": e["duration"] * 1000,
+                "tags": e.get("tags", []),
+            }
+            for e in entries[(page - 1) * per_page : page * per_page]
+        ]
+
+        self.respond(200, {"total_count": len(entries), "per_page": per_page, "data": rows})
+
+    # Redmine
+
+    def redmine_user(self):
+        key = self.query.get("key") or self.headers.get("X-Redmine-API-Key")
+        return self.state.redmine_users.get(key, key)
+
+    def redmine_list(self):
+        user = self.redmine_user()
+        issue_id = self.query.get("issue_id")
+        user_id = self.query.get("user_id")
+        date_from = self.query.get("from")
+        date_to = self.query.get("to")
+
+        if (
+            issue_id
+            and self.state.redmine_issues is not None
+            and int(issue_id) not in self.state.redmine_issues
+        ):
+            return self.respond(404, {"errors": ["issue not found"]})
+
+        with self.state.lock:
+            entries = [
+                e
+                for e in sorted(self.state.redmine_time_entries.values(), key=lambda e: e["id"])
+                if (not issue_id or e["issue"]["id"] == int(issue_id))
+                and (user_id != "me" or e["user"]["name"] == user)
+                and (not date_from or e["spent_on"] >= date_from)
+                and (not date_to or e["spent_on"] <= date_to)
+            ]
+
+        offset = int(self.query.get("offset", 0))
+        page, limit = self.page(entries, offset, int(self.query.get("limit", 25)))
+
+        self.respond(
+            200,
+            {
+                "time_entries": page,
+                "total_count": len(entries),
+                "offset": offset,
+                "limit": limit,
+            },
+        )
+
+    def redmine_create(self):
+        data = self.body.get("time_entry", {})
+        issue = int(data.get("issue_id"))
+
+        if self.state.redmine_issues is not None and issue not in self.state.redmine_issues:
+            return self.respond(422, {"errors": ["Issue is invalid"]})
+
+        entry = self.state.add_redmine_time_entry(
+            issue, data.get("hours"), data.get("spent_on"), data.get("comments"), self.redmine_user()
+        )
+        self.respond(201, {"time_entry": entry})
+
+    def redmine_update(self, id):
+        data = self.body.get("time_entry", {})
+
+        with self.state.lock:
+            entry = self.state.redmine_time_entries.get(int(id))
+            if entry is None:
+                return self.respond(404, {"errors": ["not found"]})
+
+            if "issue_id" in data:
+                entry["issue"] = {"id": int(data["issue_id"])}
+            for field in ("hours", "spent_on", "comments"):
+                if field in data:
+                    entry[field] = float(data[field]) if field == "hours" else data[field]
+            entry["updated_on"] = FakeState.now()
+
+        # python-redmine treats 204 as an unknown error
+        self.respond(200)
+
+    def redmine_delete(self, id):
+        with self.state.lock:
+            if self.state.redmine_time_entries.pop(int(id), None) is None:
+                return self.respond(404, {"errors": ["not found"]})
+        self.respond(200)
+
+    def jira_server_info(self):
+        self.respond(
+            200,
+            {
+                "baseUrl": self.fake.urls["jira"],
+                "version": "8.6.0",
+                "versionNumbers": [8, 6, 0],
+                "deploymentType": "Server",
+            },
+        )
+
+    def jira_fields(self):
+        self.respond(200, [{"id": "summary", "name": "Summary", "clauseNames": ["summary"]}])
+
+    def jira_search(self):
+        """Only "worklogAuthor = currentUser()" part of jql is taken into account"""
+        user = self.basic_auth_user()
+
+        with self.state.lock:
+            keys = [
+                k
+                for k, worklogs in sorted(self.state.jira_worklogs.items())
+                if any(w["author"]["name"] == user for w in worklogs)
+            ]
+
+        start = int(self.query.get("startAt", 0))
+        max_results = self.query.get("maxResults")
+        page, limit = self.page(keys, start, int(max_results) if max_results else 50)
+
+        self.respond(
+            200,
+            {
+                "startAt": start,
+                "maxResults": limit,
+                "total": len(keys),
+                "issues": [
+                    {"id": self.state.jira_issue_id(k), "key": k, "fields": {}} for k in page
+                ],
+            },
+        )
+
+    def jira_issue_exists(self, issue_key):
+        return self.state.jira_issues is None or issue_key in self.state.jira_issues
+
+    def jira_worklog_json(self, issue_key, worklog):
+        return dict(
+            worklog,
+            self="{}/rest/api/2/issue/{}/worklog/{}".format(
+                self.fake.urls["jira"], issue_key, worklog["id"]
+            ),
+        )
+
+    def jira_worklogs(self, issue_key):
+        if not self.jira_issue_exists(issue_key):
+            return self.respond(404, {"errorMessages": ["Issue Does Not Exist"]})
+
+        with self.state.lock:
+            worklogs = list(self.state.jira_worklogs.get(issue_key, []))
+
+        start = int(self.query.get("startAt", 0))
+        max_results = self.query.get("maxResults")
+        page, limit = self.page(worklogs, start, int(max_results) if max_results else None)
+
+        self.respond(
+            200,
+            {
+                "startAt": start,
+                "maxResults": limit,
+                "total": len(worklogs),
+                "worklogs": [self.jira_worklog_json(issue_key, w) for w in page],
+            },
+        )
+
+    def jira_add_worklog(self, issue_key):
+        if not self.jira_issue_exists(issue_key):
+            return self.respond(404, {"errorMessages": ["Issue Does Not Exist"]})
+
+        worklog = self.state.add_jira_worklog(
+            issue_key,
+            self.body.get("timeSpentSeconds"),
+            self.body.get("started"),
+            self.body.get("comment"),
+            self.basic_auth_user(),
+        )
+        self.respond(201, self.jira_worklog_json(issue_key, worklog))
+
+    def find_jira_worklog(self, issue_key, id):
+        for w in self.state.jira_worklogs.get(issue_key, []):
+            if w["id"] == str(id):
+                return w
+        return None
+
+    def jira_worklog(self, issue_key, id):
+        with self.state.lock:
+            worklog = self.find_jira_worklog(issue_key, id)
+        if worklog is None:
+            return self.respond(404, {"errorMessages": ["Worklog not found"]})
+        self.respond(200, self.jira_worklog_json(issue_key, worklog))
+
+    def jira_update_worklog(self, issue_key, id):
+        with self.state.lock:
+            worklog = self.find_jira_worklog(issue_key, id)
+            if worklog is None:
+                return self.respond(404, {"errorMessages": ["Worklog not found"]})
+
+            for field in ("timeSpentSeconds", "started", "comment"):
+                if field in self.body:
+                    worklog[field] = self.body[field]
+            worklog["timeSpent"] = "{}m".format(int(worklog["timeSpentSeconds"]) // 60)
+            worklog["updated"] = FakeState.now()
+
+        self.respond(200, self.jira_worklog_json(issue_key, worklog))
+
+    def jira_delete_worklog(self, issue_key, id):
+        with self.state.lock:
+            worklog = self.find_jira_worklog(issue_key, id)
+            if worklog is None:
+                return self.respond(404, {"errorMessages": ["Worklog not found"]})
+            self.state.jira_worklogs[issue_key].remove(worklog)
+        self.respond(204)
+
+    # Mattermost
+
+    def mattermost_hook(self, hook):
+        with self.state.lock:
+            self.state.mattermost_messages.append(self.body)
+        self.respond(200)
+
+    @staticmethod
+    def __parse_dt(value):
+        if not value:
+            return None
+        dt = dateutil.parser.parse(value)
+        return dt if dt.tzinfo else dt.replace(tzinfo=dateutil.tz.UTC)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        description="Runs local stand-in servers for toggl, redmine, jira and mattermost"
+    )
+
+    parser.add_argument("-c", "--config", help="Fake server config (yml)")
+    parser.add_argument("-p", "--port", help="Port", type=int, default=None)
+    parser.add_argument("-e", "--entries", help="Generate toggl entries", type=int, default=0)
+    parser.add_argument(
+        "-i",
+        "--issues",
+        help="Issue ids for generated entries (comma separated)",
+        default="#1,#2,#3",
+    )
+
+    args = parser.parse_args()
+
+    if args.config:
+        with open(args.config) as input:
+            server = FakeServer.fromYml(input, args.port)
+    else:
+        server = FakeServer(port=args.port or 8080)
+
+    if args.entries:
+        server.state.seed_toggl(args.entries, args.issues.split(","))
+
+    print("Fake servers listening on {}".format(server.url))
+    for name, url in server.urls.items():
+        print("\t{}:\t{}".format(name, url))
+
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
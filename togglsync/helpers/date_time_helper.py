@@ -1,5 +1,6 @@
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 
+import dateutil.parser
 import dateutil.tz
 
 
@@ -24,3 +25,47 @@ class DateTimeHelper:
     @staticmethod
     def formatDate(d):
         return datetime.strftime(d, "%Y-%m-%d")
+
+    @staticmethod
+    def get_date_shards(days, shard_days):
+        """
+        Splits period from midnight `days` ago till today midnight into shards of `shard_days` days,
+        returns list of (start, end) iso strings, oldest first
+        """
+        first = datetime.now(dateutil.tz.tzlocal()).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days)
+        shards = []
+
+        for offset in range(0, days + 1, shard_days):
+            start = first + timedelta(offset)
+            end = start + timedelta(min(shard_days, days + 1 - offset)) - timedelta(seconds=1)
+            shards.append((start.isoformat(), end.isoformat()))
+
+        return shards
+
+    @staticmethod
+    def get_utc_days_within(start, end):
+        """
+        Returns (first, last) "YYYY-MM-DD" UTC days fully covered by period from `start` till `end`
+        (iso strings), None if period does not cover any whole UTC day
+        """
+        start = dateutil.parser.parse(start).astimezone(dateutil.tz.UTC)
+        end = dateutil.parser.parse(end).astimezone(dateutil.tz.UTC)
+
+        first = start.date() if start.time() == time(0) else start.date() + timedelta(1)
+        last = end.date() if end.time() >= time(23, 59, 59) else end.date() - timedelta(1)
+
+        if first > last:
+            return None
+
+        return first.isoformat(), last.isoformat()
+
+    @staticmethod
+    def get_utc_days_overlapping(start, end):
+        """
+        Returns (first, last) "YYYY-MM-DD" UTC days overlapping period from `start` till `end`
+        (iso strings), including days covered only partially
+        """
+        start = dateutil.parser.parse(start).astimezone(dateutil.tz.UTC)
+        end = dateutil.parser.parse(end).astimezone(dateutil.tz.UTC)
+
+        return start.date().isoformat(), end.date().isoformat()
@@ -0,0 +1,87 @@
+import re
+
+
+class ErrorHelper:
+    """
+    Interprets exceptions raised by destination clients (python-redmine, jira, requests),
+    also when wrapped in other exceptions
+    """
+
+    # python-redmine reports http status by exception class
+    redmine_errors = {
+        "AuthError": 401,
+        "ForbiddenError": 403,
+        "ResourceNotFoundError": 404,
+        "ValidationError": 422,
+        "ServerError": 500,
+    }
+
+    @staticmethod
+    def chain(exc):
+        seen = set()
+
+        while exc is not None and id(exc) not in seen:
+            seen.add(id(exc))
+            yield exc
+            exc = exc.__cause__ or exc.__context__
+
+    @staticmethod
+    def status(exc):
+        """Returns http status code of the first exception in chain carrying one"""
+        for e in ErrorHelper.chain(exc):
+            status = getattr(e, "status_code", None)
+            if status is None:
+                status = getattr(getattr(e, "response", None), "status_code", None)
+            if status is None:
+                status = ErrorHelper.redmine_errors.get(type(e).__name__)
+            if status is None:
+                # python-redmine reports other codes only in message
+                found = re.search(r"error with the code ([0-9]+)", str(e))
+                status = int(found.group(1)) if found else None
+
+            if isinstance(status, int):
+                return status
+
+        return None
+
+    @staticmethod
+    def is_overload(exc):
+        """Timeout, connection error, 429 or 5xx response"""
+        for e in ErrorHelper.chain(exc):
+            names = [c.__name__ for c in type(e).__mro__]
+            if "Timeout" in names or "ConnectionError" in names:
+                return True
+
+        status = ErrorHelper.status(exc)
+        return status is not None and (status == 429 or status >= 500)
+
+    @staticmethod
+    def is_permanent(exc):
+        """
+        Client error which fails again when retried (4xx except 401, which may be fixed in
+        config, and 408, 429)
+        """
+        status = ErrorHelper.status(exc)
+        return status is not None and 400 <= status < 500 and status not in (401, 408, 429)
+
+    @staticmethod
+    def is_not_found(exc):
+        return ErrorHelper.status(exc) == 404
+
+    @staticmethod
+    def is_unknown_issue(exc):
+        """
+        Permanent error of issue: not found or forbidden (403, 404), or rejected as invalid
+        issue (redmine answers 422 "Issue is invalid" when time entry is created)
+        """
+        status = ErrorHelper.status(exc)
+
+        if status in (403, 404):
+            return True
+
+        return ErrorHelper.is_invalid_issue(exc)
+
+    @staticmethod
+    def is_invalid_issue(exc):
+        """Redmine rejected created time entry because of its issue (422 "Issue is invalid")"""
+        return ErrorHelper.status(exc) == 422 and "issue is invalid" in str(exc).lower()
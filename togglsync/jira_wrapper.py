@@ -1,7 +1,7 @@
 import os
 import re
 from argparse import ArgumentParser
-from datetime import datetime
+from datetime import datetime, timedelta
 from getpass import getpass
 
 import dateutil.parser
@@ -9,7 +9,9 @@ import dateutil.tz
 from jira import JIRA
 from termcolor import colored
 
+from togglsync.aggregation import Aggregation
 from togglsync.config import Config, Colors
+from togglsync.destination import Destination
 
 
 class JiraTimeEntry:
@@ -39,6 +41,7 @@ class JiraTimeEntry:
         self.issue = issue
         self.comments = comments
         self.toggl_id = self.findToggleId(comments)
+        self.toggl_ids = self.findToggleIds(comments)
         self.jira_issue_id = jira_issue_id
 
     def __str__(self):
@@ -56,7 +59,22 @@ class JiraTimeEntry:
             return None
 
         found = re.search(cls.toggl_id_pattern, comment)
-        return int(found.group(1)) if found else None
+        if found:
+            return int(found.group(1))
+
+        # worklog aggregated from many toggl entries is tracked by its bucket
+        aggregated = Aggregation.parse(comment)
+        return aggregated[0] if aggregated else None
+
+    @classmethod
+    def findToggleIds(cls, comment):
+        """Ids of all toggl entries covered by worklog"""
+        aggregated = Aggregation.parse(comment)
+        if aggregated:
+            return aggregated[1]
+
+        toggl_id = cls.findToggleId(comment)
+        return {toggl_id} if toggl_id is not None else set()
 
     @classmethod
     def fromWorklog(cls, jiraWorklog, issue_key):
@@ -81,7 +99,11 @@ class JiraTimeEntry:
         )
 
 
-class JiraHelper:
+class JiraHelper(Destination):
+    # issues are searched by worklog author and date, but worklogs are read issue by issue
+    # and filtered by start locally
+    filters_user = True
+
     def __init__(self, url, user, passwd, simulation):
         self.url = url
         self.simulation = simulation
@@ -93,6 +115,11 @@ class JiraHelper:
         if simulation:
             print(colored("Jira is in simulation mode", Colors.IMPORTANT.value))
 
+    @property
+    def identity(self):
+        """Destination identity (server and user)"""
+        return "jira:{}:{}".format(self.url, self.user_name)
+
     @staticmethod
     def round_to_minutes(seconds):
         return round(seconds / 60) * 60
@@ -106,9 +133,48 @@ class JiraHelper:
             "issueId": togglEntry.taskId,
             "started": togglEntry.start,
             "seconds": rounded_to_minutes,
-            "comment": "{} [toggl#{}]".format(togglEntry.description, togglEntry.id),
+            "comment": "{} {}".format(togglEntry.description, togglEntry.marker),
         }
 
+    fingerprint_fields = ("issueId", "started", "seconds", "comment")
+
+    @classmethod
+    def fingerprint(cls, data):
+        """Canonical form of destination payload (as returned by dictFromTogglEntry)"""
+        return (
+            str(data["issueId"]),
+            cls.normalize_started(data["started"]),
+            cls.round_to_minutes(data["seconds"]),
+            data["comment"],
+        )
+
+    @classmethod
+    def fingerprintFromEntry(cls, entry: JiraTimeEntry):
+        """Canonical form of existing worklog, comparable with fingerprint()
+
+        Jira API rounds/truncates to minutes event though data is provided in seconds
+        """
+        return (
+            str(entry.issue),
+            cls.normalize_started(entry.spent_on),
+            cls.round_to_minutes(entry.seconds) if entry.seconds is not None else None,
+            entry.comments,
+        )
+
+    @staticmethod
+    def normalize_started(started):
+        """Returns UTC ISO string wo/ microseconds, naive values are treated as UTC"""
+        if started is None:
+            return None
+        if isinstance(started, str):
+            try:
+                started = datetime.fromisoformat(started)
+            except ValueError:
+                started = dateutil.parser.parse(started)
+        if started.tzinfo is None:
+            started = started.replace(tzinfo=dateutil.tz.UTC)
+        return started.astimezone(dateutil.tz.UTC).replace(microsecond=0).isoformat()
+
     def get(self, issue_key):
         try:
             for worklog in self.jira_api.worklogs(issue_key):
@@ -119,6 +185,45 @@ class JiraHelper:
                 "Error downloading time entries for {}: {}".format(issue_key, str(exc))
             )
 
+    def get_range(self, start, end):
+        """
+        Worklogs of current user started in period from `start` till `end` (iso strings).
+        Issues are searched by worklog date with one day margin (worklogDate is in user's
+        timezone), then worklogs are filtered by exact start.
+        """
+        start = dateutil.parser.parse(start)
+        end = dateutil.parser.parse(end)
+        jql = 'worklogAuthor = currentUser() AND worklogDate >= "{}" AND worklogDate <= "{}"'.format(
+            (start - timedelta(1)).strftime("%Y-%m-%d"),
+            (end + timedelta(1)).strftime("%Y-%m-%d"),
+        )
+
+        try:
+            for issue_key in self.__search_issue_keys(jql):
+                for entry in self.get(issue_key):
+                    if start <= dateutil.parser.parse(entry.spent_on) <= end:
+                        yield entry
+        except Exception as exc:
+            raise Exception(
+                "Error downloading worklogs from {} to {}: {}".format(start, end, str(exc))
+            )
+
+    def __search_issue_keys(self, jql, page_size=100):
+        start_at = 0
+
+        while True:
+            result = self.jira_api.search_issues(
+                jql, startAt=start_at, maxResults=page_size, fields="key", json_result=True
+            )
+            issues = result.get("issues", [])
+
+            for issue in issues:
+                yield issue["key"]
+
+            start_at += len(issues)
+            if not issues or start_at >= result.get("total", 0):
+                return
+
     def put(self, issueId, started: datetime, seconds, comment):
         if isinstance(started, str):
             started = dateutil.parser.parse(started)
@@ -0,0 +1,155 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from termcolor import colored
+
+from togglsync.config import Colors
+
+
+class LeaseStore:
+    """
+    Leases of config entries (or any keys) in sqlite file, so overlapping runs (eg. cron run
+    taking longer than its interval) don't synchronize the same config entry concurrently
+
+    Local file serves runs of one machine, file on a shared disk serves several nodes. Lease
+    is held for `ttl` seconds and renewed while the run goes on; lease of a crashed holder
+    expires and is taken over by the next run. Every acquisition gets a new token (released
+    lease is kept with its last token), so a holder which lost its lease (eg. was suspended
+    longer than ttl) can't renew or release lease of the new holder.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        with self.__connect() as db:
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS leases (
+                    key TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    token INTEGER NOT NULL,
+                    expires REAL NOT NULL
+                )
+                """
+            )
+
+    @contextmanager
+    def __connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def default_owner():
+        return "{}:{}".format(socket.gethostname(), os.getpid())
+
+    def acquire(self, key, owner, ttl, now=None):
+        """Takes free (or expired) lease, returns its token or None when held by someone else"""
+        now = now if now is not None else time.time()
+
+        with self.__connect() as db:
+            row = db.execute("SELECT token, expires FROM leases WHERE key = ?", (key,)).fetchone()
+
+            if row is None:
+                db.execute(
+                    "INSERT INTO leases (key, owner, token, expires) VALUES (?, ?, 1, ?)",
+                    (key, owner, now + ttl),
+                )
+                return 1
+
+            token, expires = row
+            if expires > now:
+                return None
+
+            db.execute(
+                "UPDATE leases SET owner = ?, token = ?, expires = ? WHERE key = ?",
+                (owner, token + 1, now + ttl, key),
+            )
+            return token + 1
+
+    def renew(self, key, token, ttl, now=None):
+        """Extends lease, returns False when it was lost"""
+        now = now if now is not None else time.time()
+
+        with self.__connect() as db:
+            return (
+                db.execute(
+                    "UPDATE leases SET expires = ? WHERE key = ? AND token = ? AND expires > 0",
+                    (now + ttl, key, token),
+                ).rowcount
+                == 1
+            )
+
+    def release(self, key, token):
+        with self.__connect() as db:
+            db.execute("UPDATE leases SET expires = 0 WHERE key = ? AND token = ?", (key, token))
+
+    def holder(self, key):
+        """Returns (owner, expires) of lease or None when released"""
+        with self.__connect() as db:
+            return db.execute(
+                "SELECT owner, expires FROM leases WHERE key = ? AND expires > 0", (key,)
+            ).fetchone()
+
+    def hold(self, key, ttl, wait=0, owner=None):
+        """
+        Acquires lease (waiting up to `wait` seconds for its release or expiry) and keeps it
+        renewed, returns Lease or None when it is held by someone else
+        """
+        owner = owner or LeaseStore.default_owner()
+        deadline = time.time() + wait
+
+        while True:
+            token = self.acquire(key, owner, ttl)
+            if token is not None:
+                return Lease(self, key, token, ttl)
+
+            if time.time() >= deadline:
+                return None
+
+            time.sleep(min(1, max(0.1, deadline - time.time())))
+
+
+class Lease:
+    """Held lease, renewed in background every third of its ttl until released"""
+
+    def __init__(self, store, key, token, ttl):
+        self.store = store
+        self.key = key
+        self.token = token
+        self.ttl = ttl
+
+        self.__stop = threading.Event()
+        self.__renewal = threading.Thread(target=self.__renew, daemon=True)
+        self.__renewal.start()
+
+    def __renew(self):
+        while not self.__stop.wait(self.ttl / 3.0):
+            if not self.store.renew(self.key, self.token, self.ttl):
+                print(
+                    colored(
+                        "Lease of {} lost, another run may synchronize it".format(self.key),
+                        Colors.ERROR.value,
+                    )
+                )
+                return
+
+    def release(self):
+        if self.__stop.is_set():
+            return
+
+        self.__stop.set()
+        self.__renewal.join()
+        self.store.release(self.key, self.token)
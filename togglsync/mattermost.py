@@ -4,6 +4,7 @@ from argparse import ArgumentParser
 from datetime import datetime
 
 from togglsync.config import Config
+from togglsync.entry_store import TogglEntryStore
 from togglsync.toggl import TogglHelper, TogglEntry
 
 
@@ -83,23 +84,38 @@ class MattermostNotifier:
         self.append("Sync: {} day{}".format(days, "s" if days != 1 else ""))
 
     def appendEntries(self, allEntries):
+        # columnar store is built once and shared by summaries (when numpy is available)
+        store = TogglEntryStore.of(allEntries)
+
         self.append(
             "Found entries in toggl: **{}** (filtered: **{}**)".format(
-                len(allEntries), len(TogglHelper.filter_valid_entries(allEntries))
+                len(allEntries),
+                store.count(store.valid())
+                if store is not None
+                else len(TogglHelper.filter_valid_entries(allEntries)),
             )
         )
 
-        self.__append_summary(allEntries)
+        self.__append_summary(store if store is not None else allEntries)
         self.append("")
 
-        self.__append_redmine_summary(allEntries)
+        self.__append_redmine_summary(store if store is not None else allEntries)
 
     def __append_summary(self, allEntries):
-        entries = MattermostNotifier.filterToday(allEntries)
+        store = TogglEntryStore.of(allEntries)
 
-        timeSum = sum([e.duration for e in entries])
+        if store is not None:
+            today = store.on_day(datetime.strftime(datetime.today(), "%Y-%m-%d"))
+            entriesCount = store.count(today)
+            timeSum = store.total(today)
+            withTaskCount = store.count(today & store.has_task())
+        else:
+            entries = MattermostNotifier.filterToday(allEntries)
+            entriesCount = len(entries)
+            timeSum = sum([e.duration for e in entries])
+            withTaskCount = len(MattermostNotifier.filterWithRedmineId(entries))
 
-        if len(entries) == 0 or timeSum == 0:
+        if entriesCount == 0 or timeSum == 0:
             self.append("Altogether you did not work today at all :cry:. Hope you ok?")
         else:
             if timeSum < 4 * 60 * 60:  # 4 hours
@@ -121,24 +137,22 @@ class MattermostNotifier:
                     )
                 )
 
-            if len(entries) < 5:
+            if entriesCount < 5:
                 self.append(
                     "Huh, not many entries. It means, you did only a couple of tasks, but did it right .. right? :open_mouth:"
                 )
-            elif len(entries) < 20:
+            elif entriesCount < 20:
                 self.append(
                     "Average day. Not too few, not too many entries :sunglasses:."
                 )
             else:
                 self.append(
                     "You did {} entries like a boss :smirk: :boom:!".format(
-                        len(entries)
+                        entriesCount
                     )
                 )
 
-            redmineTodayEntries = MattermostNotifier.filterWithRedmineId(entries)
-
-            factor = len(redmineTodayEntries) / len(entries)
+            factor = withTaskCount / entriesCount
 
             if factor < .25:
                 self.append(
@@ -158,20 +172,23 @@ class MattermostNotifier:
                 )
 
     def __append_redmine_summary(self, allEntries):
-        redmineEntries = TogglHelper.filter_valid_entries(allEntries)
-
-        if len(redmineEntries) > 0:
-            self.append("---")
-            self.append("**Redmine summary**")
+        store = TogglEntryStore.of(allEntries)
 
+        if store is not None:
+            redmineIssuesSums = store.sum_by_task(store.valid())
+        else:
             redmineIssuesSums = {}
 
-            for e in redmineEntries:
+            for e in TogglHelper.filter_valid_entries(allEntries):
                 if e.taskId not in redmineIssuesSums:
                     redmineIssuesSums[e.taskId] = 0
 
                 redmineIssuesSums[e.taskId] += e.duration
 
+        if len(redmineIssuesSums) > 0:
+            self.append("---")
+            self.append("**Redmine summary**")
+
             longestTasks = sorted(
                 redmineIssuesSums, key=lambda id: -redmineIssuesSums[id]
             )[:3]
@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+import dateutil.parser
+import dateutil.tz
+
+
+class NegativeCache:
+    """
+    Issue ids which failed with permanent errors (not found, forbidden), per destination
+
+    Such ids (typos, issues of other projects, closed or forbidden issues) are skipped
+    without calling destination until `ttl` (days) passes or they are purged manually.
+    Stored in json file keyed by destination identity and issue id.
+    """
+
+    def __init__(self, path, ttl=7):
+        self.path = path
+        self.ttl = timedelta(days=ttl)
+        self.lock = threading.Lock()
+        self.issues = NegativeCache.__read(path)
+
+    def get(self, destination, issueId, now=None):
+        """Returns record (status, at) of known bad issue, None if unknown or expired"""
+        record = self.issues.get(destination, {}).get(str(issueId))
+
+        if record is None:
+            return None
+
+        now = now or datetime.now(dateutil.tz.UTC)
+        if dateutil.parser.parse(record["at"]) + self.ttl <= now:
+            return None
+
+        return record
+
+    def add(self, destination, issueId, status):
+        with self.lock:
+            self.issues.setdefault(destination, {})[str(issueId)] = {
+                "status": status,
+                "at": datetime.now(dateutil.tz.UTC).isoformat(),
+            }
+            self.save()
+
+    def purge(self, issueIds=None):
+        """Forgets given issue ids (of all destinations) or everything, returns number of forgotten ids"""
+        with self.lock:
+            purged = 0
+
+            for destination in list(self.issues):
+                issues = self.issues[destination]
+                for issueId in list(issues):
+                    if issueIds is None or issueId in [str(i) for i in issueIds]:
+                        del issues[issueId]
+                        purged += 1
+                if not issues:
+                    del self.issues[destination]
+
+            self.save()
+            return purged
+
+    def save(self):
+        now = datetime.now(dateutil.tz.UTC)
+
+        # expired records are dropped
+        state = dict(
+            (
+                destination,
+                dict(
+                    (issueId, record)
+                    for issueId, record in issues.items()
+                    if dateutil.parser.parse(record["at"]) + self.ttl > now
+                ),
+            )
+            for destination, issues in self.issues.items()
+        )
+        state = dict((k, v) for k, v in state.items() if v)
+
+        if not state:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return
+
+        tmp = self.path + ".tmp"
+
+        with open(tmp, "w") as output:
+            json.dump(state, output, indent=2, sort_keys=True)
+
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def __read(path):
+        if not os.path.exists(path):
+            return {}
+
+        with open(path) as input:
+            return json.load(input)
@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+import dateutil.tz
+
+
+class Outbox:
+    """
+    Append-only journal (json lines) of writes to destinations
+
+    Every write is recorded as "pending" before it is sent and as "done" after it
+    succeeded, so failed or interrupted writes stay pending and can be replayed on the
+    next run. Records are keyed by destination, operation and toggl id (idempotency key).
+    Writes which can't succeed on replay are recorded as "failed" and dropped by compact.
+    """
+
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.records = self.__load()
+
+    def __load(self):
+        records = {}
+
+        if not os.path.exists(self.path):
+            return records
+
+        with open(self.path) as input:
+            for line in input:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # interrupted append
+                    continue
+                records[record["key"]] = record
+
+        return records
+
+    @staticmethod
+    def key(destination, op, toggl_id, id=None):
+        return "{}|{}|{}|{}".format(destination, op, toggl_id, id if id is not None else "")
+
+    def begin(self, destination, op, toggl_id, data):
+        """Records pending write, returns its key"""
+        key = Outbox.key(destination, op, toggl_id, data.get("id"))
+
+        self.__append(
+            {
+                "key": key,
+                "destination": destination,
+                "op": op,
+                "toggl_id": toggl_id,
+                "data": data,
+                "state": Outbox.PENDING,
+                "at": datetime.now(dateutil.tz.UTC).isoformat(),
+            }
+        )
+
+        return key
+
+    def done(self, key):
+        self.__settle(key, Outbox.DONE)
+
+    def fail(self, key):
+        self.__settle(key, Outbox.FAILED)
+
+    def __settle(self, key, state):
+        with self.lock:
+            record = self.records.get(key)
+
+        if record is not None and record["state"] == Outbox.PENDING:
+            self.__append(dict(record, state=state, at=datetime.now(dateutil.tz.UTC).isoformat()))
+
+    def pending(self, destination=None):
+        with self.lock:
+            return [
+                r
+                for r in self.records.values()
+                if r["state"] == Outbox.PENDING
+                and (destination is None or r["destination"] == destination)
+            ]
+
+    def compact(self):
+        """Rewrites journal with pending records only"""
+        with self.lock:
+            pending = [r for r in self.records.values() if r["state"] == Outbox.PENDING]
+
+            if len(pending) == len(self.records):
+                return
+
+            if not pending:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+            else:
+                tmp = self.path + ".tmp"
+                with open(tmp, "w") as output:
+                    for r in pending:
+                        output.write(json.dumps(r, sort_keys=True) + "\n")
+                os.replace(tmp, self.path)
+
+            self.records = {r["key"]: r for r in pending}
+
+    def __append(self, record):
+        with self.lock:
+            with open(self.path, "a") as output:
+                output.write(json.dumps(record, sort_keys=True) + "\n")
+                output.flush()
+            self.records[record["key"]] = record
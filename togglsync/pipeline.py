@@ -0,0 +1,138 @@
+import queue
+import threading
+
+
+class _Failure:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+_END = object()
+
+
+def _put(items, stopped, item):
+    """Puts item to bounded queue, gives up (returns False) when consumer stopped"""
+    while not stopped.is_set():
+        try:
+            items.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+
+    return False
+
+
+class BoundedStream:
+    """
+    Runs producing iterable (eg. toggl download and parsing) in background thread and
+    hands its items over to consumer through bounded queue
+
+        - producer blocks when `maxsize` items are waiting (backpressure)
+        - exception raised by producer is re-raised in consumer
+        - producer stops when consumer stops iterating
+    """
+
+    def __init__(self, source, maxsize=100):
+        self.source = source
+        self.maxsize = maxsize
+
+    def __iter__(self):
+        items = queue.Queue(self.maxsize)
+        stopped = threading.Event()
+
+        thread = threading.Thread(
+            target=BoundedStream.__produce, args=(self.source, items, stopped), daemon=True
+        )
+        thread.start()
+
+        try:
+            while True:
+                item = items.get()
+
+                if item is _END:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.exc
+
+                yield item
+        finally:
+            stopped.set()
+
+    @staticmethod
+    def __produce(source, items, stopped):
+        try:
+            for item in source:
+                if not _put(items, stopped, item):
+                    return
+        except Exception as exc:
+            _put(items, stopped, _Failure(exc))
+            return
+
+        _put(items, stopped, _END)
+
+
+class Broadcast:
+    """
+    Feeds items of one source (iterated once, in background thread) to several consumers,
+    each through its own bounded queue
+
+        - `routes`: one function per consumer, returns item as seen by the consumer
+          (or None to skip it)
+        - producer waits for the slowest consumer (backpressure)
+        - consumer which stops iterating is not fed anymore
+    """
+
+    def __init__(self, source, routes, maxsize=100):
+        self.source = source
+        self.routes = routes
+
+        self.__queues = [queue.Queue(maxsize) for _ in routes]
+        self.__stopped = [threading.Event() for _ in routes]
+        self.__lock = threading.Lock()
+        self.__thread = None
+
+        self.streams = [self.__consume(i) for i in range(len(routes))]
+
+    def close(self, i):
+        """Stops feeding i-th consumer (also when it never started iterating)"""
+        self.__stopped[i].set()
+
+    def __consume(self, i):
+        self.__start()
+
+        try:
+            while True:
+                item = self.__queues[i].get()
+
+                if item is _END:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.exc
+
+                yield item
+        finally:
+            self.__stopped[i].set()
+
+    def __start(self):
+        with self.__lock:
+            if self.__thread is None:
+                self.__thread = threading.Thread(target=self.__produce, daemon=True)
+                self.__thread.start()
+
+    def __produce(self):
+        try:
+            for item in self.source:
+                if all(stopped.is_set() for stopped in self.__stopped):
+                    return
+
+                for i, route in enumerate(self.routes):
+                    routed = route(item)
+                    if routed is not None:
+                        _put(self.__queues[i], self.__stopped[i], routed)
+        except Exception as exc:
+            for i in range(len(self.routes)):
+                _put(self.__queues[i], self.__stopped[i], _Failure(exc))
+            return
+
+        for i in range(len(self.routes)):
+            _put(self.__queues[i], self.__stopped[i], _END)
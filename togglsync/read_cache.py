@@ -0,0 +1,87 @@
+import threading
+
+
+class _Flight:
+    """Destination read in progress"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.invalidated = False
+
+
+class ReadCache:
+    """
+    Per run cache of destination reads with de-duplication of concurrent reads (singleflight)
+
+    Reads are keyed by (destination identity, issue, window), where identity is server and
+    user (see api helper `identity`), issue is None for reads of a period and window is None
+    for reads of whole issue. The first caller fetches, concurrent callers of the same key
+    wait for its result. Failed reads are not cached.
+
+    Any write to an issue invalidates reads of the issue and reads of periods of the same
+    destination (also reads in progress: their result is handed to waiting callers, but
+    it is not cached).
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+        self.__results = {}
+        self.__flights = {}
+        self.__lock = threading.Lock()
+
+    def get(self, identity, issue, window, fetch):
+        """Returns list of destination entries, `fetch` is called only when not cached"""
+        key = (identity, str(issue) if issue is not None else None, window)
+
+        with self.__lock:
+            if key in self.__results:
+                self.hits += 1
+                return list(self.__results[key])
+
+            flight = self.__flights.get(key)
+            leader = flight is None
+
+            if leader:
+                flight = self.__flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return list(flight.result)
+
+        try:
+            flight.result = list(fetch())
+        except Exception as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self.__lock:
+                del self.__flights[key]
+                if flight.error is None and not flight.invalidated:
+                    self.__results[key] = flight.result
+            flight.done.set()
+
+        return list(flight.result)
+
+    def invalidate(self, identity, issue):
+        """Forgets reads affected by write to issue (all reads of destination if issue is unknown)"""
+        issue = str(issue) if issue is not None else None
+
+        def affected(key):
+            return key[0] == identity and (issue is None or key[1] is None or key[1] == issue)
+
+        with self.__lock:
+            for key in [k for k in self.__results if affected(k)]:
+                del self.__results[key]
+
+            for key, flight in self.__flights.items():
+                if affected(key):
+                    flight.invalidated = True
@@ -1,9 +1,12 @@
+import hashlib
 import re
 from argparse import ArgumentParser
 
 from redmine import Redmine
 
+from togglsync.aggregation import Aggregation
 from togglsync.config import Config
+from togglsync.destination import Destination
 from togglsync.helpers.date_time_helper import DateTimeHelper
 
 
@@ -22,6 +25,7 @@ class RedmineTimeEntry:
         self.issue = str(issue)
         self.comments = comments
         self.toggl_id = RedmineTimeEntry.findToggleId(comments)
+        self.toggl_ids = RedmineTimeEntry.findToggleIds(comments)
 
     def __str__(self):
         return "{0.id} {0.created_on} ({0.user}), {0.hours}h, @{0.spent_on}, #{0.issue}: {0.comments} (toggl_id: {0.toggl_id})".format(
@@ -34,7 +38,22 @@ class RedmineTimeEntry:
             return None
 
         found = re.search(RedmineTimeEntry.toggl_id_pattern, comment)
-        return int(found.group(1)) if found else None
+        if found:
+            return int(found.group(1))
+
+        # entry aggregated from many toggl entries is tracked by its bucket
+        aggregated = Aggregation.parse(comment)
+        return aggregated[0] if aggregated else None
+
+    @staticmethod
+    def findToggleIds(comment):
+        """Ids of all toggl entries covered by entry"""
+        aggregated = Aggregation.parse(comment)
+        if aggregated:
+            return aggregated[1]
+
+        toggl_id = RedmineTimeEntry.findToggleId(comment)
+        return {toggl_id} if toggl_id is not None else set()
 
     @classmethod
     def fromTimeEntry(cls, redmineTimeEntry):
@@ -51,7 +70,12 @@ class RedmineTimeEntry:
         )
 
 
-class RedmineHelper:
+class RedmineHelper(Destination):
+    # time entries of current user ("me") in whole days: one paginated list
+    bulk_read = True
+    filters_user = True
+    filters_date = True
+
     def __init__(self, url, api_key, simulation):
         self.url = url
         self.api_key = api_key
@@ -64,15 +88,43 @@ class RedmineHelper:
         if simulation:
             print("RedmineHelper is in simulation mode")
 
+    @property
+    def identity(self):
+        """Destination identity (server and user), api key is not exposed"""
+        key = hashlib.sha1((self.api_key or "").encode("utf-8")).hexdigest()[:10]
+        return "redmine:{}:{}".format(self.url, key)
+
     @staticmethod
     def dictFromTogglEntry(togglEntry):
         return {
             "issueId": togglEntry.taskId,
             "spentOn": togglEntry.start[:10],
             "hours": togglEntry.hours,
-            "comment": "{} [toggl#{}]".format(togglEntry.description, togglEntry.id),
+            "comment": "{} {}".format(togglEntry.description, togglEntry.marker),
         }
 
+    fingerprint_fields = ("issueId", "spentOn", "hours", "comment")
+
+    @staticmethod
+    def fingerprint(data):
+        """Canonical form of destination payload (as returned by dictFromTogglEntry)"""
+        return (
+            str(data["issueId"]),
+            data["spentOn"],
+            round(float(data["hours"]), 2),
+            data["comment"],
+        )
+
+    @staticmethod
+    def fingerprintFromEntry(entry: RedmineTimeEntry):
+        """Canonical form of existing redmine time entry, comparable with fingerprint()"""
+        return (
+            str(entry.issue),
+            entry.spent_on,
+            round(float(entry.hours), 2) if entry.hours is not None else None,
+            entry.comments,
+        )
+
     def get(self, id):
         id = int(id)
         try:
@@ -83,6 +135,26 @@ class RedmineHelper:
                 "Error downloading time entries for {}: {}".format(id, str(exc))
             )
 
+    def get_range(self, start, end):
+        """
+        Time entries of current user spent in period from `start` till `end` (iso strings).
+        Spent on is UTC day of toggl entry start, so entries of all UTC days overlapping the
+        period are returned (also of days covered only partially).
+        """
+        days = DateTimeHelper.get_utc_days_overlapping(start, end)
+
+        try:
+            for t in self.redmine.time_entry.filter(
+                user_id="me", from_date=days[0], to_date=days[1]
+            ):
+                yield RedmineTimeEntry.fromTimeEntry(t)
+        except Exception as exc:
+            raise Exception(
+                "Error downloading time entries from {} to {}: {}".format(
+                    days[0], days[1], str(exc)
+                )
+            )
+
     def put(self, issueId, spentOn, hours, comment):
         issueId = int(issueId)
         if self.simulation:
@@ -109,7 +181,7 @@ class RedmineHelper:
                 id, issue_id=issueId, spent_on=spentOn, hours=hours, comments=comment
             )
 
-    def delete(self, id):
+    def delete(self, id, issueId=None):
         id = int(id)
         if self.simulation:
             print("\t\tSimulate delete of: {}".format(id))
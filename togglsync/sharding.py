@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+from argparse import ArgumentParser
+
+
+class Shard:
+    """
+    Static part `index` of `count` of the work, for running synchronization on several nodes
+
+    Work items (issue ids or config entry labels) are assigned by stable hash (sha1, not
+    python hash which is salted per process), so every node computes the same assignment
+    without coordination and each item is handled by exactly one node.
+    """
+
+    def __init__(self, index, count):
+        if count < 1 or not 0 <= index < count:
+            raise Exception("Invalid shard: {}/{}".format(index, count))
+
+        self.index = index
+        self.count = count
+
+    @classmethod
+    def parse(cls, value):
+        """Parses "i/n" (i from 0 to n-1)"""
+        try:
+            index, count = [int(v) for v in value.split("/")]
+        except ValueError:
+            raise Exception("Invalid shard: {} (expected i/n, eg. 0/4)".format(value))
+
+        return cls(index, count)
+
+    @staticmethod
+    def slot(key, count):
+        digest = hashlib.sha1(str(key).encode("utf-8")).hexdigest()
+        return int(digest, 16) % count
+
+    def owns(self, key):
+        return Shard.slot(key, self.count) == self.index
+
+    def __str__(self):
+        return "{}/{}".format(self.index, self.count)
+
+
+class ShardReport:
+    """
+    Counters of synchronizers of one shard, saved as json so reports of all shards can be
+    merged into one (see __main__)
+    """
+
+    counters = ("inserted", "updated", "skipped", "deleted", "deferred")
+
+    def __init__(self, shard=None):
+        self.shard = str(shard) if shard else None
+        self.entries = {}
+
+    def add(self, label, synchronizer):
+        counters = self.entries.setdefault(label, dict((c, 0) for c in self.counters))
+        for c in self.counters:
+            counters[c] += getattr(synchronizer, c)
+
+    def save(self, path):
+        tmp = path + ".tmp"
+
+        with open(tmp, "w") as output:
+            json.dump({"shard": self.shard, "entries": self.entries}, output, indent=2, sort_keys=True)
+
+        os.replace(tmp, path)
+
+    @staticmethod
+    def merge(paths):
+        """Sums counters of saved reports, returns (shards, counters by label)"""
+        shards = []
+        entries = {}
+
+        for path in paths:
+            with open(path) as input:
+                report = json.load(input)
+
+            shards.append(report["shard"])
+
+            for label, counters in report["entries"].items():
+                merged = entries.setdefault(label, dict((c, 0) for c in ShardReport.counters))
+                for c in ShardReport.counters:
+                    merged[c] += counters.get(c, 0)
+
+        return shards, entries
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Merges reports of sharded synchronization")
+
+    parser.add_argument("reports", help="Reports saved with --shard-report", nargs="+")
+
+    args = parser.parse_args()
+
+    shards, entries = ShardReport.merge(args.reports)
+
+    print("Shards: {}".format(", ".join(str(s) for s in shards)))
+
+    total = dict((c, 0) for c in ShardReport.counters)
+    for label, counters in sorted(entries.items()):
+        print("{}: {}".format(label, ", ".join("{} {}".format(counters[c], c) for c in ShardReport.counters)))
+        for c in ShardReport.counters:
+            total[c] += counters[c]
+
+    print("Total: {}".format(", ".join("{} {}".format(total[c], c) for c in ShardReport.counters)))
@@ -1,96 +1,835 @@
 import argparse
+import atexit
 import os
 import sys
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from getpass import getpass
 
 import dateutil.parser
 from termcolor import colored
 
 from togglsync import version
+from togglsync.aggregation import AggregatedTogglEntry, Aggregation
+from togglsync.audit import Auditor
+from togglsync.cassette import Cassette
+from togglsync.concurrency import CircuitOpenError, DestinationController
+from togglsync.checkpoint import Checkpoint
 from togglsync.config import Config, Entry, Colors
+from togglsync.destination import Destination
+from togglsync.helpers.date_time_helper import DateTimeHelper
+from togglsync.helpers.error_helper import ErrorHelper
 from togglsync.jira_wrapper import JiraHelper
+from togglsync.lease import LeaseStore
 from togglsync.mattermost import MattermostNotifier, RequestsRunner
+from togglsync.negative_cache import NegativeCache
+from togglsync.outbox import Outbox
+from togglsync.pipeline import BoundedStream, Broadcast
+from togglsync.read_cache import ReadCache
 from togglsync.redmine_wrapper import RedmineHelper
-from togglsync.toggl import TogglHelper
+from togglsync.sharding import Shard, ShardReport
+from togglsync.toggl import TogglEntry, TogglHelper, TogglReports, TogglTeamHelper
+from togglsync.toggl_export import TogglFileHelper
 from togglsync.version import VERSION
+from togglsync.work_queue import QueueWorker, WorkQueue
 
 
 class Synchronizer:
-    def __init__(self, config, api_helper, toggl, mattermost, raise_errors=False):
+    # toggl entries buffered between download and grouping
+    queue_size = 500
+    # max number of issues with destination entries read during toggl download
+    prefetch = 16
+
+    def __init__(
+        self,
+        config,
+        api_helper,
+        toggl,
+        mattermost,
+        raise_errors=False,
+        verbose=False,
+        controller=None,
+        outbox=None,
+        propagate_deletions=False,
+        aggregation=None,
+        read_cache=None,
+        negative_cache=None,
+        shard=None,
+    ):
         self.config = config
         self.api_helper = api_helper
         self.toggl = toggl
         self.mattermost = mattermost
+        self.verbose = verbose
+        self.controller = controller or DestinationController()
+        self.outbox = outbox
+        self.propagate_deletions = propagate_deletions
+        self.aggregation = aggregation
+        self.read_cache = read_cache or ReadCache()
+        self.negative_cache = negative_cache
+        self.shard = shard
 
         self.inserted = 0
         self.updated = 0
         self.skipped = 0
+        self.deleted = 0
+        self.deferred = 0
+        self.lock = threading.Lock()
         self.raise_errors = raise_errors
 
-    def start(self, days):
+    def start(self, days, entries=None):
+        """
+        Synchronizes last `days` days as a pipeline: toggl entries are downloaded and
+        parsed in background (bounded queue), matched and grouped by issue as they come,
+        destination entries of first `prefetch` issues are read while download is still
+        running (or, when destination supports cheap bulk reads and there are more issues,
+        destination entries of all issues are read at once after download), then every issue
+        is diffed and applied in parallel.
+
+        With deletion propagation destination entries of current user in the whole period
+        are read alongside, entries whose toggl entry is gone (or moved to another issue)
+        are removed after synchronization.
+
+        Toggl entries of the period may be given (`entries`), otherwise they are downloaded.
+        With `shard` only issues of the shard are synchronized (and cleaned from orphans).
+        """
         if days < 0:
             raise Exception("Invalid days: {}".format(days))
 
-        entries = list(self.toggl.get(days))
+        days = self.download_days(days)
 
-        filteredEntries = self.toggl.filter_valid_entries(entries)
+        self.replay_outbox()
 
-        print(
-            "Found entries in toggl: {} (filtered: {})".format(
-                len(entries), len(filteredEntries)
+        source = entries if entries is not None else self.toggl.get(days)
+
+        # all entries are kept only for mattermost summary
+        entries = [] if self.mattermost else None
+        entriesCount = 0
+        filteredCount = 0
+        togglEntriesByIssueId = {}
+        lookups = {}
+        issue_by_toggl_id = {} if self.propagate_deletions else None
+        reads_window = self.reads_window()
+
+        with ThreadPoolExecutor(max_workers=self.controller.maximum) as lookup_executor:
+            if self.propagate_deletions:
+                start = DateTimeHelper.get_date_in_past(days)
+                end = DateTimeHelper.get_today_midnight()
+                window_lookup = lookup_executor.submit(self.__lookup_window, start, end)
+
+            for entry in BoundedStream(source, self.queue_size):
+                entriesCount += 1
+                if entries is not None:
+                    entries.append(entry)
+                if issue_by_toggl_id is not None:
+                    issue_by_toggl_id[entry.id] = entry.taskId
+
+                if not entry.is_valid() or not self.owns(entry.taskId):
+                    continue
+
+                filteredCount += 1
+
+                if entry.taskId not in togglEntriesByIssueId:
+                    togglEntriesByIssueId[entry.taskId] = []
+
+                    if (
+                        not reads_window
+                        and len(lookups) < self.prefetch
+                        and not self.is_unknown_issue(entry.taskId)
+                    ):
+                        lookups[entry.taskId] = lookup_executor.submit(
+                            self.__lookup, entry.taskId
+                        )
+
+                togglEntriesByIssueId[entry.taskId].append(entry)
+
+            print(
+                "Found entries in toggl: {} (filtered: {})".format(
+                    entriesCount, filteredCount
+                )
             )
+
+            if self.mattermost:
+                self.mattermost.appendDuration(days)
+                self.mattermost.appendEntries(entries)
+
+            if filteredCount == 0 and not self.propagate_deletions:
+                print("No entries with tracking id found. Nothing to do")
+                return 0
+
+            if reads_window and len(togglEntriesByIssueId) > 1:
+                lookups = self.__window_lookups(togglEntriesByIssueId, lookup_executor)
+
+            self.__sync_issues(togglEntriesByIssueId, lookups=lookups)
+
+            if self.propagate_deletions:
+                self.__propagate_deletions(
+                    issue_by_toggl_id, togglEntriesByIssueId, start, end, window_lookup
+                )
+
+        self.__summary()
+
+    def sync_entry(self, togglEntry):
+        """
+        Synchronizes single toggl entry, only destination entries of its issue are read.
+        With aggregation the whole bucket of the entry (entries of its issue) is synchronized.
+        """
+        if togglEntry is None:
+            print("Entry not found in toggl, nothing to do")
+            return
+
+        if not togglEntry.is_valid():
+            print("Entry without issue (or duration), nothing to do: {}".format(togglEntry))
+            return
+
+        togglEntries = [togglEntry]
+
+        if self.aggregation:
+            start, end = self.aggregation.period(self.aggregation.key(togglEntry))
+            togglEntries = [
+                e
+                for e in self.toggl.get_range(start, end)
+                if e.is_valid() and str(e.taskId) == str(togglEntry.taskId)
+            ]
+
+        self.__sync_issue(togglEntry.taskId, togglEntries)
+        self.__summary()
+
+    def sync_issue(self, issueId, days, entries=None):
+        """
+        Synchronizes toggl entries of single issue in last `days` days, only destination
+        entries of the issue are read. Toggl entries of the period may be given (`entries`).
+        """
+        if days < 0:
+            raise Exception("Invalid days: {}".format(days))
+
+        # redmine issues may be given as "#123"
+        issueId = str(issueId).lstrip("#")
+
+        source = entries if entries is not None else self.toggl.get(self.download_days(days))
+        togglEntries = [e for e in source if e.is_valid() and str(e.taskId) == issueId]
+
+        print("Found entries of {} in toggl: {}".format(issueId, len(togglEntries)))
+
+        if togglEntries:
+            self.__sync_issue(togglEntries[0].taskId, togglEntries)
+
+        self.__summary()
+
+    def enqueue(self, queue, days, entries=None):
+        """
+        Puts toggl entries of last `days` days to work queue, one unit per issue (see
+        WorkQueue), returns number of units. Toggl entries of the period may be given.
+        """
+        if days < 0:
+            raise Exception("Invalid days: {}".format(days))
+
+        source = entries if entries is not None else self.toggl.get(self.download_days(days))
+        togglEntriesByIssueId = Synchronizer.groupTogglByIssueId(
+            [e for e in source if e.is_valid() and self.owns(e.taskId)]
         )
 
+        for issueId, togglEntries in togglEntriesByIssueId.items():
+            queue.put(
+                self.toggl.config_entry.label,
+                issueId,
+                [
+                    dict(
+                        e.raw_entry or {},
+                        id=e.id,
+                        start=e.start,
+                        duration=e.duration,
+                        description=e.description,
+                    )
+                    for e in togglEntries
+                ],
+            )
+
+        print("Queued issues: {}".format(len(togglEntriesByIssueId)))
+        return len(togglEntriesByIssueId)
+
+    def sync_unit(self, issueId, raw_entries):
+        """Synchronizes unit of work queue (raw toggl entries of issue), returns False on failure"""
+        togglEntries = [
+            e
+            for e in (TogglEntry.createFromEntry(r, self.toggl.config_entry) for r in raw_entries)
+            if e.is_valid() and str(e.taskId) == str(issueId)
+        ]
+
+        if not togglEntries:
+            return True
+
+        return self.__sync_issue(togglEntries[0].taskId, togglEntries)
+
+    def backfill(self, days, checkpoint, shard_days=7):
+        """
+        Synchronizes long period shard by shard (oldest first), issues in sorted order.
+        Progress is saved to checkpoint after every completed issue and shard, started
+        checkpoint is resumed (with its original period).
+        """
+        if days < 0:
+            raise Exception("Invalid days: {}".format(days))
+
+        if self.aggregation:
+            # buckets must not be split between shards
+            days = self.aggregation.extend_days(days)
+            shard_days = self.aggregation.shard_days(shard_days)
+
+        if not checkpoint.is_started:
+            checkpoint.begin(days, DateTimeHelper.get_date_shards(days, shard_days))
+        else:
+            print(
+                "Resuming backfill of {} days: {}/{} shards done".format(
+                    checkpoint.days, len(checkpoint.shards_done), len(checkpoint.shards)
+                )
+            )
+
+        self.replay_outbox()
+
+        # entries of shards synchronized by this run, for mattermost summary
+        downloaded = [] if self.mattermost else None
+
         if self.mattermost:
-            self.mattermost.appendDuration(days)
-            self.mattermost.appendEntries(entries)
+            self.mattermost.appendDuration(checkpoint.days)
+
+        for shard_start, shard_end in checkpoint.shards:
+            if checkpoint.is_shard_done(shard_start):
+                continue
+
+            print("Shard {} - {}".format(shard_start, shard_end))
+
+            entries = list(self.toggl.get_range(shard_start, shard_end))
+            if downloaded is not None:
+                downloaded.extend(entries)
+            filteredEntries = self.toggl.filter_valid_entries(entries)
+            togglEntriesByIssueId = Synchronizer.groupTogglByIssueId(
+                [e for e in filteredEntries if self.owns(e.taskId)]
+            )
+
+            remaining = {
+                issueId: togglEntriesByIssueId[issueId]
+                for issueId in sorted(togglEntriesByIssueId)
+                if not checkpoint.is_issue_done(shard_start, issueId)
+            }
+
+            print(
+                "Found issues in toggl: {} (already done: {})".format(
+                    len(togglEntriesByIssueId), len(togglEntriesByIssueId) - len(remaining)
+                )
+            )
+
+            with ThreadPoolExecutor(max_workers=1) as lookup_executor:
+                failed = self.__sync_issues(
+                    remaining,
+                    lambda issueId: checkpoint.mark_issue_done(shard_start, issueId),
+                    self.__window_lookups(remaining, lookup_executor)
+                    if self.reads_window() and len(remaining) > 1
+                    else None,
+                )
+
+            if self.propagate_deletions:
+                self.__propagate_deletions(
+                    {e.id: e.taskId for e in entries},
+                    togglEntriesByIssueId,
+                    shard_start,
+                    shard_end,
+                )
+
+            if failed == 0:
+                checkpoint.mark_shard_done(shard_start)
+
+        if checkpoint.is_finished:
+            checkpoint.remove()
+        else:
+            print(
+                colored(
+                    "Backfill not finished, run with --resume to continue"
+                    if checkpoint.path
+                    else "Backfill not finished (no --checkpoint to resume from)",
+                    Colors.IMPORTANT.value,
+                )
+            )
+
+        if self.mattermost:
+            self.mattermost.appendEntries(downloaded)
+
+        self.__summary()
+
+    def reads_window(self):
+        """
+        Checks if destination entries are read for all issues at once (one read of period
+        covering the toggl entries) instead of issue by issue, see Destination capabilities
+        """
+        return isinstance(self.api_helper, Destination) and self.api_helper.reads_window()
+
+    def is_unknown_issue(self, issueId):
+        """Checks if issue recently failed as not found or forbidden (see NegativeCache)"""
+        return (
+            self.negative_cache is not None
+            and self.negative_cache.get(self.api_helper.identity, issueId) is not None
+        )
+
+    def owns(self, issueId):
+        """Checks if issue belongs to shard of this node (see Shard)"""
+        return self.shard is None or self.shard.owns(issueId)
+
+    def write_workers(self):
+        """Number of issues (or orphans) written in parallel"""
+        if isinstance(self.api_helper, Destination) and not self.api_helper.concurrent_writes:
+            return 1
+        return self.controller.maximum
+
+    def download_days(self, days):
+        """Number of days to download, extended to whole aggregation buckets"""
+        return self.aggregation.extend_days(days) if self.aggregation else days
+
+    def __summary(self):
+        if self.outbox:
+            self.outbox.compact()
+
+        if self.deferred:
+            print(
+                colored(
+                    "Destination failing, {} issue(s) left for next run".format(self.deferred),
+                    Colors.ERROR.value,
+                )
+            )
+
+        if self.mattermost:
+            self.mattermost.append(
+                "**{}** inserted, **{}** updated, **{}** skipped".format(
+                    self.inserted, self.updated, self.skipped
+                )
+            )
+            if self.deleted:
+                self.mattermost.append(
+                    "**{}** removed (deleted or moved in toggl)".format(self.deleted)
+                )
+            if self.deferred:
+                self.mattermost.append(
+                    "**{}** issues left for next run (destination failing)".format(self.deferred)
+                )
+
+    def replay_outbox(self):
+        """Replays destination writes which failed or were interrupted in previous runs"""
+        if not self.outbox:
+            return
+
+        pending = self.outbox.pending(self.api_helper.identity)
+
+        if len(pending) == 0:
+            return
+
+        print("Replaying pending writes from outbox: {}".format(len(pending)))
+
+        toggl_ids_by_issue_id = {}
+
+        for record in pending:
+            data = record["data"]
+
+            try:
+                if record["op"] == "put":
+                    # insert could succeed before failure was reported
+                    issueId = data["issueId"]
+                    if issueId not in toggl_ids_by_issue_id:
+                        toggl_ids_by_issue_id[issueId] = set(
+                            e.toggl_id for e in self.__lookup(issueId)
+                        )
+
+                    if record["toggl_id"] in toggl_ids_by_issue_id[issueId]:
+                        print("\tAlready in destination: toggl#{}".format(record["toggl_id"]))
+                        self.outbox.done(record["key"])
+                        continue
 
-        if len(filteredEntries) == 0:
-            print("No entries with tracking id found. Nothing to do")
-            return 0
+                try:
+                    self.controller.call(getattr(self.api_helper, record["op"]), **data)
+                except Exception as exc:
+                    # entry is gone: nothing to delete, updated one is inserted again by sync
+                    if record["op"] not in ("delete", "update") or not ErrorHelper.is_not_found(exc):
+                        raise
 
-        togglEntriesByIssueId = Synchronizer.groupTogglByIssueId(filteredEntries)
+                print(
+                    colored(
+                        "\tReplayed {} of toggl#{}".format(record["op"], record["toggl_id"]),
+                        Colors.UPDATE.value,
+                    )
+                )
+                self.outbox.done(record["key"])
+            except Exception as exc:
+                if ErrorHelper.is_permanent(exc):
+                    print(
+                        colored(
+                            "\tReplay of {} of toggl#{} dropped: {}".format(
+                                record["op"], record["toggl_id"], str(exc)
+                            ),
+                            Colors.ERROR.value,
+                        )
+                    )
+                    self.outbox.fail(record["key"])
+                    continue
+
+                print(colored("\tReplay failed: {}".format(str(exc)), Colors.ERROR.value))
+                if self.raise_errors:
+                    raise
+
+        self.outbox.compact()
+        print()
+
+    def __write(self, op, toggl_id, **data):
+        """Sends write to destination, journaled in outbox (if enabled)"""
+        key = (
+            self.outbox.begin(self.api_helper.identity, op, toggl_id, data)
+            if self.outbox
+            else None
+        )
+
+        try:
+            self.controller.call(getattr(self.api_helper, op), **data)
+        finally:
+            self.read_cache.invalidate(self.api_helper.identity, data.get("issueId"))
+
+        if key:
+            self.outbox.done(key)
+
+    def __sync_issues(self, togglEntriesByIssueId, on_issue_done=None, lookups=None):
+        """
+        Synchronizes issues in parallel, as far as destination controller allows.
+        Destination entries already requested (future per issue id in `lookups`) are reused.
+        Returns number of issues which failed.
+        """
+        lookups = lookups if lookups is not None else {}
+
+        with ThreadPoolExecutor(max_workers=self.write_workers()) as executor:
+            futures = [
+                executor.submit(
+                    self.__sync_issue,
+                    issueId,
+                    togglEntries,
+                    on_issue_done,
+                    lookups.pop(issueId, None),
+                )
+                for issueId, togglEntries in togglEntriesByIssueId.items()
+            ]
 
-        for issueId in togglEntriesByIssueId:
             try:
-                destination_entries = list(self.api_helper.get(issueId))
-                filtered_destination_entries = [
-                    e for e in destination_entries if e.toggl_id is not None
-                ]
+                return len([f for f in futures if not f.result()])
+            except Exception:
+                for f in futures:
+                    f.cancel()
+                raise
+
+    def __lookup(self, issueId):
+        """Reads all destination entries of issue (once per run, see ReadCache)"""
+        return self.read_cache.get(
+            self.api_helper.identity,
+            issueId,
+            None,
+            lambda: self.__read(lambda: self.api_helper.get(issueId)),
+        )
+
+    def __lookup_window(self, start, end):
+        """Reads destination entries of current user in period"""
+        return self.read_cache.get(
+            self.api_helper.identity,
+            None,
+            (start, end),
+            lambda: self.__read(lambda: self.api_helper.get_range(start, end)),
+        )
+
+    def __window_lookups(self, togglEntriesByIssueId, executor):
+        """
+        Single read of destination entries in whole UTC days of the toggl entries (destination
+        days, see fingerprint), shared by all issues (future per issue id). When the read
+        fails, issues are read one by one (future result is None), so are issues with toggl
+        entries not found in the window (see covers).
+        """
+        days = [
+            self.api_helper.fingerprint(self.api_helper.dictFromTogglEntry(e))[1][:10]
+            for togglEntries in togglEntriesByIssueId.values()
+            for e in togglEntries
+        ]
 
+        def read():
+            try:
+                return self.__lookup_window(
+                    "{}T00:00:00+00:00".format(min(days)),
+                    "{}T23:59:59+00:00".format(max(days)),
+                )
+            except CircuitOpenError:
+                raise
+            except Exception as exc:
                 print(
-                    "Found entries in destination for issue {}: {} (with toggl id: {})".format(
-                        issueId,
-                        len(destination_entries),
-                        len(filtered_destination_entries),
+                    colored(
+                        "Bulk read failed, reading issue by issue: {}".format(str(exc)),
+                        Colors.IMPORTANT.value,
                     )
                 )
+                return None
+
+        window = executor.submit(read)
+
+        return dict((issueId, window) for issueId in togglEntriesByIssueId)
+
+    @staticmethod
+    def covers(destination_entries, issueId, togglEntries):
+        """
+        Checks if destination entries (of window read) track all toggl entries of issue,
+        otherwise the issue is read whole before anything is inserted
+        """
+        found = set()
+        for e in destination_entries:
+            if e.issue == str(issueId):
+                found |= e.toggl_ids
+
+        return all(e.id in found for e in togglEntries)
+
+    def __read(self, fetch):
+        with self.controller.slot():
+            return self.controller.call(lambda: list(fetch()))
+
+    def __propagate_deletions(
+        self, issue_by_toggl_id, togglEntriesByIssueId, start, end, window_lookup=None
+    ):
+        """
+        Removes destination entries (of current user, in period) whose toggl entry does not
+        exist anymore or belongs to another issue now (the new one is inserted by sync).
+        `issue_by_toggl_id` maps ids of all toggl entries in period to their issue ids.
+        Aggregated entries are removed when their bucket of the issue is empty now (or
+        aggregation is turned off).
+        """
+        if len(issue_by_toggl_id) == 0:
+            # most probably toggl returned nothing by mistake, don't wipe out destination
+            print("No entries in toggl, deletions are not propagated")
+            return
+
+        try:
+            destination_entries = (
+                window_lookup.result() if window_lookup else self.__lookup_window(start, end)
+            )
+        except Exception as exc:
+            print(colored("Deletions not propagated: {}".format(str(exc)), Colors.ERROR.value))
+            if self.raise_errors and not isinstance(exc, CircuitOpenError):
+                raise
+            return
+
+        buckets = set()
+        if self.aggregation:
+            buckets = set(
+                (str(issueId), self.aggregation.key(e))
+                for issueId, togglEntries in togglEntriesByIssueId.items()
+                for e in togglEntries
+            )
+
+        checked = [
+            (e, e.toggl_id in issue_by_toggl_id or self.__is_gone_from_period(e, start, end))
+            for e in destination_entries
+            if self.owns(e.issue) and Synchronizer.is_orphan(e, issue_by_toggl_id, buckets)
+        ]
+
+        # entries on UTC days covered by the period partially are checked by one download
+        edge_toggl_ids = (
+            self.__toggl_ids_of_utc_days(start, end)
+            if any(gone is None for _, gone in checked)
+            else None
+        )
+
+        orphans = [
+            e
+            for e, gone in checked
+            if gone
+            or (gone is None and edge_toggl_ids is not None and e.toggl_id not in edge_toggl_ids)
+        ]
+
+        print(
+            "Found entries in destination in period: {} (orphaned: {})".format(
+                len(destination_entries), len(orphans)
+            )
+        )
+
+        with ThreadPoolExecutor(max_workers=self.write_workers()) as executor:
+            futures = [
+                executor.submit(self.__remove_orphan, e, issue_by_toggl_id.get(e.toggl_id))
+                for e in orphans
+            ]
+            for f in futures:
+                f.result()
+
+        print()
+
+    def __is_gone_from_period(self, destination_entry, start, end):
+        """
+        Checks if toggl entry of orphan candidate belongs to toggl period from `start` till
+        `end`, so that its absence in toggl entries of the period means it is gone. Returns
+        None for entries tracking only UTC day (redmine) on days covered by the period
+        partially, their toggl entry may lie just outside of the period.
+        """
+        toggl_id = destination_entry.toggl_id
+
+        if isinstance(toggl_id, str):
+            # bucket key is local day
+            return start[:10] <= toggl_id <= end[:10]
+
+        when = self.api_helper.fingerprintFromEntry(destination_entry)[1]
+        if when is None:
+            return False
+
+        if len(when) > 10:
+            return (
+                dateutil.parser.parse(start)
+                <= dateutil.parser.parse(when)
+                <= dateutil.parser.parse(end)
+            )
+
+        days = DateTimeHelper.get_utc_days_within(start, end)
+        if days is not None and days[0] <= when <= days[1]:
+            return True
 
-                dest_entries_by_issue_id = Synchronizer.groupDestinationByIssueId(
-                    filtered_destination_entries
+        return None
+
+    def __toggl_ids_of_utc_days(self, start, end):
+        """Ids of toggl entries in whole UTC days overlapping the period, None if not read"""
+        first, last = DateTimeHelper.get_utc_days_overlapping(start, end)
+
+        try:
+            return set(
+                e.id
+                for e in self.toggl.get_range(
+                    "{}T00:00:00+00:00".format(first), "{}T23:59:59+00:00".format(last)
+                )
+            )
+        except Exception as exc:
+            print(
+                colored(
+                    "Entries of partially covered days not checked in toggl, kept: {}".format(
+                        str(exc)
+                    ),
+                    Colors.ERROR.value,
+                )
+            )
+            return None
+
+    @staticmethod
+    def is_orphan(destination_entry, issue_by_toggl_id, buckets):
+        toggl_id = destination_entry.toggl_id
+
+        if toggl_id is None:
+            return False
+
+        if isinstance(toggl_id, str):
+            # aggregated entry is tracked by its bucket
+            return (str(destination_entry.issue), toggl_id) not in buckets
+
+        return toggl_id not in issue_by_toggl_id or str(issue_by_toggl_id[toggl_id]) != str(
+            destination_entry.issue
+        )
+
+    def __remove_orphan(self, destination_entry, moved_to):
+        with self.controller.slot():
+            try:
+                self.__write(
+                    "delete",
+                    destination_entry.toggl_id,
+                    id=destination_entry.id,
+                    issueId=destination_entry.issue,
+                )
+            except Exception as exc:
+                if ErrorHelper.is_not_found(exc):
+                    return
+                print(colored(str(exc), Colors.ERROR.value))
+                if self.raise_errors and not isinstance(exc, CircuitOpenError):
+                    raise
+                return
+
+        print(
+            colored(
+                "\tRemoved in destination ({}): {}".format(
+                    "moved to {}".format(moved_to) if moved_to else "deleted in toggl",
+                    destination_entry,
+                ),
+                Colors.UPDATE.value,
+            )
+        )
+        self.__count("deleted")
+
+    def __sync_issue(self, issueId, togglEntries, on_issue_done=None, lookup=None):
+        if self.is_unknown_issue(issueId):
+            print(
+                "Skipped {}: not found or forbidden in destination (cached, see --purge-unknown-issues)".format(
+                    issueId
+                )
+            )
+            if on_issue_done:
+                on_issue_done(issueId)
+            return True
+
+        reading = True
+
+        try:
+            destination_entries = lookup.result() if lookup else None
+            if destination_entries is not None and not Synchronizer.covers(
+                destination_entries, issueId, togglEntries
+            ):
+                # new entries, or ones outside of the window (day moved in toggl or destination)
+                destination_entries = None
+            if destination_entries is None:
+                destination_entries = self.__lookup(issueId)
+
+            reading = False
+
+            destination_entries = [e for e in destination_entries if e.issue == str(issueId)]
+            filtered_destination_entries = [
+                e for e in destination_entries if e.toggl_id is not None
+            ]
+
+            print(
+                "Found entries in destination for issue {}: {} (with toggl id: {})".format(
+                    issueId,
+                    len(destination_entries),
+                    len(filtered_destination_entries),
                 )
+            )
+
+            dest_entries_by_issue_id = Synchronizer.groupDestinationByIssueId(
+                filtered_destination_entries
+            )
 
+            with self.controller.slot():
                 self.__sync(
                     issueId,
-                    togglEntriesByIssueId[issueId],
+                    togglEntries,
                     dest_entries_by_issue_id[issueId]
                     if dest_entries_by_issue_id is not None
                     and issueId in dest_entries_by_issue_id
                     else None,
                 )
-            except Exception as exc:
-                print(colored(str(exc), Colors.ERROR.value))
-                if self.raise_errors:
-                    # traceback.print_exc()
-                    raise
-
-        if self.mattermost:
-            self.mattermost.append(
-                "**{}** inserted, **{}** updated, **{}** skipped".format(
-                    self.inserted, self.updated, self.skipped
-                )
+        except CircuitOpenError as exc:
+            print(colored("{}: {}".format(issueId, str(exc)), Colors.IMPORTANT.value))
+            self.__count("deferred")
+            return False
+        except Exception as exc:
+            print(colored(str(exc), Colors.ERROR.value))
+            # failed write of single entry (eg. locked or foreign one) doesn't make issue unknown
+            unknown = (
+                ErrorHelper.is_unknown_issue(exc) if reading else ErrorHelper.is_invalid_issue(exc)
             )
+            if self.negative_cache is not None and unknown:
+                self.negative_cache.add(
+                    self.api_helper.identity, issueId, ErrorHelper.status(exc)
+                )
+            if self.raise_errors:
+                # traceback.print_exc()
+                raise
+            return False
+
+        if on_issue_done:
+            on_issue_done(issueId)
+
+        return True
+
+    def __count(self, counter):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
 
     @staticmethod
     def groupTogglByIssueId(togglEntries):
@@ -124,124 +863,286 @@ class Synchronizer:
     def __sync(self, issueId, togglEntries, existingDestinationEntries):
         print("Synchronizing {}".format(issueId))
 
+        diff = self._diff_aggregated if self.aggregation else self._diff
+
+        for op, togglEntry, destination_entries, data in diff(
+            togglEntries, existingDestinationEntries
+        ):
+            if op == "remove":
+                self.__remove_entries_in_destination(destination_entries)
+            elif op == "insert":
+                self.__insert_entry_in_destination(togglEntry, data)
+            elif op == "skip":
+                print("\tUp to date: {}".format(togglEntry))
+                self.__count("skipped")
+            elif op == "update":
+                self.__update_entry_in_destination(togglEntry, destination_entries[0], data)
+            else:
+                self.__repair_duplicates(togglEntry, destination_entries, data)
+
+        print()
+
+    def _diff(self, togglEntries, existingDestinationEntries):
+        """
+        Yields operation for every toggl entry: (op, toggl entry, destination entries
+        with its toggl id, destination payload), op is one of "insert", "skip", "update"
+        or "replace" (for duplicates). Aggregated destination entries covering any of
+        toggl entries are removed first ("remove").
+        """
+        dest_entries_by_toggl_id = {}
+        for e in existingDestinationEntries or []:
+            dest_entries_by_toggl_id.setdefault(e.toggl_id, []).append(e)
+
+        ids = set([e.id for e in togglEntries])
+        aggregated = [
+            e
+            for e in existingDestinationEntries or []
+            if isinstance(e.toggl_id, str) and e.toggl_ids & ids
+        ]
+        if aggregated:
+            yield "remove", None, aggregated, None
+
         for togglEntry in togglEntries:
-            dest_entries_by_toggl_id = (
-                [e for e in existingDestinationEntries if e.toggl_id == togglEntry.id]
-                if existingDestinationEntries is not None
-                else []
-            )
+            destination_entries = dest_entries_by_toggl_id.get(togglEntry.id, [])
+            data = self.api_helper.dictFromTogglEntry(togglEntry)
 
-            if len(dest_entries_by_toggl_id) == 0:
+            if len(destination_entries) == 0:
                 # no entry in destination found, should insert
-                self.__insert_entry_in_destination(togglEntry)
-            elif len(dest_entries_by_toggl_id) == 1:
-                # if single found, try update
-                self.__update_entry_in_destination(
-                    togglEntry, dest_entries_by_toggl_id[0]
-                )
+                yield "insert", togglEntry, destination_entries, data
+            elif len(destination_entries) > 1:
+                yield "replace", togglEntry, destination_entries, data
+            elif self._equal(togglEntry, destination_entries[0], data):
+                yield "skip", togglEntry, destination_entries, data
             else:
-                # if more found, remove all entries and insert new one
-                self.__remove_entries_in_destination(dest_entries_by_toggl_id)
-                self.__insert_entry_in_destination(togglEntry)
+                yield "update", togglEntry, destination_entries, data
 
-        print()
+    def _diff_aggregated(self, togglEntries, existingDestinationEntries):
+        """
+        Same as _diff, for toggl entries aggregated per bucket. Aggregated destination
+        entry is updated only when its total (or set of covered toggl entries) changes,
+        single destination entries of covered toggl entries are replaced.
+        """
+        dest_entries_by_toggl_id = {}
+        for e in existingDestinationEntries or []:
+            dest_entries_by_toggl_id.setdefault(e.toggl_id, []).append(e)
+
+        aggregated = self.aggregation.aggregate(togglEntries)
+
+        # buckets covering too many toggl entries for one marker are kept as single entries
+        singleEntries = [e for e in aggregated if not isinstance(e, AggregatedTogglEntry)]
+        if singleEntries:
+            keys = set(self.aggregation.key(e) for e in singleEntries)
+            oversized = [e for e in existingDestinationEntries or [] if e.toggl_id in keys]
+            if oversized:
+                yield "remove", None, oversized, None
+
+            for op in self._diff(
+                singleEntries,
+                [e for e in existingDestinationEntries or [] if not isinstance(e.toggl_id, str)],
+            ):
+                yield op
 
-    def __insert_entry_in_destination(self, togglEntry):
+        for bucketEntry in [e for e in aggregated if isinstance(e, AggregatedTogglEntry)]:
+            destination_entries = dest_entries_by_toggl_id.get(bucketEntry.id, [])
+            singles = [
+                e for toggl_id in sorted(bucketEntry.ids) for e in dest_entries_by_toggl_id.get(toggl_id, [])
+            ]
+            data = self.api_helper.dictFromTogglEntry(bucketEntry)
+
+            if singles or len(destination_entries) > 1:
+                yield "replace", bucketEntry, destination_entries + singles, data
+            elif len(destination_entries) == 0:
+                yield "insert", bucketEntry, destination_entries, data
+            elif self._equal_aggregated(bucketEntry, destination_entries[0], data):
+                yield "skip", bucketEntry, destination_entries, data
+            else:
+                yield "update", bucketEntry, destination_entries, data
+
+    def _equal_aggregated(self, bucketEntry, destination_entry, data):
+        """Compares fingerprints wo/ comment (descriptions may be truncated) and covered toggl ids"""
+        fields = self.api_helper.fingerprint_fields
+        toggl_fingerprint = self.api_helper.fingerprint(data)
+        destination_fingerprint = self.api_helper.fingerprintFromEntry(destination_entry)
+
+        return destination_entry.toggl_ids == bucketEntry.ids and all(
+            t == d
+            for field, t, d in zip(fields, toggl_fingerprint, destination_fingerprint)
+            if field != "comment"
+        )
+
+    def __insert_entry_in_destination(self, togglEntry, data):
         print(colored("\tInserting into destination: {}".format(togglEntry), Colors.ADD.value))
-        data = self.api_helper.dictFromTogglEntry(togglEntry)
-        self.api_helper.put(**data)
-        self.inserted += 1
-
-    def __update_entry_in_destination(self, togglEntry, existing_destination_entry):
-        if self._equal(togglEntry, existing_destination_entry):
-            print("\tUp to date: {}".format(togglEntry))
-            self.skipped += 1
+        self.__write("put", togglEntry.id, **data)
+        self.__count("inserted")
+
+    def __update_entry_in_destination(self, togglEntry, existing_destination_entry, data):
+        print(colored("\tEntry changed, updating in destination: {}".format(togglEntry), Colors.UPDATE.value))
+        self.__write(
+            "update", togglEntry.id, id=existing_destination_entry.id, **data
+        )
+        self.__count("updated")
+
+    def __repair_duplicates(self, togglEntry, destination_entries, data):
+        """
+        More destination entries found for toggl entry (or bucket): the best matching one is
+        kept (updated only when it differs), the others are removed
+        """
+        keep = self._best_match(togglEntry, destination_entries, data)
+
+        self.__remove_entries_in_destination([e for e in destination_entries if e is not keep])
+
+        equal = (
+            self._equal_aggregated
+            if isinstance(togglEntry, AggregatedTogglEntry)
+            else self._equal
+        )
+        if equal(togglEntry, keep, data):
+            print("\tUp to date (duplicates removed): {}".format(togglEntry))
+            self.__count("skipped")
         else:
-            print(colored("\tEntry changed, updating in destination: {}".format(togglEntry), Colors.UPDATE.value))
-            data = self.api_helper.dictFromTogglEntry(togglEntry)
-            self.api_helper.update(id=existing_destination_entry.id, **data)
-            self.updated += 1
+            self.__update_entry_in_destination(togglEntry, keep, data)
+
+    def _best_match(self, togglEntry, destination_entries, data):
+        """
+        Destination entry with the most fields equal to toggl entry payload, entries tracking
+        the toggl entry itself (not single entries covered by bucket) first, ties broken by
+        the lowest destination id so every run keeps the same entry whatever the read order
+        """
+        toggl_fingerprint = self.api_helper.fingerprint(data)
+
+        def score(e):
+            destination_fingerprint = self.api_helper.fingerprintFromEntry(e)
+            return (
+                sum(1 for t, d in zip(toggl_fingerprint, destination_fingerprint) if t == d),
+                e.toggl_id == togglEntry.id,
+            )
+
+        return max(sorted(destination_entries, key=Synchronizer._id_order), key=score)
+
+    @staticmethod
+    def _id_order(e):
+        # jira worklog ids are numeric strings, order them as numbers
+        try:
+            return (0, int(e.id))
+        except (TypeError, ValueError):
+            return (1, str(e.id))
 
     def __remove_entries_in_destination(self, destination_entries):
-        for e in destination_entries:
-            self.api_helper.delete(e.id)
+        def remove(e):
+            self.__write("delete", e.toggl_id, id=e.id, issueId=e.issue)
             print(colored("\tRemoved in destination: {}".format(e), Colors.UPDATE.value))
 
-    def _equal(self, toggl_entry, destination_entry):
-        togglEntryDict = self.api_helper.dictFromTogglEntry(toggl_entry)
+        if len(destination_entries) < 2 or self.write_workers() == 1:
+            for e in destination_entries:
+                remove(e)
+            return
 
-        if togglEntryDict["issueId"] != destination_entry.issue:
-            print(
-                '\tentries not equal, issueId: "{}" vs "{}"'.format(
-                    togglEntryDict["issueId"], destination_entry.issue
-                )
-            )
-            return False
+        with ThreadPoolExecutor(
+            max_workers=min(len(destination_entries), self.write_workers())
+        ) as executor:
+            for f in [executor.submit(remove, e) for e in destination_entries]:
+                f.result()
 
-        # when comapring by seconds, accuracy has to be rounded to minutes
-        # Jira API rounds/truncates to minutes event though data is provided in seconds
-        if "seconds" in togglEntryDict and not self._eq_to_minutes(
-            togglEntryDict["seconds"], destination_entry.seconds
-        ):
-            print(
-                '\tentries not equal, seconds (accuracy to minutes): "{}" vs "{}"'.format(
-                    togglEntryDict["seconds"], destination_entry.seconds
-                )
-            )
-            return False
+    def _equal(self, toggl_entry, destination_entry, data=None):
+        """
+        Compares canonical fingerprints of destination payload built from toggl entry
+        and of existing destination entry. Field diff is printed only in verbose mode.
+        """
+        if data is None:
+            data = self.api_helper.dictFromTogglEntry(toggl_entry)
 
-        if "started" in togglEntryDict and not self._eq_datetime_str(
-            togglEntryDict["started"], destination_entry.spent_on
-        ):
-            print(
-                '\tentries not equal, started: "{}" vs "{}"'.format(
-                    togglEntryDict["started"], destination_entry.spent_on
-                )
-            )
-            return False
+        toggl_fingerprint = self.api_helper.fingerprint(data)
+        destination_fingerprint = self.api_helper.fingerprintFromEntry(destination_entry)
 
-        if (
-            "spentOn" in togglEntryDict
-            and togglEntryDict["spentOn"] != destination_entry.spent_on
-        ):
-            print(
-                '\tentries not equal, spentOn: "{}" vs "{}"'.format(
-                    togglEntryDict["spentOn"], destination_entry.spent_on
-                )
-            )
-            return False
+        if toggl_fingerprint == destination_fingerprint:
+            return True
 
-        if (
-            "hours" in togglEntryDict
-            and togglEntryDict["hours"] != destination_entry.hours
-        ):
-            print(
-                '\tentries not equal, hours: "{}" vs "{}"'.format(
-                    togglEntryDict["hours"], destination_entry.hours
-                )
-            )
-            return False
+        if self.verbose:
+            for field, toggl_value, destination_value in zip(
+                self.api_helper.fingerprint_fields,
+                toggl_fingerprint,
+                destination_fingerprint,
+            ):
+                if toggl_value != destination_value:
+                    print(
+                        '\tentries not equal, {}: "{}" vs "{}"'.format(
+                            field, toggl_value, destination_value
+                        )
+                    )
 
-        if togglEntryDict["comment"] != destination_entry.comments:
-            print(
-                '\tentries not equal, comment: "{}" vs "{}"'.format(
-                    togglEntryDict["comment"], destination_entry.comments
-                )
-            )
-            return False
+        return False
 
-        return True
 
-    @staticmethod
-    def _eq_to_minutes(source_seconds, target_seconds):
-        return abs(source_seconds - target_seconds) < 60
+class FanOutSynchronizer:
+    """
+    Synchronizes config entry with several destinations: toggl entries are downloaded
+    and parsed once, then every entry is matched with task patterns of each destination
+    and fed to its synchronizer. Destinations are synchronized concurrently.
+    """
 
-    @staticmethod
-    def _eq_datetime_str(source_time: str, target_time: str):
-        # comparing wo/ microseconds
-        source = dateutil.parser.parse(source_time).replace(microsecond=0)
-        target = dateutil.parser.parse(target_time).replace(microsecond=0)
-        return source == target
+    def __init__(self, toggl, synchronizers, mattermost=None):
+        self.toggl = toggl
+        self.synchronizers = synchronizers
+        self.mattermost = mattermost
+
+        # destinations run concurrently, their reports would interleave
+        for s in synchronizers:
+            s.mattermost = None
+
+    def start(self, days):
+        if days < 0:
+            raise Exception("Invalid days: {}".format(days))
+
+        # aggregating destinations may need longer period
+        days = max([s.download_days(days) for s in self.synchronizers])
+
+        entries = [] if self.mattermost else None
+
+        def download():
+            for entry in self.toggl.get(days):
+                if entries is not None:
+                    entries.append(entry)
+                yield entry
+
+        broadcast = Broadcast(
+            download(),
+            [
+                (lambda entry, destination=s.toggl.config_entry: entry.forConfigEntry(destination))
+                for s in self.synchronizers
+            ],
+            Synchronizer.queue_size,
+        )
+
+        def run(i, synchronizer, stream):
+            try:
+                synchronizer.start(days, stream)
+            finally:
+                broadcast.close(i)
+
+        with ThreadPoolExecutor(max_workers=len(self.synchronizers)) as executor:
+            futures = [
+                executor.submit(run, i, s, stream)
+                for i, (s, stream) in enumerate(zip(self.synchronizers, broadcast.streams))
+            ]
+
+            for f in futures:
+                f.result()
+
+        if self.mattermost:
+            self.mattermost.appendDuration(days)
+            self.mattermost.appendEntries(entries)
+
+            for s in self.synchronizers:
+                summary = "{}: **{}** inserted, **{}** updated, **{}** skipped".format(
+                    s.toggl.config_entry.label, s.inserted, s.updated, s.skipped
+                )
+                if s.deleted:
+                    summary += ", **{}** removed (deleted or moved in toggl)".format(s.deleted)
+                if s.deferred:
+                    summary += ", **{}** issues left for next run (destination failing)".format(
+                        s.deferred
+                    )
+                self.mattermost.append(summary)
 
 
 class ApiHelperFactory:
@@ -258,7 +1159,7 @@ class ApiHelperFactory:
             return os.environ["TOGGL_JIRA_PASS"]
         else:
             jira_pass = getpass(
-                prompt="Jira password [{}]:".format(config_entry.jira_username)
+                prompt="Jira password [{}]:".format(self.config_entry.jira_username)
             )
             self.pass_cache[self.config_entry.jira_username] = jira_pass
             return jira_pass
@@ -266,12 +1167,12 @@ class ApiHelperFactory:
     def create(self):
         if self.config_entry.redmine_api_key:
             return RedmineHelper(
-                config.redmine, config_entry.redmine_api_key, args.simulation
+                config.redmine, self.config_entry.redmine_api_key, args.simulation
             )
-        elif config_entry.jira_url:
+        elif self.config_entry.jira_url:
             return JiraHelper(
-                config_entry.jira_url,
-                config_entry.jira_username,
+                self.config_entry.jira_url,
+                self.config_entry.jira_username,
                 self.jira_pass,
                 args.simulation,
             )
@@ -295,6 +1196,154 @@ if __name__ == "__main__":
     parser.add_argument("-d", "--days", help="Days to sync", type=int, default=0)
     parser.add_argument("-v", "--version", help="Prints version", action="store_true")
     parser.add_argument("--errors", help="Break execution on error", action="store_true")
+    parser.add_argument("--verbose", help="Prints field diff of changed entries", action="store_true")
+    parser.add_argument(
+        "--outbox",
+        help="Journal of destination writes (eg. outbox.jsonl), failed writes are replayed on next run",
+    )
+    parser.add_argument(
+        "--backfill",
+        help="Synchronizes the period shard by shard (oldest first) with checkpoints, eg. for long periods",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--resume",
+        help="Continues interrupted backfill from its checkpoint",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--shard-days",
+        help="Days of a backfill shard",
+        type=int,
+        default=7,
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="Backfill checkpoint file (eg. checkpoint.json), interrupted backfill is continued from it with --resume",
+    )
+    parser.add_argument(
+        "--delete-orphans",
+        help="Removes destination entries whose toggl entry was deleted or moved to another issue",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--from-file",
+        help="Reads toggl entries from toggl export (detailed report csv or json) instead of toggl api, --days is ignored",
+    )
+    parser.add_argument(
+        "--processes",
+        help="Number of processes parsing big export files (--from-file), defaults to number of cpus",
+        type=int,
+    )
+    parser.add_argument(
+        "--audit",
+        help="Only compares toggl and destination totals per issue and day (no synchronization)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--replay",
+        help="Only replays failed writes from --outbox (no synchronization)",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--entry",
+        help="Synchronizes only given toggl entry (by id)",
+        type=int,
+    )
+    parser.add_argument(
+        "--issue",
+        help="Synchronizes only toggl entries of given issue (in --days)",
+    )
+    parser.add_argument(
+        "--unknown-issues",
+        help="Cache of issue ids not found or forbidden in destination (eg. unknown_issues.json), skipped without a call",
+    )
+    parser.add_argument(
+        "--unknown-issues-ttl",
+        help="Days after which cached unknown issue ids are tried again",
+        type=float,
+        default=7,
+    )
+    parser.add_argument(
+        "--purge-unknown-issues",
+        help="Forgets given (or all) issue ids cached in --unknown-issues before synchronization",
+        nargs="*",
+        metavar="ISSUE",
+    )
+    parser.add_argument(
+        "--record-http",
+        help="Records HTTP exchanges of the run to cassette file (credentials scrubbed, .gz for gzipped)",
+    )
+    parser.add_argument(
+        "--replay-http",
+        help="Replays HTTP exchanges from cassette file instead of calling servers",
+    )
+    parser.add_argument(
+        "--http-timing",
+        help="Scale of recorded response times on --replay-http (0 answers immediately)",
+        type=float,
+        default=1.0,
+    )
+
+    parser.add_argument(
+        "--shard",
+        help="Synchronizes only shard i of n (i from 0), for running on several nodes",
+    )
+    parser.add_argument(
+        "--shard-by",
+        help="What is split between shards: issues or whole config entries",
+        choices=["issue", "entry"],
+        default="issue",
+    )
+    parser.add_argument(
+        "--shard-report",
+        help="Saves counters of the run to json file, reports of all shards are merged with togglsync/sharding.py",
+    )
+
+    parser.add_argument(
+        "--queue",
+        help="Work queue (sqlite file) shared by workers, units are config entry x issue",
+    )
+    parser.add_argument(
+        "--produce",
+        help="Only puts issues of --days to --queue (no synchronization)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--work",
+        help="Only synchronizes issues leased from --queue until it is empty",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--queue-lease",
+        help="Seconds after which unit leased by dead worker is leased again",
+        type=int,
+        default=300,
+    )
+    parser.add_argument(
+        "--queue-workers",
+        help="Number of units synchronized in parallel by this worker",
+        type=int,
+        default=1,
+    )
+
+    parser.add_argument(
+        "--lease-store",
+        help="Leases of config entries (sqlite file, eg. leases.db, on shared disk for several nodes), so overlapping runs skip entries being synchronized",
+    )
+    parser.add_argument(
+        "--lease-ttl",
+        help="Seconds after which lease of crashed run expires",
+        type=int,
+        default=600,
+    )
+    parser.add_argument(
+        "--lease-wait",
+        help="Seconds to wait for config entry leased by another run before skipping it",
+        type=int,
+        default=0,
+    )
 
     args = parser.parse_args()
 
@@ -307,23 +1356,185 @@ if __name__ == "__main__":
 
     # print("Found api key pairs: {}".format(len(config.entries)))
 
+    if args.record_http:
+        atexit.register(Cassette(args.record_http, config.secrets()).record().stop)
+    elif args.replay_http:
+        atexit.register(
+            Cassette.load(args.replay_http, config.secrets(), args.http_timing).replay().stop
+        )
+
+    if args.resume and not args.checkpoint:
+        raise Exception("--resume needs --checkpoint of interrupted backfill")
+
+    if args.replay and not args.outbox:
+        raise Exception("--replay needs --outbox with failed writes")
+
+    # no writes are made in simulation, so nothing to journal
+    outbox = Outbox(args.outbox) if args.outbox and not args.simulation else None
+    # destination reads are shared by config entries pointing to the same server and user
+    read_cache = ReadCache()
+
+    negative_cache = (
+        NegativeCache(args.unknown_issues, args.unknown_issues_ttl) if args.unknown_issues else None
+    )
+
+    if args.purge_unknown_issues is not None and negative_cache is None:
+        raise Exception("--purge-unknown-issues needs --unknown-issues cache")
+
+    if negative_cache is not None and args.purge_unknown_issues is not None:
+        print(
+            "Purged unknown issue ids: {}".format(
+                negative_cache.purge(args.purge_unknown_issues or None)
+            )
+        )
+
     mattermost = None
 
     if config.mattermost:
         runner = RequestsRunner.fromConfig(config.mattermost)
         mattermost = MattermostNotifier(runner, args.simulation)
 
+    # team mode: one workspace report read with admin token, shared by all team members
+    team_reports = TogglReports.fromConfig(config.team) if config.team else None
+
+    def create_toggl(entry):
+        if args.from_file:
+            return TogglFileHelper(args.from_file, entry, args.processes)
+        if team_reports is not None and entry.toggl_user_id is not None:
+            return TogglTeamHelper(team_reports, entry, config.toggl)
+        return TogglHelper(config.toggl, entry)
+
+    def shared_entries(config_entry, synchronizers):
+        """
+        Toggl entries of --days downloaded once for all destinations of config entry, as
+        function returning them matched for given synchronizer (None downloads on its own)
+        """
+        if len(synchronizers) < 2:
+            return lambda sync: None
+
+        entries = list(
+            create_toggl(config_entry).get(max(s.download_days(args.days) for s in synchronizers))
+        )
+        return lambda sync: [e.forConfigEntry(sync.toggl.config_entry) for e in entries]
+
+    if args.from_file and args.delete_orphans:
+        print("Deletions are not propagated from export files")
+
+    def destination_key(destination):
+        """Destination server and user of config entry (identity of its api helper)"""
+        if destination.redmine_api_key:
+            return ("redmine", config.redmine, destination.redmine_api_key)
+        return ("jira", destination.jira_url, destination.jira_username)
+
+    # entries written by other config entries of the same destination user would look like
+    # orphans, so deletions are propagated only to destination users of single config entry
+    destination_keys = [
+        destination_key(d) for entry in config.entries for d in entry.destinations or [entry]
+    ]
+    shared_destinations = set(k for k in destination_keys if destination_keys.count(k) > 1)
+
+    shard = Shard.parse(args.shard) if args.shard else None
+    issue_shard = shard if args.shard_by == "issue" else None
+    report = ShardReport(shard)
+
+    queue = WorkQueue(args.queue, args.queue_lease) if args.queue else None
+    # without --produce or --work the run does both
+    produce = queue is not None and (args.produce or not args.work)
+    work = queue is not None and (args.work or not args.produce)
+    # synchronizers by config entry label, for queue worker
+    queue_synchronizers = {}
+
+    # workers of a queue share config entries on purpose, audit makes no changes
+    leases = (
+        LeaseStore(args.lease_store)
+        if args.lease_store and not (queue is not None and not produce) and not args.audit
+        else None
+    )
+    lease = None
+    # all synchronizers of the run, for shard report
+    ran = []
+
     for config_entry in config.entries:
+        if shard and args.shard_by == "entry" and not shard.owns(config_entry.label):
+            print("Skipped {}: not in shard {}".format(config_entry.label, shard))
+            continue
+
+        if lease is not None:
+            lease.release()
+            lease = None
+
+        if leases is not None:
+            key = "{} [shard {}]".format(config_entry.label, issue_shard) if issue_shard else config_entry.label
+            lease = leases.hold(key, args.lease_ttl, args.lease_wait)
+            if lease is None:
+                print(
+                    colored(
+                        "Skipped {}: synchronized by another run ({})".format(
+                            config_entry.label, (leases.holder(key) or ["?"])[0]
+                        ),
+                        Colors.IMPORTANT.value,
+                    )
+                )
+                continue
+            atexit.register(lease.release)
+
         print("Synchronization for {} ...".format(config_entry.label))
         print("---")
-        toggl = TogglHelper(config.toggl, config_entry)
-        api_helper = ApiHelperFactory(config_entry).create()
-        if not api_helper:
-            print(
-                "Can't interpret config to destination API - entry: {}".format(
-                    config_entry.label
+
+        synchronizers = []
+
+        for destination in config_entry.destinations or [config_entry]:
+            api_helper = ApiHelperFactory(destination).create()
+            if not api_helper:
+                print(
+                    "Can't interpret config to destination API - entry: {}".format(
+                        destination.label
+                    )
+                )
+                continue
+
+            propagate_deletions = args.delete_orphans and not args.from_file
+            if propagate_deletions and destination_key(destination) in shared_destinations:
+                print(
+                    colored(
+                        "Deletions are not propagated for {}: destination user is shared with another config entry".format(
+                            destination.label
+                        ),
+                        Colors.IMPORTANT.value,
+                    )
+                )
+                propagate_deletions = False
+
+            synchronizers.append(
+                Synchronizer(
+                    config,
+                    api_helper,
+                    create_toggl(destination),
+                    mattermost,
+                    raise_errors=args.errors,
+                    verbose=args.verbose,
+                    controller=DestinationController.forUrl(
+                        api_helper.url, config.concurrency
+                    ),
+                    outbox=outbox,
+                    propagate_deletions=propagate_deletions,
+                    aggregation=Aggregation(destination.aggregate)
+                    if destination.aggregate
+                    else None,
+                    read_cache=read_cache,
+                    negative_cache=negative_cache,
+                    shard=issue_shard,
                 )
             )
+
+        if not synchronizers:
+            continue
+
+        ran.extend(synchronizers)
+
+        if args.audit:
+            for sync in synchronizers:
+                Auditor(sync.api_helper, sync.toggl, sync.aggregation).audit(args.days)
             continue
 
         if mattermost != None:
@@ -333,8 +1544,77 @@ if __name__ == "__main__":
             mattermost.append("---")
             mattermost.append("")
 
-        sync = Synchronizer(config, api_helper, toggl, mattermost, raise_errors=args.errors)
-        sync.start(args.days)
+        if args.replay:
+            for sync in synchronizers:
+                sync.replay_outbox()
+            continue
+
+        if args.entry is not None:
+            togglEntry = create_toggl(config_entry).get_entry(args.entry)
+            for sync in synchronizers:
+                sync.sync_entry(
+                    togglEntry.forConfigEntry(sync.toggl.config_entry) if togglEntry else None
+                )
+            continue
+
+        if queue is not None:
+            if produce:
+                entries = shared_entries(config_entry, synchronizers)
+                for sync in synchronizers:
+                    sync.enqueue(queue, args.days, entries(sync))
+            if work:
+                for sync in synchronizers:
+                    queue_synchronizers[sync.toggl.config_entry.label] = sync
+            continue
+
+        if args.issue:
+            entries = shared_entries(config_entry, synchronizers)
+            for sync in synchronizers:
+                sync.sync_issue(args.issue, args.days, entries(sync))
+            continue
+
+        if len(synchronizers) > 1 and (args.from_file or not (args.backfill or args.resume)):
+            FanOutSynchronizer(
+                create_toggl(config_entry), synchronizers, mattermost
+            ).start(args.days)
+            continue
+
+        # backfills (and single destination) are run destination by destination
+        for sync in synchronizers:
+            label = sync.toggl.config_entry.label
+            if issue_shard:
+                # nodes of other shards may share the checkpoint file
+                label = "{} [shard {}]".format(label, issue_shard)
+
+            checkpoint = Checkpoint.load(args.checkpoint, label) if args.resume else None
+
+            if args.resume and checkpoint is None:
+                print("No checkpoint found for {}".format(label))
+
+            if args.from_file:
+                sync.start(args.days)
+            elif checkpoint is not None or args.backfill:
+                sync.backfill(
+                    args.days,
+                    checkpoint or Checkpoint(args.checkpoint, label),
+                    args.shard_days,
+                )
+            else:
+                sync.start(args.days)
+
+    if lease is not None:
+        lease.release()
+
+    if work:
+        QueueWorker(queue, queue_synchronizers).run(args.queue_workers)
+
+    if queue is not None:
+        print("Queue: {}".format(", ".join("{} {}".format(v, k) for k, v in sorted(queue.stats().items()))))
+
+    if args.shard_report:
+        for sync in ran:
+            report.add(sync.toggl.config_entry.label, sync)
+        report.save(args.shard_report)
 
     if mattermost != None:
         mattermost.send()
@@ -0,0 +1,203 @@
+import unittest
+from datetime import date, datetime, timedelta
+
+import dateutil.tz
+
+from togglsync.aggregation import Aggregation
+from togglsync.config import Entry
+from togglsync.jira_wrapper import JiraTimeEntry
+from togglsync.redmine_wrapper import RedmineHelper, RedmineTimeEntry
+from togglsync.tests.fake_server_fixtures import FakeServerMixin, JiraDestination, RedmineDestination
+from togglsync.toggl import TogglEntry
+
+
+class AggregationTests(unittest.TestCase):
+    config = Entry("test", task_patterns=["(#)([0-9]{1,})"])
+
+    def entry(self, id, start, duration=600, description="#1 pomodoro"):
+        return TogglEntry(None, duration, start, id, description, self.config)
+
+    def test_ids_round_trip(self):
+        ids = {3050000017, 3050000001, 3050123456, 42}
+
+        encoded = Aggregation.encode_ids(ids)
+
+        self.assertEqual(ids, Aggregation.decode_ids(encoded))
+        self.assertEqual(encoded, Aggregation.encode_ids(sorted(ids, reverse=True)))
+
+    def test_marker_parse(self):
+        marker = Aggregation.marker("2020-01-31", [10, 20])
+
+        self.assertEqual(("2020-01-31", {10, 20}), Aggregation.parse("work; more " + marker))
+        self.assertIsNone(Aggregation.parse("work [toggl#10]"))
+        self.assertIsNone(Aggregation.parse(None))
+
+    def test_aggregate_per_issue_and_day(self):
+        start = datetime(2020, 1, 31, 10, tzinfo=dateutil.tz.tzlocal())
+        entries = [
+            self.entry(1, start.isoformat()),
+            self.entry(2, (start + timedelta(hours=1)).isoformat(), description="#1 review"),
+            self.entry(3, (start + timedelta(hours=2)).isoformat()),
+            self.entry(4, (start + timedelta(days=1)).isoformat()),
+            self.entry(5, start.isoformat(), description="#2 other"),
+        ]
+
+        aggregated = Aggregation("day").aggregate(entries)
+
+        self.assertEqual(
+            [("2020-01-31", "1", {1, 2, 3}, 1800), ("2020-01-31", "2", {5}, 600), ("2020-02-01", "1", {4}, 600)],
+            [(e.id, e.taskId, e.ids, e.duration) for e in aggregated],
+        )
+        self.assertEqual("#1 pomodoro; #1 review", aggregated[0].description)
+        self.assertEqual(entries[0].start, aggregated[0].start)
+
+    def test_description_truncated(self):
+        start = datetime(2020, 1, 31, 10, tzinfo=dateutil.tz.tzlocal())
+        entries = [
+            self.entry(i, start.isoformat(), description="#1 task {}".format("x" * i)) for i in range(1, 40)
+        ]
+
+        data = RedmineHelper.dictFromTogglEntry(Aggregation("day").aggregate(entries)[0])
+
+        self.assertLessEqual(len(data["comment"]), Aggregation.max_comment)
+        self.assertEqual(set(range(1, 40)), RedmineTimeEntry.findToggleIds(data["comment"]))
+
+    def test_bucket_with_long_marker_kept_as_single_entries(self):
+        start = datetime(2020, 1, 31, 10, tzinfo=dateutil.tz.tzlocal())
+        entries = [
+            self.entry(3050000000 + i * 7919993, (start + timedelta(minutes=i)).isoformat())
+            for i in range(60)
+        ] + [self.entry(1, start.isoformat(), description="#2 other")]
+
+        aggregated = Aggregation("day").aggregate(entries)
+
+        self.assertGreater(len(Aggregation.marker("2020-01-31", [e.id for e in entries[:60]])), Aggregation.max_marker)
+        self.assertEqual(61, len(aggregated))
+        self.assertEqual(entries[:60], aggregated[:60])
+        self.assertEqual("2020-01-31", aggregated[60].id)
+
+    def test_week_bucket(self):
+        aggregation = Aggregation("week")
+        start = datetime(2020, 1, 31, 10, tzinfo=dateutil.tz.tzlocal())  # friday
+
+        self.assertEqual("2020-01-27", aggregation.key(self.entry(1, start.isoformat())))
+        # from friday 2 days ago back to monday
+        self.assertEqual(6, aggregation.extend_days(2, today=date(2020, 2, 2)))
+        self.assertEqual(14, aggregation.shard_days(10))
+
+    def test_invalid_bucket(self):
+        with self.assertRaises(Exception):
+            Aggregation("month")
+
+    def test_destination_entries_tracked_by_bucket(self):
+        comment = "work " + Aggregation.marker("2020-01-31", [10, 20])
+
+        self.assertEqual("2020-01-31", RedmineTimeEntry.findToggleId(comment))
+        self.assertEqual({10, 20}, RedmineTimeEntry.findToggleIds(comment))
+        self.assertEqual("2020-01-31", JiraTimeEntry.findToggleId(comment))
+        self.assertEqual({7}, JiraTimeEntry.findToggleIds("work [toggl#7]"))
+
+
+class SynchronizerAggregationMixin(FakeServerMixin):
+    def setUp(self):
+        super().setUp()
+        self.start = datetime.now(dateutil.tz.tzlocal()).replace(
+            hour=10, minute=0, second=0, microsecond=0
+        ) - timedelta(1)
+
+        for i in range(4):
+            self.add_toggl_entry(100 + i, i)
+
+    def add_toggl_entry(self, id, i):
+        self.server.state.add_toggl_entry(
+            id, (self.start + timedelta(minutes=30 * i)).isoformat(), 25 * 60, "pomodoro {}".format(self.issue)
+        )
+
+    def sync(self, aggregation=Aggregation("day")):
+        return super().sync(aggregation=aggregation)
+
+    def test_entries_of_day_inserted_as_one(self):
+        s = self.sync()
+
+        self.assertEqual(1, s.inserted)
+        self.assertEqual([self.total(100 * 60)], self.destination_totals())
+
+    def test_unchanged_bucket_not_written(self):
+        self.sync()
+
+        s = self.sync()
+
+        self.assertEqual(1, s.skipped)
+        self.assertEqual(1, self.server.count(self.backend))
+
+    def test_bucket_updated_when_total_changes(self):
+        self.sync()
+        self.add_toggl_entry(104, 4)
+
+        s = self.sync()
+
+        self.assertEqual(1, s.updated)
+        self.assertEqual([self.total(125 * 60)], self.destination_totals())
+
+    def test_single_entries_replaced_by_aggregate(self):
+        self.sync(aggregation=None)
+        self.assertEqual(4, len(self.destination_totals()))
+
+        s = self.sync()
+
+        # one of single entries is kept and updated to aggregate, others are removed
+        self.assertEqual(0, s.inserted)
+        self.assertEqual(1, s.updated)
+        self.assertEqual([self.total(100 * 60)], self.destination_totals())
+
+    def test_bucket_with_long_marker_synchronized_as_single_entries(self):
+        self.sync()
+        for i in range(4, 60):
+            self.add_toggl_entry(100 + i * 7919993, i % 8)
+
+        s = self.sync()
+
+        # aggregate of the day is replaced by single entries
+        self.assertEqual(60, s.inserted)
+        self.assertEqual(60, len(self.destination_totals()))
+
+        s = self.sync()
+
+        self.assertEqual(60, s.skipped)
+        self.assertEqual(1, self.server.count(self.backend))
+
+    def test_aggregate_replaced_by_single_entries(self):
+        self.sync()
+
+        s = self.sync(aggregation=None)
+
+        self.assertEqual(4, s.inserted)
+        self.assertEqual([self.total(25 * 60)] * 4, self.destination_totals())
+
+
+class RedmineSynchronizerAggregationTests(SynchronizerAggregationMixin, RedmineDestination, unittest.TestCase):
+    issue = "#1"
+
+    def total(self, seconds):
+        return TogglEntry.secondsToHours(seconds)
+
+    def destination_totals(self):
+        return [e["hours"] for e in self.server.state.redmine_time_entries.values()]
+
+
+class JiraSynchronizerAggregationTests(SynchronizerAggregationMixin, JiraDestination, unittest.TestCase):
+    issue = "SLUG-1"
+
+    def total(self, seconds):
+        return seconds
+
+    def destination_totals(self):
+        return [
+            int(w["timeSpentSeconds"])
+            for worklogs in self.server.state.jira_worklogs.values()
+            for w in worklogs
+        ]
+
+
+if __name__ == "__main__":
+    unittest.main()
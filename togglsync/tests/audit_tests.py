@@ -0,0 +1,89 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+import dateutil.tz
+
+from togglsync.aggregation import Aggregation
+from togglsync.audit import Auditor
+from togglsync.tests.fake_server_fixtures import FakeServerMixin, JiraDestination, RedmineDestination
+
+
+class AuditorMixin(FakeServerMixin):
+    def setUp(self):
+        super().setUp()
+        # inside of whole UTC day covered by last 2 days in any timezone
+        self.start = datetime.now(dateutil.tz.tzlocal()).replace(
+            hour=12, minute=0, second=0, microsecond=0
+        ) - timedelta(1)
+
+        for i, issue in enumerate(self.issues * 2):
+            self.server.state.add_toggl_entry(
+                100 + i, (self.start + timedelta(minutes=i)).isoformat(), 1800, "work {}".format(issue)
+            )
+
+    def audit(self, aggregation=None):
+        helper = self.create_helper()
+        self.server.reset_calls()
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            mismatched = Auditor(helper, self.toggl(), aggregation).audit(2)
+
+        return mismatched, output.getvalue()
+
+    def sync(self, aggregation=None):
+        return super().sync(2, aggregation=aggregation)
+
+    def test_all_in_sync(self):
+        self.sync()
+
+        mismatched, _ = self.audit()
+
+        self.assertEqual([], mismatched)
+
+    def test_aggregated_in_sync(self):
+        self.sync(Aggregation("day"))
+
+        mismatched, _ = self.audit(Aggregation("day"))
+
+        self.assertEqual([], mismatched)
+
+    def test_only_mismatched_cells_reported(self):
+        self.sync()
+        self.server.state.toggl_entries[0]["duration"] = 3600
+        self.server.state.add_toggl_entry(999, self.start.isoformat(), 600, "new {}".format(self.issues[1]))
+
+        mismatched, output = self.audit()
+
+        self.assertEqual(
+            sorted(i.lstrip("#") for i in self.issues[:2]), sorted(c.issue for c in mismatched)
+        )
+        self.assertIn("different amount", output)
+        self.assertIn("missing in destination", output)
+        self.assertNotIn(self.issues[2], output)
+
+    def test_bulk_reads_only(self):
+        self.sync()
+
+        self.audit()
+
+        self.assertEqual(1, self.server.count("toggl"))
+        self.assertLessEqual(self.server.count(self.backend), self.bulk_read_calls)
+
+
+class RedmineAuditorTests(AuditorMixin, RedmineDestination, unittest.TestCase):
+    issues = ["#1", "#2", "#3"]
+    # single list of time entries of user
+    bulk_read_calls = 1
+
+
+class JiraAuditorTests(AuditorMixin, JiraDestination, unittest.TestCase):
+    issues = ["SLUG-1", "SLUG-2", "SLUG-3"]
+    # fields + search + worklogs of every issue
+    bulk_read_calls = 1 + 1 + 3
+
+
+if __name__ == "__main__":
+    unittest.main()
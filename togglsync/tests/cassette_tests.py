@@ -0,0 +1,157 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+
+import dateutil.tz
+import requests
+
+from togglsync.cassette import Cassette
+from togglsync.config import Entry
+from togglsync.fake_server import FakeServer
+from togglsync.jira_wrapper import JiraHelper
+from togglsync.mattermost import RequestsRunner
+from togglsync.redmine_wrapper import RedmineHelper
+from togglsync.synchronizer import Synchronizer
+from togglsync.toggl import TogglHelper
+
+
+class CassetteTests(unittest.TestCase):
+    config_entry = Entry("test", toggl_api_key="toggl-secret", task_patterns=["(#)([0-9]{1,})"])
+    jira_config_entry = Entry("test", toggl_api_key="toggl-secret", task_patterns=["SLUG-[0-9]+"])
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "cassette.jsonl")
+        self.server = FakeServer().start()
+
+        start = datetime.now(dateutil.tz.UTC) - timedelta(hours=2)
+        for i, issue in enumerate(["#1", "#2", "SLUG-1"]):
+            self.server.state.add_toggl_entry(
+                100 + i, (start + timedelta(minutes=i)).isoformat(), 3600, "work {}".format(issue)
+            )
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.dir)
+
+    def sync_redmine(self):
+        toggl = TogglHelper(self.server.urls["toggl"], self.config_entry)
+        redmine = RedmineHelper(self.server.urls["redmine"], "redmine-secret", False)
+        s = Synchronizer(None, redmine, toggl, None, raise_errors=True)
+        s.start(1)
+        return s
+
+    def sync_jira(self):
+        toggl = TogglHelper(self.server.urls["toggl"], self.jira_config_entry)
+        jira = JiraHelper(self.server.urls["jira"], "john", "jira-secret", False)
+        s = Synchronizer(None, jira, toggl, None, raise_errors=True)
+        s.start(1)
+        return s
+
+    def test_record_scrubs_credentials(self):
+        # as collected by Config.secrets
+        with Cassette(self.path, ["toggl-secret", "redmine-secret", "hook-id"]).record():
+            self.sync_redmine()
+            self.sync_jira()
+            RequestsRunner(self.server.url + "/mattermost/hooks/hook-id").send("done")
+
+        with open(self.path) as input:
+            content = input.read()
+
+        self.assertGreater(len(content.splitlines()), 5)
+        for secret in ("toggl-secret", "redmine-secret", "jira-secret", "hook-id"):
+            self.assertNotIn(secret, content)
+
+    def test_replay_offline(self):
+        with Cassette(self.path).record():
+            recorded = self.sync_redmine()
+        calls = self.server.count()
+        self.server.stop()
+
+        with Cassette.load(self.path, timing=0).replay():
+            replayed = self.sync_redmine()
+
+        self.assertEqual(2, recorded.inserted)
+        self.assertEqual(recorded.inserted, replayed.inserted)
+        self.assertEqual(calls, self.server.count())
+
+    def test_replay_jira_offline(self):
+        with Cassette(self.path).record():
+            recorded = self.sync_jira()
+        self.server.stop()
+
+        with Cassette.load(self.path, timing=0).replay():
+            replayed = self.sync_jira()
+
+        self.assertEqual(1, recorded.inserted)
+        self.assertEqual(recorded.inserted, replayed.inserted)
+
+    def test_unknown_request_fails(self):
+        with Cassette(self.path).record():
+            pass
+
+        with Cassette.load(self.path, timing=0).replay():
+            with self.assertRaises(Exception) as context:
+                requests.get(self.server.urls["toggl"] + "unknown")
+
+        self.assertIn("No recorded response for GET", str(context.exception))
+
+    def write(self, interactions, path=None):
+        cassette = Cassette(path or self.path)
+        cassette.interactions = interactions
+        cassette.save()
+
+    def interaction(self, url, response, duration=0.0):
+        return {
+            "method": "GET",
+            "url": url,
+            "body": None,
+            "status": 200,
+            "headers": {"Content-Type": "application/json"},
+            "response": response,
+            "at": 0,
+            "duration": duration,
+        }
+
+    def test_matched_by_path_in_recorded_order(self):
+        self.write(
+            [
+                self.interaction("http://toggl.url/time_entries?start_date=2020-01-01", "[1]"),
+                self.interaction("http://toggl.url/time_entries?start_date=2020-01-02", "[2]"),
+            ]
+        )
+
+        with Cassette.load(self.path, timing=0).replay():
+            second = requests.get("http://toggl.url/time_entries", params={"start_date": "2020-01-02"})
+            first = requests.get("http://toggl.url/time_entries", params={"start_date": "2030-01-01"})
+
+        self.assertEqual([2], second.json())
+        self.assertEqual([1], first.json())
+
+    def test_scaled_timing(self):
+        self.write([self.interaction("http://toggl.url/a", "[]", duration=0.4)] * 2)
+
+        with Cassette.load(self.path, timing=0.5).replay():
+            started = time.monotonic()
+            requests.get("http://toggl.url/a")
+            elapsed = time.monotonic() - started
+
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertLess(elapsed, 0.4)
+
+    def test_gzipped(self):
+        path = self.path + ".gz"
+        self.write([self.interaction("http://toggl.url/a?key=abc", '{"api_key": "abc"}')], path)
+
+        cassette = Cassette.load(path)
+
+        self.assertEqual("http://toggl.url/a?key=%2A%2A%2A", cassette.interactions[0]["url"])
+        self.assertEqual({"api_key": "***"}, json.loads(cassette.interactions[0]["response"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
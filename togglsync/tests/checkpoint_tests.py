@@ -0,0 +1,160 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import dateutil.parser
+import dateutil.tz
+
+from togglsync.checkpoint import Checkpoint
+from togglsync.config import Entry
+from togglsync.fake_server import FakeServer
+from togglsync.helpers.date_time_helper import DateTimeHelper
+from togglsync.redmine_wrapper import RedmineHelper
+from togglsync.synchronizer import Synchronizer
+from togglsync.toggl import TogglHelper
+
+
+class DateShardsTests(unittest.TestCase):
+    def test_shards_cover_period(self):
+        shards = DateTimeHelper.get_date_shards(10, 4)
+
+        self.assertEqual(3, len(shards))
+        self.assertEqual(DateTimeHelper.get_date_in_past(10), shards[0][0])
+        self.assertEqual(DateTimeHelper.get_today_midnight(), shards[-1][1])
+
+        for (_, end), (start, _) in zip(shards, shards[1:]):
+            self.assertEqual(
+                timedelta(seconds=1),
+                dateutil.parser.parse(start) - dateutil.parser.parse(end),
+            )
+
+    def test_single_shard(self):
+        self.assertEqual(
+            [(DateTimeHelper.get_date_in_past(0), DateTimeHelper.get_today_midnight())],
+            DateTimeHelper.get_date_shards(0, 7),
+        )
+
+
+class CheckpointTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "checkpoint.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_load_missing(self):
+        self.assertIsNone(Checkpoint.load(self.path, "entry"))
+
+    def test_save_and_load(self):
+        checkpoint = Checkpoint(self.path, "entry")
+        checkpoint.begin(3, [("a", "b"), ("c", "d")])
+        checkpoint.mark_shard_done("a")
+        checkpoint.mark_issue_done("c", 123)
+
+        loaded = Checkpoint.load(self.path, "entry")
+
+        self.assertEqual(3, loaded.days)
+        self.assertEqual([("a", "b"), ("c", "d")], loaded.shards)
+        self.assertTrue(loaded.is_shard_done("a"))
+        self.assertFalse(loaded.is_shard_done("c"))
+        self.assertTrue(loaded.is_issue_done("c", "123"))
+        self.assertFalse(loaded.is_finished)
+
+    def test_entries_share_file(self):
+        Checkpoint(self.path, "entry 1").begin(1, [("a", "b")])
+        Checkpoint(self.path, "entry 2").begin(2, [("c", "d")])
+
+        Checkpoint.load(self.path, "entry 1").remove()
+
+        self.assertIsNone(Checkpoint.load(self.path, "entry 1"))
+        self.assertEqual(2, Checkpoint.load(self.path, "entry 2").days)
+
+    def test_without_file(self):
+        checkpoint = Checkpoint(None, "entry")
+        checkpoint.begin(1, [("a", "b")])
+        checkpoint.mark_shard_done("a")
+
+        checkpoint.remove()
+
+        self.assertTrue(checkpoint.is_finished)
+        self.assertEqual([], os.listdir(self.dir))
+
+    def test_remove_last_removes_file(self):
+        checkpoint = Checkpoint(self.path, "entry")
+        checkpoint.begin(1, [("a", "b")])
+        checkpoint.mark_shard_done("a")
+        self.assertTrue(checkpoint.is_finished)
+
+        checkpoint.remove()
+
+        self.assertFalse(os.path.exists(self.path))
+
+
+class SynchronizerBackfillTests(unittest.TestCase):
+    redmine_config = Entry("test", toggl_api_key="key", task_patterns=["(#)([0-9]{1,})"])
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "checkpoint.json")
+
+        midnight = datetime.now(dateutil.tz.tzlocal()).replace(hour=10, minute=0, second=0, microsecond=0)
+        self.server = FakeServer().start()
+        self.server.state.add_toggl_entry(1, (midnight - timedelta(5)).isoformat(), 3600, "a #1")
+        self.server.state.add_toggl_entry(2, (midnight - timedelta(5)).isoformat(), 3600, "b #2")
+        self.server.state.add_toggl_entry(3, (midnight - timedelta(1)).isoformat(), 3600, "c #3")
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.dir)
+
+    def create_synchronizer(self, mattermost=None):
+        toggl = TogglHelper(self.server.urls["toggl"], self.redmine_config)
+        redmine = RedmineHelper(self.server.urls["redmine"], "key", False)
+        return Synchronizer(None, redmine, toggl, mattermost)
+
+    def test_backfill_in_shards(self):
+        s = self.create_synchronizer()
+        s.backfill(5, Checkpoint(self.path, "test"), shard_days=2)
+
+        self.assertEqual(3, s.inserted)
+        self.assertEqual(3, self.server.count("toggl"))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_backfill_entries_in_mattermost_summary(self):
+        mattermost = Mock()
+
+        s = self.create_synchronizer(mattermost)
+        s.backfill(5, Checkpoint(self.path, "test"), shard_days=2)
+
+        mattermost.appendDuration.assert_called_once_with(5)
+        self.assertEqual([1, 2, 3], sorted(e.id for e in mattermost.appendEntries.call_args[0][0]))
+
+    def test_resume_skips_finished_work(self):
+        self.server.state.redmine_issues = {1, 3}
+
+        s = self.create_synchronizer()
+        s.backfill(5, Checkpoint(self.path, "test"), shard_days=2)
+
+        self.assertEqual(2, s.inserted)
+        checkpoint = Checkpoint.load(self.path, "test")
+        self.assertEqual(2, len(checkpoint.shards_done))
+
+        self.server.state.redmine_issues = None
+        self.server.reset_calls()
+
+        s = self.create_synchronizer()
+        s.backfill(0, checkpoint, shard_days=2)
+
+        self.assertEqual(1, s.inserted)
+        self.assertEqual(1, self.server.count("toggl"))
+        # list and create for issue #2 only
+        self.assertEqual(2, self.server.count("redmine"))
+        self.assertIsNone(Checkpoint.load(self.path, "test"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+import time
+import unittest
+from unittest.mock import Mock
+
+import requests
+
+from togglsync.concurrency import (
+    AdaptiveLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    DestinationController,
+)
+from togglsync.config import Entry
+from togglsync.fake_server import EndpointBehaviour, FakeServer
+from togglsync.helpers.error_helper import ErrorHelper
+from togglsync.redmine_wrapper import RedmineHelper
+from togglsync.synchronizer import Synchronizer
+from togglsync.toggl import TogglEntry, TogglHelper
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__("status {}".format(status_code))
+        self.status_code = status_code
+
+
+class IsOverloadTests(unittest.TestCase):
+    def test_timeout(self):
+        self.assertTrue(ErrorHelper.is_overload(requests.exceptions.Timeout()))
+        self.assertTrue(ErrorHelper.is_overload(ConnectionRefusedError()))
+
+    def test_status(self):
+        self.assertTrue(ErrorHelper.is_overload(StatusError(429)))
+        self.assertTrue(ErrorHelper.is_overload(StatusError(503)))
+        self.assertFalse(ErrorHelper.is_overload(StatusError(404)))
+
+    def test_redmine_unknown_error_message(self):
+        self.assertTrue(ErrorHelper.is_overload(Exception("Redmine returned unknown error with the code 502")))
+
+    def test_wrapped(self):
+        try:
+            try:
+                raise StatusError(500)
+            except Exception as exc:
+                raise Exception("Error downloading time entries for 1: {}".format(exc))
+        except Exception as exc:
+            self.assertTrue(ErrorHelper.is_overload(exc))
+
+    def test_other(self):
+        self.assertFalse(ErrorHelper.is_overload(ValueError("invalid")))
+
+
+class AdaptiveLimiterTests(unittest.TestCase):
+    def test_grows_while_healthy(self):
+        limiter = AdaptiveLimiter(initial=1, maximum=3, latency_threshold=1)
+
+        limiter.on_success(0.1)
+        self.assertEqual(2, limiter.limit)
+        limiter.on_success(0.1)
+        limiter.on_success(0.1)
+        self.assertEqual(3, limiter.limit)
+        limiter.on_success(0.1)
+        limiter.on_success(0.1)
+        limiter.on_success(0.1)
+        self.assertEqual(3, limiter.limit)
+
+    def test_shrinks_on_overload_and_slow_calls(self):
+        limiter = AdaptiveLimiter(initial=4, maximum=4, latency_threshold=1)
+
+        limiter.on_overload()
+        self.assertEqual(2, limiter.limit)
+        limiter.on_success(5)
+        self.assertEqual(1, limiter.limit)
+        limiter.on_overload()
+        self.assertEqual(1, limiter.limit)
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def test_opens_over_error_rate(self):
+        breaker = CircuitBreaker(error_rate=0.5, window=10, min_calls=4)
+
+        breaker.record(False)
+        breaker.record(False)
+        breaker.record(True)
+        self.assertFalse(breaker.is_open)
+        breaker.record(False)
+        self.assertTrue(breaker.is_open)
+
+    def test_stays_closed_when_healthy(self):
+        breaker = CircuitBreaker(error_rate=0.5, window=4, min_calls=4)
+
+        for ok in [False, True, True, True, False, True, True, True]:
+            breaker.record(ok)
+        self.assertFalse(breaker.is_open)
+
+
+class DestinationControllerTests(unittest.TestCase):
+    def test_call_fails_fast_when_open(self):
+        controller = DestinationController(settings={"error_rate": 0.5})
+        fn = Mock(side_effect=StatusError(503))
+
+        for _ in range(5):
+            self.assertRaises(StatusError, controller.call, fn)
+
+        self.assertRaises(CircuitOpenError, controller.call, fn)
+        self.assertEqual(5, fn.call_count)
+
+    def test_client_errors_do_not_open(self):
+        controller = DestinationController()
+        fn = Mock(side_effect=StatusError(404))
+
+        for _ in range(10):
+            self.assertRaises(StatusError, controller.call, fn)
+
+        self.assertFalse(controller.breaker.is_open)
+
+    def test_forUrl_shared_per_host(self):
+        a = DestinationController.forUrl("http://shared.host/a")
+        b = DestinationController.forUrl("http://shared.host/b")
+
+        self.assertIs(a, b)
+
+    def test_slot_limits_concurrency(self):
+        controller = DestinationController(settings={"max": 2})
+
+        with controller.slot():
+            self.assertEqual(1, controller.limiter.in_flight)
+        self.assertEqual(0, controller.limiter.in_flight)
+
+
+class SynchronizerConcurrencyTests(unittest.TestCase):
+    redmine_config = Entry("test", toggl_api_key="key", task_patterns=["(#)([0-9]{1,})"])
+
+    def test_failing_destination_defers_remaining_issues(self):
+        server = FakeServer(endpoints={"redmine": EndpointBehaviour(error_status=503, error_rate=1)})
+        server.state.seed_toggl(20, ["#{}".format(i) for i in range(20)])
+
+        with server:
+            toggl = TogglHelper(server.urls["toggl"], self.redmine_config)
+            redmine = RedmineHelper(server.urls["redmine"], "key", False)
+
+            s = Synchronizer(None, redmine, toggl, None)
+            s.start(1)
+
+        self.assertGreater(s.deferred, 0)
+        self.assertLess(server.count("redmine"), 20)
+
+    def test_issues_synchronized_in_parallel(self):
+        toggl = TogglHelper("url", None)
+        toggl.get = Mock(
+            return_value=[
+                TogglEntry(None, 3600, "2016-01-01T01:01:01", i, "#{}".format(i), self.redmine_config)
+                for i in range(8)
+            ]
+        )
+        redmine = RedmineHelper("url", None, False)
+        # issue by issue reads
+        redmine.bulk_read = False
+        redmine.put = Mock()
+
+        def slow_get(issueId):
+            time.sleep(0.1)
+            return []
+
+        redmine.get = Mock(side_effect=slow_get)
+
+        controller = DestinationController(settings={"max": 8})
+        controller.limiter.limit = 8
+
+        started = time.monotonic()
+        s = Synchronizer(None, redmine, toggl, None, raise_errors=True, controller=controller)
+        s.start(1)
+
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(8, s.inserted)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -113,6 +113,96 @@ class ConfigTests(unittest.TestCase):
         self.assertEquals("pattern D", config.entries[2].task_patterns[0])
         self.assertEquals("pattern E", config.entries[2].task_patterns[1])
 
+    def test_fromFile_concurrency(self):
+        config = Config.fromFile("togglsync/tests/resources/config_concurrency.yml")
+
+        self.assertEquals(8, config.concurrency["max"])
+        self.assertEquals(1.5, config.concurrency["latency"])
+        self.assertEquals(0.3, config.concurrency["error_rate"])
+
+    def test_fromFile_no_concurrency(self):
+        config = Config.fromFile("togglsync/tests/resources/config1.yml")
+
+        self.assertIsNone(config.concurrency)
+
+    def test_fromFile_destinations(self):
+        config = Config.fromFile("togglsync/tests/resources/config_destinations.yml")
+
+        entry = config.entries[0]
+        self.assertEqual(2, len(entry.destinations))
+        self.assertEqual(["(#)([0-9]{1,})", "SLUG-[0-9]+"], entry.task_patterns)
+
+        redmine, jira = entry.destinations
+        self.assertEqual("entry 1 / redmine", redmine.label)
+        self.assertEqual("toggl-api-key", redmine.toggl)
+        self.assertEqual("redmine-api-key", redmine.redmine_api_key)
+        self.assertEqual(["(#)([0-9]{1,})"], redmine.task_patterns)
+        self.assertEqual("entry 1 / 2", jira.label)
+        self.assertEqual("toggl-api-key", jira.toggl)
+        self.assertEqual("john", jira.jira_username)
+
+    def test_fromFile_routes(self):
+        config = Config.fromFile("togglsync/tests/resources/config_routes.yml")
+
+        routes = config.entries[0].routes
+        self.assertEqual({"meeting": "100"}, routes.tags)
+        self.assertEqual({"123456": "200", "Internal": "201"}, routes.projects)
+        self.assertEqual({"777": "300"}, routes.project_defaults)
+
+    def test_fromYml_routes_only(self):
+        config = Config.fromYml(
+            'toggl: "url"\nredmine: "url"\nentries:\n'
+            '  - label: "e"\n    toggl_api_key: "key"\n    redmine_api_key: "key"\n'
+            "    routes:\n      tags:\n        meeting: 100\n"
+        )
+
+        self.assertEqual([], config.entries[0].task_patterns)
+
+    def test_unknown_routing_table(self):
+        with self.assertRaises(Exception) as context:
+            Entry.fromDict({"label": "e", "routes": {"clients": {"acme": 1}}})
+
+        self.assertEqual("Unknown routing table: clients", str(context.exception))
+
+    def test_destinations_inherit_routes(self):
+        entry = Entry.fromDict(
+            {
+                "label": "e",
+                "routes": {"tags": {"meeting": 1}},
+                "destinations": [
+                    {"task_patterns": ["#[0-9]+"]},
+                    {"task_patterns": ["X-[0-9]+"], "routes": {"tags": {"meeting": "X-1"}}},
+                ],
+            }
+        )
+
+        self.assertEqual({"meeting": "1"}, entry.destinations[0].routes.tags)
+        self.assertEqual({"meeting": "X-1"}, entry.destinations[1].routes.tags)
+
+    def test_secrets(self):
+        config = Config.fromFile("togglsync/tests/resources/config_destinations.yml")
+
+        self.assertEqual(["redmine-api-key", "toggl-api-key"], sorted(config.secrets()))
+
+    def test_fromFile_team(self):
+        config = Config.fromFile("togglsync/tests/resources/config_team.yml")
+
+        self.assertEqual(123, config.team["workspace_id"])
+        self.assertEqual(11, config.entries[0].toggl_user_id)
+        self.assertIsNone(config.entries[0].toggl)
+        self.assertIn("admin-api-key", config.secrets())
+
+    def test_team_without_workspace(self):
+        with self.assertRaises(Exception) as context:
+            Config.fromYml('toggl: "url"\nteam:\n  toggl_api_key: "key"\nentries: []')
+
+        self.assertEqual('Expected "workspace_id" param in "team" section', str(context.exception))
+
+    def test_fromFile_no_destinations(self):
+        config = Config.fromFile("togglsync/tests/resources/config1.yml")
+
+        self.assertIsNone(config.entries[0].destinations)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,143 @@
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import dateutil.tz
+
+from togglsync.config import Entry
+from togglsync.destination import Destination
+from togglsync.jira_wrapper import JiraHelper
+from togglsync.redmine_wrapper import RedmineHelper, RedmineTimeEntry
+from togglsync.synchronizer import Synchronizer
+from togglsync.tests.fake_server_fixtures import FakeServerMixin, RedmineDestination
+from togglsync.toggl import TogglEntry, TogglHelper
+
+
+class DestinationCapabilitiesTests(unittest.TestCase):
+    def test_redmine_reads_window(self):
+        self.assertTrue(RedmineHelper("url", None, False).reads_window())
+
+    def test_jira_reads_issue_by_issue(self):
+        jira = JiraHelper(None, "john", None, False)
+
+        self.assertFalse(jira.reads_window())
+        self.assertTrue(jira.filters_user)
+
+    def test_incomplete_destination_not_created(self):
+        class ReadOnly(Destination):
+            def get(self, issueId):
+                return []
+
+        with self.assertRaises(TypeError):
+            ReadOnly()
+
+
+class SynchronizerStrategyTests(unittest.TestCase):
+    redmine_config = Entry("test", task_patterns=["(#)([0-9]{1,})"])
+
+    def create(self, redmine, issues=3):
+        toggl = TogglHelper("url", None)
+        toggl.get = Mock(
+            return_value=[
+                TogglEntry(None, 3600, "2016-01-0{}T01:01:01+00:00".format(i + 1), i, "#{}".format(i), self.redmine_config)
+                for i in range(issues)
+            ]
+        )
+        redmine.put = Mock()
+        redmine.update = Mock()
+        return Synchronizer(None, redmine, toggl, None, raise_errors=True)
+
+    def test_window_read_for_many_issues(self):
+        redmine = RedmineHelper("url", None, False)
+        redmine.get = Mock(return_value=[])
+        redmine.get_range = Mock(
+            return_value=[
+                RedmineTimeEntry(1, "2016-01-01T01:01:01", "john", 1.0, "2016-01-01", 0, "#0 [toggl#0]")
+            ]
+        )
+
+        s = self.create(redmine)
+        s.start(1)
+
+        redmine.get_range.assert_called_once_with("2016-01-01T00:00:00+00:00", "2016-01-03T23:59:59+00:00")
+        # only issues with entries not found in the window are read before insert
+        self.assertEqual(["1", "2"], sorted(c.args[0] for c in redmine.get.call_args_list))
+        self.assertEqual(1, s.skipped)
+        self.assertEqual(2, s.inserted)
+
+    def test_issue_read_for_single_issue(self):
+        redmine = RedmineHelper("url", None, False)
+        redmine.get = Mock(return_value=[])
+        redmine.get_range = Mock(return_value=[])
+
+        self.create(redmine, issues=1).start(1)
+
+        redmine.get.assert_called_once_with("0")
+        redmine.get_range.assert_not_called()
+
+    def test_failed_window_read_falls_back_to_issue_reads(self):
+        redmine = RedmineHelper("url", None, False)
+        redmine.get = Mock(return_value=[])
+        redmine.get_range = Mock(side_effect=Exception("user filter not allowed"))
+
+        s = self.create(redmine)
+        s.start(1)
+
+        self.assertEqual(3, redmine.get.call_count)
+        self.assertEqual(3, s.inserted)
+
+    def test_writes_not_concurrent(self):
+        redmine = RedmineHelper("url", None, False)
+        redmine.concurrent_writes = False
+        redmine.get = Mock(return_value=[])
+        redmine.get_range = Mock(return_value=[])
+        s = self.create(redmine, issues=6)
+
+        active = []
+        overlaps = []
+        lock = threading.Lock()
+
+        def put(**data):
+            with lock:
+                active.append(1)
+                overlaps.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.pop()
+
+        redmine.put = Mock(side_effect=put)
+        s.start(1)
+
+        self.assertEqual(6, redmine.put.call_count)
+        self.assertEqual(1, max(overlaps))
+
+
+class RedmineWindowReadTests(FakeServerMixin, RedmineDestination, unittest.TestCase):
+    def test_entry_outside_window_not_duplicated(self):
+        day = datetime.now(dateutil.tz.tzlocal()).replace(
+            hour=12, minute=0, second=0, microsecond=0
+        ) - timedelta(3)
+        self.server.state.add_toggl_entry(1, day.isoformat(), 3600, "work #1")
+        self.server.state.add_toggl_entry(2, day.isoformat(), 3600, "work #2")
+        # day of the entry edited in redmine, outside of the window of toggl entries
+        self.server.state.add_redmine_time_entry(
+            1, 1, (day + timedelta(2)).strftime("%Y-%m-%d"), "work #1 [toggl#1]", "key"
+        )
+
+        s = self.sync(5)
+
+        self.assertEqual(1, s.inserted)
+        self.assertEqual(1, s.updated)
+        self.assertEqual(
+            [1, 2],
+            sorted(
+                RedmineTimeEntry.findToggleId(e["comments"])
+                for e in self.server.state.redmine_time_entries.values()
+            ),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
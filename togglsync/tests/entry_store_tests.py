@@ -0,0 +1,78 @@
+import unittest
+from unittest import mock
+
+from togglsync.config import Entry
+from togglsync import entry_store
+from togglsync.entry_store import TogglEntryStore
+from togglsync.toggl import TogglEntry
+
+
+@unittest.skipIf(entry_store.np is None, "numpy is not installed")
+class TogglEntryStoreTests(unittest.TestCase):
+    redmine_config = Entry("test", task_patterns=["(#)([0-9]{1,})"])
+
+    def create_entries(self):
+        return [
+            TogglEntry({"pid": 5}, 600, "2016-01-01T10:00:00+00:00", 1, "#2 a", self.redmine_config),
+            TogglEntry({"pid": 6}, 300, "2016-01-01T11:00:00+00:00", 2, "#1 b", self.redmine_config),
+            TogglEntry({"pid": 5}, 900, "2016-01-02T10:00:00+00:00", 3, "#2 c", self.redmine_config),
+            TogglEntry(None, 100, "2016-01-02T12:00:00+00:00", 4, "no task", self.redmine_config),
+            TogglEntry(None, -50, "2016-01-02T13:00:00+00:00", 5, "#3 running", self.redmine_config),
+        ]
+
+    def test_columns(self):
+        store = TogglEntryStore(self.create_entries())
+
+        self.assertEqual(5, len(store))
+        self.assertEqual([1, 2, 3, 4, 5], store.id.tolist())
+        self.assertEqual(["2", "1", "3"], store.task_ids)
+        self.assertEqual([0, 1, 0, -1, 2], store.task.tolist())
+        self.assertEqual(["2016-01-01", "2016-01-02"], store.days)
+        self.assertEqual([5, 6, 5, -1, -1], store.project.tolist())
+        self.assertEqual(1451642400.0, store.start[0])
+        self.assertEqual([self.redmine_config], store.config_entries)
+
+    def test_valid(self):
+        store = TogglEntryStore(self.create_entries())
+
+        self.assertEqual([True, True, True, False, False], store.valid().tolist())
+
+    def test_sum_by_task(self):
+        store = TogglEntryStore(self.create_entries())
+
+        sums = store.sum_by_task(store.valid())
+
+        self.assertEqual({"2": 1500, "1": 300}, sums)
+        self.assertEqual(["2", "1"], list(sums))
+
+    def test_sum_by_day(self):
+        store = TogglEntryStore(self.create_entries())
+
+        self.assertEqual({"2016-01-01": 900, "2016-01-02": 1000}, store.sum_by_day(store.duration > 0))
+
+    def test_sum_by_project(self):
+        store = TogglEntryStore(self.create_entries())
+
+        self.assertEqual({5: 1500, 6: 300, -1: 50}, store.sum_by_project())
+
+    def test_on_day(self):
+        store = TogglEntryStore(self.create_entries())
+
+        self.assertEqual(2, store.count(store.on_day("2016-01-02")))
+        self.assertEqual(1000, store.total(store.on_day("2016-01-02")))
+        self.assertEqual(0, store.count(store.on_day("2017-01-01")))
+
+    def test_empty(self):
+        store = TogglEntryStore([])
+
+        self.assertEqual(0, len(store))
+        self.assertEqual({}, store.sum_by_task())
+        self.assertEqual({}, store.sum_by_project())
+
+    def test_of_without_numpy(self):
+        with mock.patch("togglsync.entry_store.np", None):
+            self.assertIsNone(TogglEntryStore.of([]))
+
+
+if __name__ == "__main__":
+    unittest.main()
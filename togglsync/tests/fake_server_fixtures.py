@@ -0,0 +1,154 @@
+from datetime import datetime, timedelta
+
+import dateutil.tz
+
+from togglsync.config import Entry
+from togglsync.fake_server import FakeServer
+from togglsync.jira_wrapper import JiraHelper
+from togglsync.redmine_wrapper import RedmineHelper
+from togglsync.synchronizer import Synchronizer
+from togglsync.toggl import TogglHelper
+
+
+class FakeServerMixin:
+    """
+    Synchronizer tests against fake servers, run for every destination by combining the
+    test mixin with RedmineDestination or JiraDestination (and unittest.TestCase)
+    """
+
+    def setUp(self):
+        self.server = FakeServer().start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def toggl(self):
+        return TogglHelper(self.server.urls["toggl"], self.config_entry)
+
+    def synchronizer(self, **kwargs):
+        """Synchronizer of toggl and destination, calls made before are forgotten"""
+        kwargs.setdefault("raise_errors", True)
+        s = Synchronizer(None, self.create_helper(), self.toggl(), None, **kwargs)
+        self.server.reset_calls()
+        return s
+
+    def sync(self, days=1, **kwargs):
+        s = self.synchronizer(**kwargs)
+        s.start(days)
+        return s
+
+
+# number of toggl entries used in scenarios
+N = 5
+
+# number of extra destination copies in "duplicates" scenario
+DUPLICATES = 2
+
+
+class CallBudgetMixin(FakeServerMixin):
+    """
+    Runs standard sync scenarios of synchronizer tests (empty day, entries up to date, new,
+    changed and duplicated) against fake servers and checks that number of outbound HTTP
+    calls per backend does not exceed declared budget.
+
+    Budgets do not count calls made while constructing api helpers (eg. Jira server info).
+    Test classes are combined with RedmineDestination or JiraDestination and define issues,
+    budgets and duplicate_destination_entries().
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.start = datetime.now(dateutil.tz.UTC) - timedelta(hours=2)
+
+    def add_toggl_entries(self, count):
+        for i in range(count):
+            self.server.state.add_toggl_entry(
+                100 + i,
+                (self.start + timedelta(minutes=i)).isoformat(),
+                3600,
+                "hard work {}".format(self.issues[i % len(self.issues)]),
+            )
+
+    def assertBudget(self, scenario):
+        budget = self.budgets[scenario]
+
+        for backend in ("toggl", self.backend):
+            self.assertLessEqual(
+                self.server.count(backend),
+                budget[backend],
+                "{} calls over budget in '{}' scenario: {}".format(
+                    backend, scenario, self.server.calls
+                ),
+            )
+
+    def test_empty_day(self):
+        self.sync()
+        self.assertBudget("empty_day")
+
+    def test_all_up_to_date(self):
+        self.add_toggl_entries(N)
+        self.sync()
+
+        s = self.sync()
+
+        self.assertEqual(N, s.skipped)
+        self.assertBudget("up_to_date")
+
+    def test_new_entries(self):
+        self.add_toggl_entries(N)
+
+        s = self.sync()
+
+        self.assertEqual(N, s.inserted)
+        self.assertBudget("new_entries")
+
+    def test_changed_entries(self):
+        self.add_toggl_entries(N)
+        self.sync()
+        for e in self.server.state.toggl_entries:
+            e["duration"] *= 2
+
+        s = self.sync()
+
+        self.assertEqual(N, s.updated)
+        self.assertBudget("changed_entries")
+
+    def test_duplicates(self):
+        self.add_toggl_entries(1)
+        self.sync()
+        self.duplicate_destination_entries()
+
+        s = self.sync()
+
+        self.assertEqual(0, s.inserted)
+        self.assertEqual(1, s.skipped)
+        self.assertBudget("duplicates")
+
+    def test_changed_duplicates(self):
+        self.add_toggl_entries(1)
+        self.sync()
+        self.duplicate_destination_entries()
+        for e in self.server.state.toggl_entries:
+            e["description"] += " (changed)"
+
+        s = self.sync()
+
+        self.assertEqual(0, s.inserted)
+        self.assertEqual(1, s.updated)
+        self.assertBudget("changed_duplicates")
+
+
+class RedmineDestination:
+    config_entry = Entry("test", toggl_api_key="key", task_patterns=["(#)([0-9]{1,})"])
+    backend = "redmine"
+
+    def create_helper(self):
+        return RedmineHelper(self.server.urls["redmine"], "key", False)
+
+
+class JiraDestination:
+    config_entry = Entry("test", toggl_api_key="key", task_patterns=["SLUG-[0-9]+"])
+    backend = "jira"
+
+    def create_helper(self):
+        return JiraHelper(self.server.urls["jira"], "john", "pass", False)
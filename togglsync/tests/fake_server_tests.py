@@ -0,0 +1,165 @@
+import time
+import unittest
+
+import requests
+
+from togglsync.config import Entry
+from togglsync.fake_server import EndpointBehaviour, FakeServer
+from togglsync.jira_wrapper import JiraHelper
+from togglsync.mattermost import RequestsRunner
+from togglsync.redmine_wrapper import RedmineHelper
+from togglsync.synchronizer import Synchronizer
+from togglsync.toggl import TogglHelper
+
+
+class FakeServerTests(unittest.TestCase):
+    redmine_config = Entry("test", toggl_api_key="toggl-key", task_patterns=["(#)([0-9]{1,})"])
+    jira_config = Entry("test", toggl_api_key="toggl-key", task_patterns=["SLUG-[0-9]+"])
+
+    def setUp(self):
+        self.server = FakeServer().start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_toggl_get(self):
+        self.server.state.seed_toggl(3, ["#1", "#2"])
+
+        toggl = TogglHelper(self.server.urls["toggl"], self.redmine_config)
+        entries = list(toggl.get(0))
+
+        self.assertEqual(3, len(entries))
+        self.assertEqual(["1", "2", "1"], [e.taskId for e in entries])
+        self.assertEqual(1, self.server.count("toggl"))
+
+    def test_redmine_roundtrip(self):
+        redmine = RedmineHelper(self.server.urls["redmine"], "key", False)
+
+        redmine.put("12", "2016-01-01", 1.5, "work #12 [toggl#5]")
+        entries = list(redmine.get("12"))
+
+        self.assertEqual(1, len(entries))
+        self.assertEqual(5, entries[0].toggl_id)
+        self.assertEqual(1.5, entries[0].hours)
+        self.assertEqual("2016-01-01", entries[0].spent_on)
+
+        redmine.update(entries[0].id, "12", "2016-01-02", 2.0, "work #12 [toggl#5]")
+        self.assertEqual(2.0, list(redmine.get("12"))[0].hours)
+
+        redmine.delete(entries[0].id)
+        self.assertEqual([], list(redmine.get("12")))
+
+    def test_jira_roundtrip(self):
+        jira = JiraHelper(self.server.urls["jira"], "john", "pass", False)
+
+        jira.put("SLUG-1", "2016-01-01T10:00:00+00:00", 3600, "work SLUG-1 [toggl#5]")
+        entries = list(jira.get("SLUG-1"))
+
+        self.assertEqual(1, len(entries))
+        self.assertEqual(5, entries[0].toggl_id)
+        self.assertEqual(3600, entries[0].seconds)
+
+        jira.update(entries[0].id, "SLUG-1", "2016-01-01T10:00:00+00:00", 7200, "changed [toggl#5]")
+        self.assertEqual(7200, list(jira.get("SLUG-1"))[0].seconds)
+
+        jira.delete(entries[0].id, "SLUG-1")
+        self.assertEqual([], list(jira.get("SLUG-1")))
+
+    def test_jira_get_only_own_worklogs(self):
+        self.server.state.add_jira_worklog("SLUG-1", 60, "2016-01-01T10:00:00.000+0000", "x", "other")
+        jira = JiraHelper(self.server.urls["jira"], "john", "pass", False)
+
+        self.assertEqual([], list(jira.get("SLUG-1")))
+
+    def test_mattermost(self):
+        runner = RequestsRunner(self.server.urls["mattermost"])
+        runner.send("hello")
+
+        self.assertEqual("hello", self.server.state.mattermost_messages[0]["text"])
+
+    def test_synchronizer_end_to_end(self):
+        self.server.state.seed_toggl(4, ["#1", "#2"])
+
+        toggl = TogglHelper(self.server.urls["toggl"], self.redmine_config)
+        redmine = RedmineHelper(self.server.urls["redmine"], "key", False)
+
+        s = Synchronizer(None, redmine, toggl, None, raise_errors=True)
+        s.start(0)
+
+        self.assertEqual(4, s.inserted)
+        self.assertEqual(4, len(self.server.state.redmine_time_entries))
+
+        s = Synchronizer(None, redmine, toggl, None, raise_errors=True)
+        s.start(0)
+
+        self.assertEqual(0, s.inserted)
+        self.assertEqual(4, s.skipped)
+
+    def test_unknown_issue(self):
+        self.server.state.redmine_issues = {1}
+        redmine = RedmineHelper(self.server.urls["redmine"], "key", False)
+
+        with self.assertRaises(Exception):
+            list(redmine.get("2"))
+
+    def test_page_size(self):
+        self.server.endpoints["redmine"] = EndpointBehaviour(page_size=2)
+        for i in range(5):
+            self.server.state.add_redmine_time_entry(1, 1, "2016-01-01", "[toggl#{}]".format(i))
+
+        url = self.server.urls["redmine"] + "time_entries.json"
+        page = requests.get(url, params={"limit": 100, "offset": 4}).json()
+
+        self.assertEqual(2, page["limit"])
+        self.assertEqual(5, page["total_count"])
+        self.assertEqual(1, len(page["time_entries"]))
+
+    def test_latency(self):
+        self.server.endpoints["toggl"] = EndpointBehaviour(latency=0.2)
+
+        toggl = TogglHelper(self.server.urls["toggl"], self.redmine_config)
+        started = time.monotonic()
+        list(toggl.get(0))
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+    def test_error_rate(self):
+        self.server.endpoints["toggl.time_entries"] = EndpointBehaviour(error_rate=1)
+
+        toggl = TogglHelper(self.server.urls["toggl"], self.redmine_config)
+
+        with self.assertRaises(Exception):
+            list(toggl.get(0))
+
+    def test_rate_limit(self):
+        self.server.endpoints["mattermost"] = EndpointBehaviour(rate_limit=2)
+
+        codes = [requests.post(self.server.urls["mattermost"], data="{}").status_code for _ in range(3)]
+
+        self.assertEqual([200, 200, 429], codes)
+
+    def test_fromYml(self):
+        server = FakeServer.fromYml(
+            """
+endpoints:
+  jira.worklogs:
+    latency: [0.1, 0.2]
+    error_rate: 0.5
+state:
+  redmine_issues: [1, 2]
+  redmine_time_entries:
+    - issue: 1
+      hours: 1
+      spent_on: "2016-01-01"
+      comments: "[toggl#1]"
+"""
+        )
+        server.stop()
+
+        self.assertEqual(0.5, server.endpoints["jira.worklogs"].error_rate)
+        self.assertEqual({1, 2}, server.state.redmine_issues)
+        self.assertEqual(1, len(server.state.redmine_time_entries))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -118,6 +118,24 @@ class JiraHelperTests(unittest.TestCase):
         self.assertEquals(120, JiraHelper.round_to_minutes(91))
         self.assertEquals(120, JiraHelper.round_to_minutes(120))
 
+    def test_fingerprint_equal(self):
+        toggl = TogglEntry(
+            None, 3630, "2020-01-13T08:11:04+00:00", 777, "test SLUG-333", self.jira_config
+        )
+        jira = JiraTimeEntry(
+            1, None, "user", 3600, "2020-01-13T09:11:04.000+01:00", "SLUG-333", "test SLUG-333 [toggl#777]"
+        )
+
+        self.assertEquals(
+            JiraHelper.fingerprint(JiraHelper.dictFromTogglEntry(toggl)),
+            JiraHelper.fingerprintFromEntry(jira),
+        )
+
+    def test_normalize_started(self):
+        self.assertEquals("2016-03-02T01:01:01+00:00", JiraHelper.normalize_started("2016-03-02T01:01:01"))
+        self.assertEquals("2016-03-02T01:01:01+00:00", JiraHelper.normalize_started("2016-03-02T02:01:01.123+0100"))
+        self.assertIsNone(JiraHelper.normalize_started(None))
+
 
 if __name__ == "__main__":
     unittest.main()
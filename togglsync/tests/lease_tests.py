@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from togglsync.lease import LeaseStore
+
+
+class LeaseStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.store = LeaseStore(os.path.join(self.dir, "leases.db"))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_held_lease_not_acquired(self):
+        self.assertIsNotNone(self.store.acquire("test", "a", 60))
+
+        self.assertIsNone(self.store.acquire("test", "b", 60))
+        self.assertIsNotNone(self.store.acquire("other", "b", 60))
+        self.assertEqual("a", self.store.holder("test")[0])
+
+    def test_released_lease_acquired(self):
+        token = self.store.acquire("test", "a", 60)
+        self.store.release("test", token)
+
+        self.assertIsNotNone(self.store.acquire("test", "b", 60))
+
+    def test_expired_lease_stolen(self):
+        token = self.store.acquire("test", "crashed", 60)
+
+        stolen = self.store.acquire("test", "b", 60, now=time.time() + 61)
+
+        self.assertNotEqual(token, stolen)
+        # old holder can neither renew nor release lease of the new one
+        self.assertFalse(self.store.renew("test", token, 60))
+        self.store.release("test", token)
+        self.assertEqual("b", self.store.holder("test")[0])
+
+    def test_tokens_increase_after_release(self):
+        stale = self.store.acquire("test", "a", 60)
+        later = time.time() + 61
+        released = self.store.acquire("test", "b", 60, now=later)
+        self.store.release("test", released)
+
+        token = self.store.acquire("test", "c", 60, now=later)
+
+        self.assertGreater(token, released)
+        # stale holder can neither renew nor release lease of the new one
+        self.assertFalse(self.store.renew("test", stale, 60, now=later))
+        self.assertFalse(self.store.renew("test", released, 60, now=later))
+        self.store.release("test", stale)
+        self.assertEqual("c", self.store.holder("test")[0])
+
+    def test_renewed_lease_not_stolen(self):
+        token = self.store.acquire("test", "a", 60)
+
+        self.assertTrue(self.store.renew("test", token, 60, now=time.time() + 50))
+
+        self.assertIsNone(self.store.acquire("test", "b", 60, now=time.time() + 61))
+
+    def test_hold_renews_until_released(self):
+        lease = self.store.hold("test", 0.3)
+        time.sleep(0.5)
+
+        self.assertIsNone(self.store.hold("test", 0.3))
+
+        lease.release()
+        lease = self.store.hold("test", 0.3)
+        self.assertIsNotNone(lease)
+        lease.release()
+
+    def test_hold_waits_for_release(self):
+        lease = self.store.hold("test", 60)
+        threading.Timer(0.2, lease.release).start()
+
+        waited = self.store.hold("test", 60, wait=5)
+
+        self.assertIsNotNone(waited)
+        waited.release()
+
+
+if __name__ == "__main__":
+    unittest.main()
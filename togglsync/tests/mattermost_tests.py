@@ -317,6 +317,27 @@ You spent most time on:
 
         runner.send.assert_called_with(text)
 
+    def test_append_entries_without_numpy(self):
+        entries = [
+            TogglEntry(None, 3600, self.today, 776, "test #333", self.redmine_config),
+            TogglEntry(None, 1800, self.today, 777, "test #334", self.redmine_config),
+            TogglEntry(None, 600, self.today, 778, "no issue", self.redmine_config),
+        ]
+
+        columnar = MagicMock()
+        mattermost = MattermostNotifier(columnar)
+        mattermost.appendEntries(entries)
+        mattermost.send()
+
+        lists = MagicMock()
+        mattermost = MattermostNotifier(lists)
+        with patch("togglsync.entry_store.np", None):
+            mattermost.appendEntries(entries)
+        mattermost.send()
+
+        self.assertIn("- #333: 1.0 h", lists.send.call_args[0][0])
+        self.assertEqual(columnar.send.call_args, lists.send.call_args)
+
     def test_append_redmine_summary_no_entries_no_summary(self):
         runner = MagicMock()
 
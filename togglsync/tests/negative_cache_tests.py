@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import dateutil.tz
+
+from togglsync.fake_server import EndpointBehaviour
+from togglsync.negative_cache import NegativeCache
+from togglsync.tests.fake_server_fixtures import FakeServerMixin, JiraDestination, RedmineDestination
+
+
+class NegativeCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "unknown_issues.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_persisted_per_destination(self):
+        NegativeCache(self.path).add("redmine:a", 999, 404)
+
+        cache = NegativeCache(self.path)
+
+        self.assertEqual(404, cache.get("redmine:a", "999")["status"])
+        self.assertIsNone(cache.get("redmine:b", "999"))
+        self.assertIsNone(cache.get("redmine:a", "1"))
+
+    def test_expires_after_ttl(self):
+        cache = NegativeCache(self.path, ttl=1)
+        cache.add("jira:a", "X-1", 403)
+
+        self.assertIsNotNone(cache.get("jira:a", "X-1"))
+        self.assertIsNone(
+            cache.get("jira:a", "X-1", now=datetime.now(dateutil.tz.UTC) + timedelta(days=1))
+        )
+
+    def test_purge(self):
+        cache = NegativeCache(self.path)
+        cache.add("jira:a", "X-1", 404)
+        cache.add("jira:a", "X-2", 404)
+        cache.add("jira:b", "X-1", 404)
+
+        self.assertEqual(2, cache.purge(["X-1"]))
+        self.assertIsNone(NegativeCache(self.path).get("jira:b", "X-1"))
+        self.assertIsNotNone(NegativeCache(self.path).get("jira:a", "X-2"))
+
+        self.assertEqual(1, cache.purge())
+        self.assertFalse(os.path.exists(self.path))
+
+
+class SynchronizerNegativeCacheMixin(FakeServerMixin):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = NegativeCache(os.path.join(self.dir, "unknown_issues.json"))
+        super().setUp()
+
+        start = datetime.now(dateutil.tz.UTC) - timedelta(hours=2)
+        for i, issue in enumerate(self.issues):
+            self.server.state.add_toggl_entry(
+                100 + i, (start + timedelta(minutes=i)).isoformat(), 3600, "work {}".format(issue)
+            )
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.dir)
+
+    def sync(self):
+        return super().sync(raise_errors=False, negative_cache=self.cache)
+
+    def test_unknown_issue_skipped_without_call(self):
+        first = self.sync()
+        self.assertEqual(1, first.inserted)
+        self.assertIsNotNone(self.cache.get(self.create_helper().identity, self.unknown))
+
+        second = self.sync()
+
+        # known issue is up to date, unknown one is not even tried
+        self.assertEqual(1, second.skipped)
+        self.assertEqual(0, self.server.count(self.backend, "POST"))
+        self.assertEqual([], [c for c in self.server.calls if self.unknown in c[2]])
+
+    def test_failed_write_not_cached(self):
+        self.sync()
+        self.server.state.toggl_entries[0]["duration"] = 7200
+        self.server.endpoints[self.write_endpoint] = EndpointBehaviour(error_rate=1, error_status=403)
+
+        s = self.sync()
+
+        self.assertEqual(0, s.updated)
+        self.assertIsNone(self.cache.get(self.create_helper().identity, self.known))
+
+
+class RedmineNegativeCacheTests(SynchronizerNegativeCacheMixin, RedmineDestination, unittest.TestCase):
+    issues = ["#1", "#999"]
+    known = "1"
+    unknown = "999"
+    write_endpoint = "redmine.time_entry"
+
+    def setUp(self):
+        super().setUp()
+        self.server.state.redmine_issues = {1}
+
+
+class JiraNegativeCacheTests(SynchronizerNegativeCacheMixin, JiraDestination, unittest.TestCase):
+    issues = ["SLUG-1", "SLUG-999"]
+    known = "SLUG-1"
+    unknown = "SLUG-999"
+    write_endpoint = "jira.worklog"
+
+    def setUp(self):
+        super().setUp()
+        self.server.state.jira_issues = {"SLUG-1"}
+
+
+if __name__ == "__main__":
+    unittest.main()
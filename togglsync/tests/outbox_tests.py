@@ -0,0 +1,196 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from togglsync.config import Entry
+from togglsync.fake_server import FakeServer
+from togglsync.outbox import Outbox
+from togglsync.redmine_wrapper import RedmineHelper, RedmineTimeEntry
+from togglsync.synchronizer import Synchronizer
+from togglsync.toggl import TogglEntry, TogglHelper
+
+
+class OutboxTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "outbox.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_begin_done(self):
+        outbox = Outbox(self.path)
+
+        key = outbox.begin("dest", "put", 17, {"issueId": "1"})
+        self.assertEqual(1, len(outbox.pending("dest")))
+        self.assertEqual(0, len(outbox.pending("other")))
+
+        outbox.done(key)
+        self.assertEqual(0, len(outbox.pending()))
+
+    def test_pending_survives_restart(self):
+        outbox = Outbox(self.path)
+        outbox.begin("dest", "put", 17, {"issueId": "1"})
+        outbox.done(outbox.begin("dest", "put", 18, {"issueId": "1"}))
+
+        pending = Outbox(self.path).pending("dest")
+
+        self.assertEqual(1, len(pending))
+        self.assertEqual(17, pending[0]["toggl_id"])
+        self.assertEqual({"issueId": "1"}, pending[0]["data"])
+
+    def test_interrupted_append_is_ignored(self):
+        Outbox(self.path).begin("dest", "put", 17, {"issueId": "1"})
+        with open(self.path, "a") as output:
+            output.write('{"key": "dest|put|18')
+
+        self.assertEqual(1, len(Outbox(self.path).pending()))
+
+    def test_key_includes_destination_id(self):
+        outbox = Outbox(self.path)
+        outbox.begin("dest", "delete", 17, {"id": 1})
+        outbox.begin("dest", "delete", 17, {"id": 2})
+
+        self.assertEqual(2, len(outbox.pending()))
+
+    def test_compact(self):
+        outbox = Outbox(self.path)
+        outbox.done(outbox.begin("dest", "put", 17, {}))
+        outbox.begin("dest", "put", 18, {})
+
+        outbox.compact()
+
+        with open(self.path) as input:
+            self.assertEqual(1, len(input.readlines()))
+        self.assertEqual(18, Outbox(self.path).pending()[0]["toggl_id"])
+
+    def test_compact_removes_empty_journal(self):
+        outbox = Outbox(self.path)
+        outbox.done(outbox.begin("dest", "put", 17, {}))
+
+        outbox.compact()
+
+        self.assertFalse(os.path.exists(self.path))
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__("status {}".format(status_code))
+        self.status_code = status_code
+
+
+class SynchronizerOutboxTests(unittest.TestCase):
+    redmine_config = Entry("test", toggl_api_key="key", task_patterns=["(#)([0-9]{1,})"])
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.outbox = Outbox(os.path.join(self.dir, "outbox.jsonl"))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def create_toggl(self):
+        toggl = TogglHelper("url", None)
+        toggl.get = Mock(
+            return_value=[
+                TogglEntry(None, 3600, "2016-01-01T01:01:01", 17, "#987 hard work", self.redmine_config)
+            ]
+        )
+        return toggl
+
+    def test_failed_write_is_replayed(self):
+        redmine = RedmineHelper("url", None, False)
+        redmine.get = Mock(return_value=[])
+        redmine.put = Mock(side_effect=Exception("timeout"))
+
+        Synchronizer(None, redmine, self.create_toggl(), None, outbox=self.outbox).start(1)
+
+        self.assertEqual(1, len(self.outbox.pending(redmine.identity)))
+
+        redmine.put = Mock()
+        redmine.get.reset_mock()
+
+        s = Synchronizer(None, redmine, None, None, outbox=self.outbox)
+        s.replay_outbox()
+
+        redmine.get.assert_called_once_with("987")
+        redmine.put.assert_called_once_with(
+            issueId="987", spentOn="2016-01-01", hours=1.0, comment="#987 hard work [toggl#17]"
+        )
+        self.assertEqual(0, len(self.outbox.pending()))
+
+    def test_replay_skips_insert_already_in_destination(self):
+        redmine = RedmineHelper("url", None, False)
+        self.outbox.begin(redmine.identity, "put", 17, {"issueId": "987"})
+        redmine.get = Mock(
+            return_value=[RedmineTimeEntry(1, None, "john", 1, "2016-01-01", 987, "#987 [toggl#17]")]
+        )
+        redmine.put = Mock()
+
+        Synchronizer(None, redmine, None, None, outbox=self.outbox).replay_outbox()
+
+        redmine.put.assert_not_called()
+        self.assertEqual(0, len(self.outbox.pending()))
+
+    def test_replay_of_update_of_deleted_entry_settled(self):
+        redmine = RedmineHelper("url", "key", False)
+        self.outbox.begin(redmine.identity, "update", 17, {"id": 1, "issueId": "987"})
+        redmine.update = Mock(side_effect=StatusError(404))
+
+        Synchronizer(None, redmine, None, None, outbox=self.outbox).replay_outbox()
+
+        self.assertEqual(0, len(self.outbox.pending()))
+        self.assertFalse(os.path.exists(self.outbox.path))
+
+    def test_rejected_replay_dropped(self):
+        redmine = RedmineHelper("url", "key", False)
+        self.outbox.begin(redmine.identity, "put", 17, {"issueId": "987"})
+        self.outbox.begin(redmine.identity, "update", 18, {"id": 2, "issueId": "987"})
+        redmine.get = Mock(return_value=[])
+        redmine.put = Mock(side_effect=StatusError(422))
+        redmine.update = Mock(side_effect=StatusError(503))
+
+        Synchronizer(None, redmine, None, None, outbox=self.outbox).replay_outbox()
+
+        # rejected insert is not retried, failing destination is
+        self.assertEqual([18], [r["toggl_id"] for r in Outbox(self.outbox.path).pending()])
+
+    def test_replay_only_own_destination(self):
+        redmine = RedmineHelper("url", "key", False)
+        self.outbox.begin("other", "update", 17, {"id": 1})
+        redmine.update = Mock()
+
+        Synchronizer(None, redmine, None, None, outbox=self.outbox).replay_outbox()
+
+        redmine.update.assert_not_called()
+        self.assertEqual(1, len(self.outbox.pending()))
+
+    def test_replay_costs_few_calls(self):
+        with FakeServer() as server:
+            server.state.seed_toggl(10, ["#1", "#2"])
+            toggl = TogglHelper(server.urls["toggl"], self.redmine_config)
+            redmine = RedmineHelper(server.urls["redmine"], "key", False)
+
+            Synchronizer(None, redmine, toggl, None, outbox=self.outbox).start(1)
+            self.assertEqual(0, len(self.outbox.pending()))
+
+            for e in list(server.state.redmine_time_entries.values())[:2]:
+                self.outbox.begin(
+                    redmine.identity,
+                    "update",
+                    RedmineTimeEntry.findToggleId(e["comments"]),
+                    {"id": e["id"], "issueId": "1", "spentOn": e["spent_on"], "hours": 2.0, "comment": e["comments"]},
+                )
+            server.reset_calls()
+
+            Synchronizer(None, redmine, toggl, None, outbox=self.outbox).replay_outbox()
+
+            self.assertEqual(0, server.count("toggl"))
+            self.assertEqual(2, server.count("redmine"))
+            self.assertEqual(0, len(self.outbox.pending()))
+
+
+if __name__ == "__main__":
+    unittest.main()
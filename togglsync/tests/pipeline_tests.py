@@ -0,0 +1,147 @@
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+
+from togglsync.config import Entry
+from togglsync.pipeline import BoundedStream, Broadcast
+from togglsync.redmine_wrapper import RedmineHelper
+from togglsync.synchronizer import Synchronizer
+from togglsync.toggl import TogglEntry, TogglHelper
+
+
+class BoundedStreamTests(unittest.TestCase):
+    def test_items_in_order(self):
+        self.assertEqual(list(range(100)), list(BoundedStream(iter(range(100)), 3)))
+
+    def test_producer_blocks_on_full_queue(self):
+        produced = []
+
+        def source():
+            for i in range(100):
+                produced.append(i)
+                yield i
+
+        stream = iter(BoundedStream(source(), 5))
+        self.assertEqual(0, next(stream))
+        time.sleep(0.2)
+
+        # consumed item + queued items + one waiting for free slot
+        self.assertLessEqual(len(produced), 7)
+        stream.close()
+
+    def test_producer_error_raised_in_consumer(self):
+        def source():
+            yield 1
+            raise ValueError("broken download")
+
+        stream = iter(BoundedStream(source(), 5))
+        self.assertEqual(1, next(stream))
+
+        with self.assertRaises(ValueError):
+            next(stream)
+
+    def test_producer_stops_when_consumer_stops(self):
+        finished = threading.Event()
+
+        def source():
+            try:
+                for i in range(1000):
+                    yield i
+            finally:
+                finished.set()
+
+        for i in BoundedStream(source(), 2):
+            break
+
+        self.assertTrue(finished.wait(1))
+
+
+class BroadcastTests(unittest.TestCase):
+    def test_items_routed_to_every_consumer(self):
+        broadcast = Broadcast(iter(range(10)), [lambda i: i, lambda i: i * 10 if i % 2 else None], 2)
+        results = [[], []]
+
+        threads = [
+            threading.Thread(target=lambda i=i: results[i].extend(broadcast.streams[i]))
+            for i in range(2)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(2)
+
+        self.assertEqual(list(range(10)), results[0])
+        self.assertEqual([10, 30, 50, 70, 90], results[1])
+
+    def test_closed_consumer_does_not_block_others(self):
+        broadcast = Broadcast(iter(range(100)), [lambda i: i, lambda i: i], 2)
+        broadcast.close(1)
+
+        self.assertEqual(list(range(100)), list(broadcast.streams[0]))
+
+    def test_producer_error_raised_in_every_consumer(self):
+        def source():
+            yield 1
+            raise ValueError("broken download")
+
+        broadcast = Broadcast(source(), [lambda i: i, lambda i: i], 5)
+
+        for stream in broadcast.streams:
+            with self.assertRaises(ValueError):
+                list(stream)
+
+
+class SynchronizerPipelineTests(unittest.TestCase):
+    redmine_config = Entry("test", task_patterns=["(#)([0-9]{1,})"])
+
+    def test_destination_read_overlaps_toggl_download(self):
+        read_started = threading.Event()
+
+        def download(days):
+            yield TogglEntry(None, 3600, "2016-01-01T01:01:01", 1, "#1", self.redmine_config)
+            # rest of the download waits for destination read of first issue
+            self.assertTrue(read_started.wait(2))
+            yield TogglEntry(None, 3600, "2016-01-01T02:01:01", 2, "#2", self.redmine_config)
+
+        def get(issueId):
+            read_started.set()
+            return []
+
+        toggl = TogglHelper("url", None)
+        toggl.get = download
+        redmine = RedmineHelper("url", None, False)
+        # issue by issue reads
+        redmine.bulk_read = False
+        redmine.get = Mock(side_effect=get)
+        redmine.put = Mock()
+
+        s = Synchronizer(None, redmine, toggl, None, raise_errors=True)
+        s.start(1)
+
+        self.assertEqual(2, s.inserted)
+        self.assertEqual(2, redmine.get.call_count)
+
+    def test_issues_beyond_prefetch_read_once(self):
+        toggl = TogglHelper("url", None)
+        toggl.get = Mock(
+            return_value=[
+                TogglEntry(None, 3600, "2016-01-01T01:01:01", i, "#{}".format(i), self.redmine_config)
+                for i in range(10)
+            ]
+        )
+        redmine = RedmineHelper("url", None, False)
+        redmine.bulk_read = False
+        redmine.get = Mock(return_value=[])
+        redmine.put = Mock()
+
+        s = Synchronizer(None, redmine, toggl, None, raise_errors=True)
+        s.prefetch = 3
+        s.start(1)
+
+        self.assertEqual(10, s.inserted)
+        self.assertEqual(10, redmine.get.call_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import threading
+import unittest
+from unittest.mock import Mock
+
+from togglsync.config import Entry
+from togglsync.read_cache import ReadCache
+from togglsync.redmine_wrapper import RedmineHelper, RedmineTimeEntry
+from togglsync.synchronizer import Synchronizer
+from togglsync.toggl import TogglEntry, TogglHelper
+
+
+class ReadCacheTests(unittest.TestCase):
+    def test_cached_until_write_to_issue(self):
+        cache = ReadCache()
+        fetch = Mock(return_value=[1, 2])
+
+        self.assertEqual([1, 2], cache.get("redmine:a", 1, None, fetch))
+        self.assertEqual([1, 2], cache.get("redmine:a", "1", None, fetch))
+        self.assertEqual(1, fetch.call_count)
+
+        cache.invalidate("redmine:a", 2)
+        cache.get("redmine:a", 1, None, fetch)
+        self.assertEqual(1, fetch.call_count)
+
+        cache.invalidate("redmine:a", 1)
+        cache.get("redmine:a", 1, None, fetch)
+        self.assertEqual(2, fetch.call_count)
+
+    def test_keyed_by_destination_and_window(self):
+        cache = ReadCache()
+        fetch = Mock(return_value=[])
+
+        cache.get("redmine:a", 1, None, fetch)
+        cache.get("redmine:b", 1, None, fetch)
+        cache.get("redmine:a", None, ("2020-01-01", "2020-01-02"), fetch)
+        cache.get("redmine:a", None, ("2020-01-01", "2020-01-03"), fetch)
+
+        self.assertEqual(4, fetch.call_count)
+
+    def test_write_invalidates_windows(self):
+        cache = ReadCache()
+        fetch = Mock(return_value=[])
+        window = ("2020-01-01", "2020-01-02")
+
+        cache.get("redmine:a", None, window, fetch)
+        cache.invalidate("redmine:a", 7)
+        cache.get("redmine:a", None, window, fetch)
+
+        self.assertEqual(2, fetch.call_count)
+
+    def test_concurrent_reads_fetched_once(self):
+        cache = ReadCache()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(2)
+            return ["entry"]
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get("jira:a", "X-1", None, fetch)))
+            for _ in range(5)
+        ]
+        threads[0].start()
+        started.wait(2)
+        for t in threads[1:]:
+            t.start()
+        release.set()
+        for t in threads:
+            t.join(2)
+
+        self.assertEqual(1, len(calls))
+        self.assertEqual([["entry"]] * 5, results)
+        self.assertEqual(4, cache.hits)
+
+    def test_failed_read_not_cached(self):
+        cache = ReadCache()
+        fetch = Mock(side_effect=[Exception("down"), ["entry"]])
+
+        with self.assertRaises(Exception):
+            cache.get("jira:a", "X-1", None, fetch)
+
+        self.assertEqual(["entry"], cache.get("jira:a", "X-1", None, fetch))
+
+    def test_read_invalidated_in_flight_not_cached(self):
+        cache = ReadCache()
+
+        def fetch():
+            cache.invalidate("jira:a", "X-1")
+            return ["stale"]
+
+        self.assertEqual(["stale"], cache.get("jira:a", "X-1", None, fetch))
+        self.assertEqual(["fresh"], cache.get("jira:a", "X-1", None, lambda: ["fresh"]))
+
+
+class SynchronizerReadCacheTests(unittest.TestCase):
+    config_entry = Entry("test", task_patterns=["(#)([0-9]{1,})"])
+
+    def create(self, redmine, cache):
+        toggl = TogglHelper("url", None)
+        toggl.get = Mock(
+            return_value=[TogglEntry(None, 3600, "2016-01-01T01:01:01", 17, "#2", self.config_entry)]
+        )
+        return Synchronizer(None, redmine, toggl, None, raise_errors=True, read_cache=cache)
+
+    def test_issue_read_once_per_destination(self):
+        redmine = RedmineHelper("url", "key", False)
+        redmine.get = Mock(
+            return_value=[
+                RedmineTimeEntry(1, "2016-01-01T01:01:01", "user", 1.0, "2016-01-01", 2, "#2 [toggl#17]")
+            ]
+        )
+        redmine.update = Mock()
+        cache = ReadCache()
+
+        self.create(redmine, cache).start(1)
+        self.create(redmine, cache).start(1)
+
+        self.assertEqual(1, redmine.get.call_count)
+
+    def test_issue_read_again_after_write(self):
+        redmine = RedmineHelper("url", "key", False)
+        redmine.get = Mock(return_value=[])
+        redmine.put = Mock()
+        cache = ReadCache()
+
+        self.create(redmine, cache).start(1)
+        self.create(redmine, cache).start(1)
+
+        self.assertEqual(2, redmine.get.call_count)
+        self.assertEqual(2, redmine.put.call_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
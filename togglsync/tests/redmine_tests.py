@@ -1,7 +1,9 @@
 import unittest
 from datetime import datetime, date
 
-from togglsync.redmine_wrapper import RedmineTimeEntry
+from togglsync.config import Entry
+from togglsync.redmine_wrapper import RedmineTimeEntry, RedmineHelper
+from togglsync.toggl import TogglEntry
 
 
 class UserStub:
@@ -80,5 +82,27 @@ class RedmineTimeEntryTests(unittest.TestCase):
         self.assertEquals(None, RedmineTimeEntry.findToggleId(None))
 
 
+class RedmineHelperTests(unittest.TestCase):
+    redmine_config = Entry("test", task_patterns=["(#)([0-9]{1,})"])
+
+    def test_fingerprint_equal(self):
+        toggl = TogglEntry(None, 3600, "2016-03-02T01:01:01", 777, "test #333", self.redmine_config)
+        redmine = RedmineTimeEntry(1, None, "john", 1, "2016-03-02", 333, "test #333 [toggl#777]")
+
+        self.assertEquals(
+            RedmineHelper.fingerprint(RedmineHelper.dictFromTogglEntry(toggl)),
+            RedmineHelper.fingerprintFromEntry(redmine),
+        )
+
+    def test_fingerprint_diff_hours(self):
+        toggl = TogglEntry(None, 1800, "2016-03-02T01:01:01", 777, "test #333", self.redmine_config)
+        redmine = RedmineTimeEntry(1, None, "john", 1, "2016-03-02", 333, "test #333 [toggl#777]")
+
+        self.assertNotEqual(
+            RedmineHelper.fingerprint(RedmineHelper.dictFromTogglEntry(toggl)),
+            RedmineHelper.fingerprintFromEntry(redmine),
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,143 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import dateutil.tz
+
+from togglsync.config import Entry
+from togglsync.fake_server import FakeServer
+from togglsync.redmine_wrapper import RedmineHelper, RedmineTimeEntry
+from togglsync.sharding import Shard, ShardReport
+from togglsync.synchronizer import Synchronizer
+from togglsync.toggl import TogglHelper
+
+
+class ShardTests(unittest.TestCase):
+    def test_parse(self):
+        shard = Shard.parse("1/4")
+
+        self.assertEqual(1, shard.index)
+        self.assertEqual(4, shard.count)
+        self.assertEqual("1/4", str(shard))
+
+    def test_parse_invalid(self):
+        for value in ("4/4", "-1/2", "1", "a/b", "0/0"):
+            with self.assertRaises(Exception):
+                Shard.parse(value)
+
+    def test_every_key_owned_by_one_shard(self):
+        shards = [Shard(i, 3) for i in range(3)]
+
+        for key in ["1", "2", "SLUG-1", "SLUG-2", "entry label"] + [str(i) for i in range(100)]:
+            self.assertEqual(1, len([s for s in shards if s.owns(key)]))
+
+    def test_stable(self):
+        # does not depend on (salted) python hash
+        self.assertEqual(939, Shard.slot("SLUG-1", 1000))
+        self.assertEqual(Shard.slot(12, 5), Shard.slot("12", 5))
+
+
+class ShardReportTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_merge(self):
+        paths = []
+        for i, (inserted, updated) in enumerate([(2, 1), (3, 0)]):
+            s = Synchronizer(None, None, None, None)
+            s.inserted = inserted
+            s.updated = updated
+
+            report = ShardReport(Shard(i, 2))
+            report.add("test", s)
+            paths.append(os.path.join(self.dir, "shard{}.json".format(i)))
+            report.save(paths[-1])
+
+        shards, entries = ShardReport.merge(paths)
+
+        self.assertEqual(["0/2", "1/2"], shards)
+        self.assertEqual(5, entries["test"]["inserted"])
+        self.assertEqual(1, entries["test"]["updated"])
+        self.assertEqual(0, entries["test"]["deleted"])
+
+
+class ShardedSynchronizerTests(unittest.TestCase):
+    config_entry = Entry("test", toggl_api_key="key", task_patterns=["(#)([0-9]{1,})"])
+    issues = [str(i) for i in range(1, 11)]
+
+    def setUp(self):
+        self.server = FakeServer().start()
+        self.start = datetime.now(dateutil.tz.tzlocal()).replace(
+            hour=12, minute=0, second=0, microsecond=0
+        ) - timedelta(1)
+
+        for i, issue in enumerate(self.issues):
+            self.server.state.add_toggl_entry(
+                100 + i, (self.start + timedelta(minutes=i)).isoformat(), 3600, "work #{}".format(issue)
+            )
+
+    def tearDown(self):
+        self.server.stop()
+
+    def sync(self, shard, propagate_deletions=False):
+        toggl = TogglHelper(self.server.urls["toggl"], self.config_entry)
+        redmine = RedmineHelper(self.server.urls["redmine"], "key", False)
+        self.server.reset_calls()
+
+        s = Synchronizer(
+            None, redmine, toggl, None, raise_errors=True, propagate_deletions=propagate_deletions, shard=shard
+        )
+        s.start(2)
+        return s
+
+    def synced_issues(self):
+        return sorted(str(e["issue"]["id"]) for e in self.server.state.redmine_time_entries.values())
+
+    def test_shards_cover_all_issues_once(self):
+        inserted = 0
+
+        for i in range(3):
+            before = self.synced_issues()
+            s = self.sync(Shard(i, 3))
+            inserted += s.inserted
+
+            # single toggl download per shard
+            self.assertEqual(1, self.server.count("toggl"))
+            self.assertTrue(
+                all(Shard(i, 3).owns(issue) for issue in set(self.synced_issues()) - set(before))
+            )
+
+        self.assertEqual(len(self.issues), inserted)
+        self.assertEqual(sorted(self.issues), self.synced_issues())
+
+    def test_orphans_of_other_shards_kept(self):
+        shard = Shard(0, 2)
+        own = next(i for i in self.issues if shard.owns(i))
+        other = next(i for i in self.issues if not shard.owns(i))
+
+        for issue in (own, other):
+            self.server.state.add_redmine_time_entry(
+                issue,
+                1,
+                self.start.astimezone(dateutil.tz.UTC).strftime("%Y-%m-%d"),
+                "deleted [toggl#9{}]".format(issue),
+                "key",
+            )
+
+        s = self.sync(shard, propagate_deletions=True)
+
+        self.assertEqual(1, s.deleted)
+        remaining = [
+            RedmineTimeEntry.findToggleId(e["comments"]) for e in self.server.state.redmine_time_entries.values()
+        ]
+        self.assertNotIn(int("9" + own), remaining)
+        self.assertIn(int("9" + other), remaining)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+import os
+import time
+import unittest
+from datetime import datetime, timedelta
+
+import dateutil.tz
+
+from togglsync.helpers.date_time_helper import DateTimeHelper
+from togglsync.jira_wrapper import JiraTimeEntry
+from togglsync.redmine_wrapper import RedmineTimeEntry
+from togglsync.tests.fake_server_fixtures import FakeServerMixin, JiraDestination, RedmineDestination
+
+
+class UtcDaysWithinTests(unittest.TestCase):
+    def test_whole_days(self):
+        self.assertEqual(
+            ("2020-01-01", "2020-01-03"),
+            DateTimeHelper.get_utc_days_within("2020-01-01T00:00:00+00:00", "2020-01-03T23:59:59+00:00"),
+        )
+
+    def test_partial_days_excluded(self):
+        self.assertEqual(
+            ("2020-01-01", "2020-01-02"),
+            DateTimeHelper.get_utc_days_within("2020-01-01T00:00:00+02:00", "2020-01-03T23:59:59+02:00"),
+        )
+
+    def test_no_whole_day(self):
+        self.assertIsNone(
+            DateTimeHelper.get_utc_days_within("2020-01-01T00:00:00+02:00", "2020-01-01T23:59:59+02:00")
+        )
+
+
+class UtcDaysOverlappingTests(unittest.TestCase):
+    def test_partial_days_included(self):
+        self.assertEqual(
+            ("2019-12-31", "2020-01-03"),
+            DateTimeHelper.get_utc_days_overlapping("2020-01-01T00:00:00+02:00", "2020-01-03T23:59:59+02:00"),
+        )
+
+    def test_single_local_day(self):
+        self.assertEqual(
+            ("2019-12-31", "2020-01-01"),
+            DateTimeHelper.get_utc_days_overlapping("2020-01-01T00:00:00+02:00", "2020-01-01T23:59:59+02:00"),
+        )
+
+
+class DeletionPropagationMixin(FakeServerMixin):
+    def setUp(self):
+        super().setUp()
+        # inside of whole UTC day covered by last 2 days in any timezone
+        self.start = datetime.now(dateutil.tz.tzlocal()).replace(
+            hour=12, minute=0, second=0, microsecond=0
+        ) - timedelta(1)
+        self.start_utc = self.start.astimezone(dateutil.tz.UTC)
+
+        self.server.state.add_toggl_entry(1, self.start.isoformat(), 3600, "work {}".format(self.issues[0]))
+        self.server.state.add_toggl_entry(2, self.start.isoformat(), 3600, "moved {}".format(self.issues[1]))
+
+    def sync(self, propagate_deletions=True):
+        return super().sync(2, propagate_deletions=propagate_deletions)
+
+    def test_orphans_removed(self):
+        self.add_destination_entry(self.issues[0], 1)
+        self.add_destination_entry(self.issues[2], 2)
+        self.add_destination_entry(self.issues[0], 9)
+        self.add_destination_entry(self.issues[0], 8, user="someone else")
+
+        s = self.sync()
+
+        self.assertEqual(2, s.deleted)
+        self.assertEqual(1, s.inserted)
+        self.assertEqual([1, 2, 8], sorted(self.destination_toggl_ids()))
+
+    def test_disabled_by_default(self):
+        self.add_destination_entry(self.issues[0], 9)
+
+        s = self.sync(propagate_deletions=False)
+
+        self.assertEqual(0, s.deleted)
+        self.assertIn(9, self.destination_toggl_ids())
+
+    def test_nothing_removed_when_toggl_empty(self):
+        self.server.state.toggl_entries.clear()
+        self.add_destination_entry(self.issues[0], 9)
+
+        s = self.sync()
+
+        self.assertEqual(0, s.deleted)
+        self.assertIn(9, self.destination_toggl_ids())
+
+
+class RedmineDeletionPropagationTests(DeletionPropagationMixin, RedmineDestination, unittest.TestCase):
+    issues = ["#1", "#2", "#3"]
+
+    def add_destination_entry(self, issue, toggl_id, user="key"):
+        self.server.state.add_redmine_time_entry(
+            issue[1:], 1, self.start_utc.strftime("%Y-%m-%d"), "work [toggl#{}]".format(toggl_id), user
+        )
+
+    def destination_toggl_ids(self):
+        return [
+            RedmineTimeEntry.findToggleId(e["comments"])
+            for e in self.server.state.redmine_time_entries.values()
+        ]
+
+    def test_period_read_in_one_call(self):
+        self.add_destination_entry(self.issues[0], 1)
+        self.add_destination_entry(self.issues[1], 2)
+
+        self.sync()
+
+        # list of days of synchronized issues + list of period
+        self.assertEqual(2, self.server.count("redmine", "GET"))
+
+
+class RedminePartialDayDeletionTests(FakeServerMixin, RedmineDestination, unittest.TestCase):
+    """Local time ahead of UTC, so the period covers its first and last UTC days partially"""
+
+    def setUp(self):
+        self.tz = os.environ.get("TZ")
+        os.environ["TZ"] = "Etc/GMT-2"
+        time.tzset()
+
+        super().setUp()
+        # first UTC day of the period, 22:00 UTC is local midnight
+        self.first = datetime.strptime(
+            DateTimeHelper.get_utc_days_overlapping(
+                DateTimeHelper.get_date_in_past(1), DateTimeHelper.get_today_midnight()
+            )[0],
+            "%Y-%m-%d",
+        ).replace(tzinfo=dateutil.tz.UTC)
+
+    def tearDown(self):
+        super().tearDown()
+        if self.tz is None:
+            del os.environ["TZ"]
+        else:
+            os.environ["TZ"] = self.tz
+        time.tzset()
+
+    def add_redmine_entry(self, toggl_id):
+        self.server.state.add_redmine_time_entry(
+            1, 1, self.first.strftime("%Y-%m-%d"), "work [toggl#{}]".format(toggl_id), "key"
+        )
+
+    def test_entries_of_partial_day_checked_in_toggl(self):
+        # before the period
+        self.server.state.add_toggl_entry(50, (self.first + timedelta(hours=21)).isoformat(), 3600, "before #1")
+        # in the period
+        self.server.state.add_toggl_entry(52, (self.first + timedelta(hours=23)).isoformat(), 600, "in #1")
+        self.add_redmine_entry(50)
+        self.add_redmine_entry(51)
+        self.server.state.add_redmine_time_entry(
+            2, 1, self.first.strftime("%Y-%m-%d"), "in #1 [toggl#52]", "key"
+        )
+
+        s = self.sync(propagate_deletions=True)
+
+        # deleted one is removed, the one before the period is kept, moved one is replaced
+        self.assertEqual(2, s.deleted)
+        # period + whole UTC days overlapping it, not a call per entry
+        self.assertEqual(2, self.server.count("toggl"))
+        self.assertEqual(
+            [("1", 50), ("1", 52)],
+            sorted(
+                (str(e["issue"]["id"]), RedmineTimeEntry.findToggleId(e["comments"]))
+                for e in self.server.state.redmine_time_entries.values()
+            ),
+        )
+
+
+class JiraDeletionPropagationTests(DeletionPropagationMixin, JiraDestination, unittest.TestCase):
+    issues = ["SLUG-1", "SLUG-2", "SLUG-3"]
+
+    def add_destination_entry(self, issue, toggl_id, user="john"):
+        self.server.state.add_jira_worklog(
+            issue, 3600, self.start_utc.isoformat(), "work [toggl#{}]".format(toggl_id), user
+        )
+
+    def destination_toggl_ids(self):
+        return [
+            JiraTimeEntry.findToggleId(w["comment"])
+            for worklogs in self.server.state.jira_worklogs.values()
+            for w in worklogs
+        ]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import dateutil.tz
+
+from togglsync.config import Entry
+from togglsync.fake_server import FakeServer
+from togglsync.jira_wrapper import JiraHelper
+from togglsync.redmine_wrapper import RedmineHelper
+from togglsync.synchronizer import FanOutSynchronizer, Synchronizer
+from togglsync.toggl import TogglHelper
+
+
+class FanOutSynchronizerTests(unittest.TestCase):
+    config_entry = Entry.fromDict(
+        {
+            "label": "test",
+            "toggl_api_key": "key",
+            "destinations": [
+                {"label": "redmine", "task_patterns": ["(#)([0-9]{1,})"], "redmine_api_key": "key"},
+                {"label": "jira", "task_patterns": ["SLUG-[0-9]+"], "jira_username": "john"},
+            ],
+        }
+    )
+
+    def setUp(self):
+        self.server = FakeServer().start()
+        self.start = datetime.now(dateutil.tz.UTC) - timedelta(hours=2)
+
+        self.server.state.add_toggl_entry(1, self.start.isoformat(), 3600, "both #1 SLUG-1")
+        self.server.state.add_toggl_entry(2, self.start.isoformat(), 3600, "redmine only #2")
+        self.server.state.add_toggl_entry(3, self.start.isoformat(), 3600, "jira only SLUG-3")
+        self.server.state.add_toggl_entry(4, self.start.isoformat(), 3600, "none")
+
+    def tearDown(self):
+        self.server.stop()
+
+    def create_synchronizers(self):
+        redmine, jira = self.config_entry.destinations
+
+        return [
+            Synchronizer(
+                None,
+                RedmineHelper(self.server.urls["redmine"], "key", False),
+                TogglHelper(self.server.urls["toggl"], redmine),
+                None,
+                raise_errors=True,
+            ),
+            Synchronizer(
+                None,
+                JiraHelper(self.server.urls["jira"], "john", "pass", False),
+                TogglHelper(self.server.urls["toggl"], jira),
+                None,
+                raise_errors=True,
+            ),
+        ]
+
+    def test_single_toggl_download_for_all_destinations(self):
+        synchronizers = self.create_synchronizers()
+        self.server.reset_calls()
+
+        FanOutSynchronizer(
+            TogglHelper(self.server.urls["toggl"], self.config_entry), synchronizers
+        ).start(1)
+
+        self.assertEqual(1, self.server.count("toggl"))
+        self.assertEqual([2, 2], [s.inserted for s in synchronizers])
+
+        self.assertEqual(
+            ["1", "2"],
+            sorted(str(e["issue"]["id"]) for e in self.server.state.redmine_time_entries.values()),
+        )
+        self.assertEqual(["SLUG-1", "SLUG-3"], sorted(self.server.state.jira_worklogs))
+
+    def test_failing_destination_does_not_stop_others(self):
+        self.server.state.jira_issues = {"NONE-1"}
+        synchronizers = self.create_synchronizers()
+        for s in synchronizers:
+            s.raise_errors = False
+
+        FanOutSynchronizer(
+            TogglHelper(self.server.urls["toggl"], self.config_entry), synchronizers
+        ).start(1)
+
+        self.assertEqual([2, 0], [s.inserted for s in synchronizers])
+
+    def test_counters_of_destinations_reported(self):
+        self.server.state.add_redmine_time_entry(
+            1, 1, self.start.strftime("%Y-%m-%d"), "deleted in toggl [toggl#9]", "key"
+        )
+        synchronizers = self.create_synchronizers()
+        synchronizers[0].propagate_deletions = True
+        mattermost = Mock()
+
+        FanOutSynchronizer(
+            TogglHelper(self.server.urls["toggl"], self.config_entry), synchronizers, mattermost
+        ).start(1)
+
+        self.assertIn(
+            "test / redmine: **2** inserted, **0** updated, **0** skipped, **1** removed (deleted or moved in toggl)",
+            [c.args[0] for c in mattermost.append.call_args_list],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,12 @@
+import io
 import unittest
+from contextlib import redirect_stdout
 from unittest.mock import Mock, MagicMock
 
 from togglsync.config import Entry
 from togglsync.jira_wrapper import JiraTimeEntry, JiraHelper
 from togglsync.synchronizer import Synchronizer
+from togglsync.tests.fake_server_fixtures import DUPLICATES, N, CallBudgetMixin, JiraDestination
 from togglsync.toggl import TogglEntry, TogglHelper
 
 
@@ -377,6 +380,46 @@ class SynchronizerJiraTests(unittest.TestCase):
         sync = Synchronizer(None, helper, None, None)
         self.assertFalse(sync._equal(toggl, jira))
 
+    def test_equal_diff_printed_only_in_verbose(self):
+        toggl, jira = self.create_test_entries_pair()
+        toggl.seconds = 120
+        helper = JiraHelper(None, None, None, False)
+
+        out = io.StringIO()
+        with redirect_stdout(out):
+            Synchronizer(None, helper, None, None)._equal(toggl, jira)
+        self.assertEqual("", out.getvalue())
+
+        with redirect_stdout(out):
+            Synchronizer(None, helper, None, None, verbose=True)._equal(toggl, jira)
+        self.assertEqual('\tentries not equal, seconds: "120" vs "3600"\n', out.getvalue())
+
+
+class JiraCallBudgetTests(CallBudgetMixin, JiraDestination, unittest.TestCase):
+    issues = ["SLUG-1", "SLUG-2"]
+
+    budgets = {
+        "empty_day": {"toggl": 1, "jira": 0},
+        # one worklog list per issue
+        "up_to_date": {"toggl": 1, "jira": 2},
+        # list per issue + one create per entry
+        "new_entries": {"toggl": 1, "jira": 2 + N},
+        # list per issue + get, put and reload per entry
+        "changed_entries": {"toggl": 1, "jira": 2 + 3 * N},
+        # list + get and delete of extra copies (the kept one is up to date)
+        "duplicates": {"toggl": 1, "jira": 1 + 2 * DUPLICATES},
+        # list + get and delete of extra copies + get, put and reload of the kept one
+        "changed_duplicates": {"toggl": 1, "jira": 1 + 2 * DUPLICATES + 3},
+    }
+
+    def duplicate_destination_entries(self):
+        for issue_key, worklogs in self.server.state.jira_worklogs.items():
+            for w in list(worklogs):
+                for _ in range(DUPLICATES):
+                    self.server.state.add_jira_worklog(
+                        issue_key, w["timeSpentSeconds"], w["started"], w["comment"], "john"
+                    )
+
 
 if __name__ == "__main__":
     unittest.main()
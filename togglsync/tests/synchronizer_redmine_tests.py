@@ -4,6 +4,7 @@ from unittest.mock import Mock, MagicMock
 from togglsync.config import Entry
 from togglsync.redmine_wrapper import RedmineTimeEntry, RedmineHelper
 from togglsync.synchronizer import Synchronizer
+from togglsync.tests.fake_server_fixtures import DUPLICATES, N, CallBudgetMixin, RedmineDestination
 from togglsync.toggl import TogglEntry, TogglHelper
 
 
@@ -213,6 +214,106 @@ class SynchronizerRedmineTests(unittest.TestCase):
             comment="#987 hard work [toggl#17]",
         )
 
+    def test_sync_duplicates_best_match_kept(self):
+        redmine = RedmineHelper("url", None, False)
+        redmine.get = Mock()
+        redmine.put = Mock()
+        redmine.update = Mock()
+        redmine.delete = Mock()
+        toggl = TogglHelper("url", None)
+        toggl.get = Mock()
+
+        toggl.get.return_value = [
+            TogglEntry(
+                None,
+                3600,
+                "2016-01-01T01:01:01",
+                17,
+                "#987 hard work",
+                self.redmine_config,
+            )
+        ]
+
+        redmine.get.return_value = [
+            RedmineTimeEntry(
+                221,
+                "2016-05-01T04:02:22",
+                "john doe",
+                2,
+                "2016-01-01",
+                "987",
+                "#987 hard work [toggl#17]",
+            ),
+            RedmineTimeEntry(
+                222,
+                "2016-05-01T04:02:22",
+                "john doe",
+                1,
+                "2016-01-01",
+                "987",
+                "#987 hard work [toggl#17]",
+            ),
+            RedmineTimeEntry(
+                223,
+                "2016-05-01T04:02:22",
+                "john doe",
+                1,
+                "2016-01-01",
+                "987",
+                "#987 hard work [toggl#17]",
+            ),
+        ]
+
+        s = Synchronizer(MagicMock(), redmine, toggl, None, raise_errors=True)
+        s.start(1)
+
+        redmine.put.assert_not_called()
+        redmine.update.assert_not_called()
+        self.assertEqual(
+            [221, 223], sorted(c.kwargs["id"] for c in redmine.delete.call_args_list)
+        )
+        self.assertEqual(1, s.skipped)
+
+    def test_sync_duplicates_tie_keeps_lowest_id(self):
+        redmine = RedmineHelper("url", None, False)
+        redmine.get = Mock()
+        redmine.put = Mock()
+        redmine.update = Mock()
+        redmine.delete = Mock()
+        toggl = TogglHelper("url", None)
+        toggl.get = Mock()
+
+        toggl.get.return_value = [
+            TogglEntry(
+                None,
+                3600,
+                "2016-01-01T01:01:01",
+                17,
+                "#987 hard work",
+                self.redmine_config,
+            )
+        ]
+
+        redmine.get.return_value = [
+            RedmineTimeEntry(
+                id,
+                "2016-05-01T04:02:22",
+                "john doe",
+                1,
+                "2016-01-01",
+                "987",
+                "#987 hard work [toggl#17]",
+            )
+            for id in (1001, 223, 98)
+        ]
+
+        s = Synchronizer(MagicMock(), redmine, toggl, None, raise_errors=True)
+        s.start(1)
+
+        self.assertEqual(
+            [223, 1001], sorted(c.kwargs["id"] for c in redmine.delete.call_args_list)
+        )
+
     def test_ignore_negative_duration(self):
         """
         Synchronizer should ignore entries with negative durations (pending entries).
@@ -259,5 +360,30 @@ class SynchronizerRedmineTests(unittest.TestCase):
         )
 
 
+class RedmineCallBudgetTests(CallBudgetMixin, RedmineDestination, unittest.TestCase):
+    issues = ["#1", "#2"]
+
+    budgets = {
+        "empty_day": {"toggl": 1, "redmine": 0},
+        # one time entries list of the days (bulk read of all issues)
+        "up_to_date": {"toggl": 1, "redmine": 1},
+        # list + issue read of every issue with new entries + one create per entry
+        "new_entries": {"toggl": 1, "redmine": 1 + 2 + N},
+        # list + one update per entry
+        "changed_entries": {"toggl": 1, "redmine": 1 + N},
+        # list + delete of extra copies (the kept one is up to date)
+        "duplicates": {"toggl": 1, "redmine": 1 + DUPLICATES},
+        # list + delete of extra copies + update of the kept one
+        "changed_duplicates": {"toggl": 1, "redmine": 1 + DUPLICATES + 1},
+    }
+
+    def duplicate_destination_entries(self):
+        for e in list(self.server.state.redmine_time_entries.values()):
+            for _ in range(DUPLICATES):
+                self.server.state.add_redmine_time_entry(
+                    e["issue"]["id"], e["hours"], e["spent_on"], e["comments"], e["user"]["name"]
+                )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+from datetime import datetime, timedelta
+
+import dateutil.tz
+
+from togglsync.aggregation import Aggregation
+from togglsync.tests.fake_server_fixtures import FakeServerMixin, JiraDestination, RedmineDestination
+
+
+class TargetedSyncMixin(FakeServerMixin):
+    def setUp(self):
+        super().setUp()
+        start = datetime.now(dateutil.tz.UTC) - timedelta(hours=2)
+
+        for i, issue in enumerate(self.issues * 2):
+            self.server.state.add_toggl_entry(
+                100 + i, (start + timedelta(minutes=i)).isoformat(), 3600, "work {}".format(issue)
+            )
+
+    def test_single_entry(self):
+        s = self.synchronizer()
+
+        s.sync_entry(s.toggl.get_entry(101))
+
+        self.assertEqual(1, s.inserted)
+        self.assertEqual(1, self.server.count("toggl"))
+        # entries of the issue + insert
+        self.assertEqual(2, self.server.count(self.backend))
+        self.assertEqual(["[toggl#101]"], self.destination_markers())
+
+    def test_changed_entry_updated(self):
+        s = self.synchronizer()
+        s.sync_entry(s.toggl.get_entry(101))
+        self.server.state.toggl_entries[1]["description"] = "fixed {}".format(self.issues[1])
+
+        s = self.synchronizer()
+        s.sync_entry(s.toggl.get_entry(101))
+
+        self.assertEqual(1, s.updated)
+        self.assertEqual(0, s.inserted)
+
+    def test_entry_not_found(self):
+        s = self.synchronizer()
+
+        s.sync_entry(s.toggl.get_entry(999))
+
+        self.assertEqual(0, s.inserted)
+        self.assertEqual(0, self.server.count(self.backend))
+
+    def test_single_issue(self):
+        s = self.synchronizer()
+
+        s.sync_issue(self.issues[0], 1)
+
+        self.assertEqual(2, s.inserted)
+        self.assertEqual(1, self.server.count("toggl"))
+        # entries of the issue + inserts
+        self.assertEqual(1 + 2, self.server.count(self.backend))
+        self.assertEqual(["[toggl#100]", "[toggl#103]"], self.destination_markers())
+
+    def test_entry_with_aggregation_syncs_bucket(self):
+        s = self.synchronizer(aggregation=Aggregation("day"))
+
+        s.sync_entry(s.toggl.get_entry(100))
+
+        self.assertEqual(1, s.inserted)
+        self.assertEqual(1, len(self.destination_markers()))
+        self.assertIn("[toggl@", self.destination_markers()[0])
+
+
+class RedmineTargetedSyncTests(TargetedSyncMixin, RedmineDestination, unittest.TestCase):
+    issues = ["#1", "#2", "#3"]
+
+    def destination_markers(self):
+        return sorted(
+            e["comments"][e["comments"].index("[") :]
+            for e in self.server.state.redmine_time_entries.values()
+        )
+
+
+class JiraTargetedSyncTests(TargetedSyncMixin, JiraDestination, unittest.TestCase):
+    issues = ["SLUG-1", "SLUG-2", "SLUG-3"]
+
+    def destination_markers(self):
+        return sorted(
+            w["comment"][w["comment"].index("[") :]
+            for worklogs in self.server.state.jira_worklogs.values()
+            for w in worklogs
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from datetime import datetime, timedelta
+
+import dateutil.tz
+
+from togglsync.config import Entry
+from togglsync.fake_server import FakeServer
+from togglsync.helpers.date_time_helper import DateTimeHelper
+from togglsync.redmine_wrapper import RedmineHelper
+from togglsync.synchronizer import Synchronizer
+from togglsync.toggl import TogglReports, TogglTeamHelper
+
+
+class TeamModeTests(unittest.TestCase):
+    users = [11, 12, 13]
+
+    def setUp(self):
+        self.server = FakeServer(endpoints={"toggl.details": {"page_size": 10}}).start()
+        self.reports = TogglReports("admin", 123, self.server.urls["toggl_reports"], workers=3)
+
+        start = datetime.now(dateutil.tz.UTC) - timedelta(hours=3)
+        for i in range(45):
+            self.server.state.add_toggl_entry(
+                100 + i,
+                (start + timedelta(minutes=i)).isoformat(),
+                600,
+                "work #{}".format(i % 4 + 1),
+                uid=self.users[i % 3],
+                tags=["dev"],
+            )
+
+    def tearDown(self):
+        self.server.stop()
+
+    def toggl(self, uid):
+        return TogglTeamHelper(
+            self.reports,
+            Entry("user {}".format(uid), task_patterns=["(#)([0-9]{1,})"], toggl_user_id=uid),
+        )
+
+    def test_report_read_in_pages(self):
+        entries = list(self.toggl(11).get(1))
+
+        self.assertEqual(15, len(entries))
+        self.assertTrue(all(e.raw_entry["uid"] == 11 for e in entries))
+        self.assertEqual(600, entries[0].duration)
+        self.assertEqual(["dev"], entries[0].raw_entry["tags"])
+        self.assertEqual(5, self.server.count("toggl"))
+
+    def test_report_shared_by_members(self):
+        for uid in self.users:
+            toggl = self.toggl(uid)
+            redmine = RedmineHelper(self.server.urls["redmine"], "key{}".format(uid), False)
+            s = Synchronizer(None, redmine, toggl, None, raise_errors=True)
+            s.start(1)
+
+            self.assertEqual(15, s.inserted)
+
+        # one paginated report instead of download per member
+        self.assertEqual(5, self.server.count("toggl"))
+        users = [e["user"]["name"] for e in self.server.state.redmine_time_entries.values()]
+        self.assertEqual(15, users.count("key12"))
+
+    def test_shorter_period_taken_from_report(self):
+        start = DateTimeHelper.get_date_in_past(2)
+        end = DateTimeHelper.get_today_midnight()
+        self.reports.get_range(start, end)
+
+        entries = list(self.toggl(12).get_range(DateTimeHelper.get_date_in_past(1), end))
+
+        self.assertEqual(15, len(entries))
+        self.assertEqual(5, self.server.count("toggl"))
+
+    def test_single_entry(self):
+        entry = self.toggl(11).get_entry(103)
+
+        self.assertEqual(103, entry.id)
+        # report of the member only (15 entries)
+        self.assertEqual(2, self.server.count("toggl"))
+        self.assertIsNone(self.toggl(12).get_entry(103))
+
+    def test_single_entry_by_api_key_of_member(self):
+        toggl = TogglTeamHelper(
+            self.reports,
+            Entry("user 11", toggl_api_key="key", task_patterns=["(#)([0-9]{1,})"], toggl_user_id=11),
+            self.server.urls["toggl"],
+        )
+
+        self.assertEqual(103, toggl.get_entry(103).id)
+        self.assertEqual(1, self.server.count("toggl"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from togglsync.config import Entry
+from togglsync.toggl_export import TogglFileHelper
+
+CSV = """﻿Id,User,Email,Client,Project,Task,Description,Billable,Start date,Start time,End date,End time,Duration,Tags,Amount ()
+8,John,john@example.com,,Proj,,fixing #12,No,2020-01-31,09:00:00,2020-01-31,10:30:00,01:30:00,"a, b",
+7,John,john@example.com,,Proj,,no issue,No,2020-01-31,11:00:00,2020-01-31,11:10:00,00:10:00,,
+"""
+
+
+class TogglFileHelperTests(unittest.TestCase):
+    config_entry = Entry("test", task_patterns=["(#)([0-9]{1,})"])
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, content):
+        path = os.path.join(self.dir, name)
+        with open(path, "w", encoding="utf-8") as output:
+            output.write(content)
+        return path
+
+    def api_entries(self, count):
+        return [
+            {
+                "id": 1000 + i,
+                "start": "2020-01-{:02d}T10:00:00+00:00".format(1 + i % 28),
+                "duration": 60 * (i + 1),
+                "description": "work #{} {}".format(i % 3, "x" * (i % 50)),
+            }
+            for i in range(count)
+        ]
+
+    def test_csv(self):
+        helper = TogglFileHelper(self.write("export.csv", CSV), self.config_entry, processes=1)
+
+        entries = list(helper.get(0))
+
+        self.assertEqual(2, len(entries))
+        self.assertEqual("12", entries[0].taskId)
+        self.assertEqual(5400, entries[0].duration)
+        self.assertEqual(["a", "b"], entries[0].raw_entry["tags"])
+        self.assertIsNone(entries[1].taskId)
+        self.assertEqual([8, 7], [e.id for e in entries])
+
+    def test_csv_without_ids_rejected(self):
+        path = self.write(
+            "export.csv",
+            "User,Description,Start date,Start time,Duration\n"
+            "John,#1,2020-01-31,09:00:00,00:30:00\n",
+        )
+
+        with self.assertRaises(Exception):
+            list(TogglFileHelper(path, self.config_entry, processes=1).get(0))
+
+    def test_json_array_streamed(self):
+        data = self.api_entries(500)
+        path = self.write("export.json", json.dumps(data, indent=1))
+
+        helper = TogglFileHelper(path, self.config_entry, processes=1)
+        helper.json_read_size = 100
+
+        entries = list(helper.get(0))
+
+        self.assertEqual([d["id"] for d in data], [e.id for e in entries])
+        self.assertEqual("2", entries[2].taskId)
+
+    def test_json_detailed_report(self):
+        data = [
+            {"id": 1, "start": "2020-01-31T10:00:00+01:00", "dur": 3600000, "description": "#5", "pid": 9}
+        ]
+        report = {
+            "total_grand": 3600000,
+            "total_currencies": [{"currency": None, "amount": None}],
+            "per_page": 50,
+            "data": data,
+        }
+        path = self.write("report.json", json.dumps(report))
+
+        entries = list(TogglFileHelper(path, self.config_entry, processes=1).get(0))
+
+        self.assertEqual([(1, 3600, "5", "2020-01-31T09:00:00+00:00")], [(e.id, e.duration, e.taskId, e.start) for e in entries])
+
+    def test_json_lines(self):
+        data = self.api_entries(20)
+        path = self.write("export.jsonl", "\n".join(json.dumps(d) for d in data) + "\n")
+
+        helper = TogglFileHelper(path, self.config_entry, processes=1)
+        helper.json_read_size = 64
+
+        self.assertEqual([d["id"] for d in data], [e.id for e in helper.get(0)])
+
+    def test_parsed_in_process_pool(self):
+        data = self.api_entries(300)
+        path = self.write("export.json", json.dumps(data))
+
+        helper = TogglFileHelper(path, self.config_entry, processes=2)
+        helper.pool_threshold = 0
+        helper.chunk_size = 7
+
+        entries = list(helper.get(0))
+
+        self.assertEqual([d["id"] for d in data], [e.id for e in entries])
+        self.assertEqual([str(i % 3) for i in range(300)], [e.taskId for e in entries])
+
+    def test_get_range(self):
+        path = self.write("export.json", json.dumps(self.api_entries(28)))
+
+        entries = list(
+            TogglFileHelper(path, self.config_entry, processes=1).get_range(
+                "2020-01-10T00:00:00+00:00", "2020-01-11T23:59:59+00:00"
+            )
+        )
+
+        self.assertEqual([1009, 1010], [e.id for e in entries])
+
+    def test_parse_duration(self):
+        self.assertEqual(0, TogglFileHelper.parse_duration(""))
+        self.assertEqual(90061, TogglFileHelper.parse_duration("25:01:01"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,7 +4,7 @@ from unittest import mock
 import dateutil.parser
 import dateutil.tz
 
-from togglsync.config import Entry
+from togglsync.config import Entry, Routes
 from togglsync.toggl import TogglEntry
 
 
@@ -22,6 +22,58 @@ class TogglEntryTests(unittest.TestCase):
         self.assertEquals(2121, entry.id)
         self.assertEquals("2016-01-01T07:09:09+00:00", entry.start)
 
+    def test_forConfigEntry(self):
+        entry = TogglEntry(None, 3600, "2016-01-01T09:09:09+00:00", 1, "#12 SLUG-34", self.sample_config)
+
+        redmine_entry = entry.forConfigEntry(Entry("redmine", task_patterns=["(#)([0-9]{1,})"]))
+
+        self.assertEqual("SLUG-34", entry.taskId)
+        self.assertEqual("12", redmine_entry.taskId)
+        self.assertEqual(1, redmine_entry.id)
+        self.assertIsNone(entry.forConfigEntry(Entry("none", task_patterns=["XYZ-[0-9]+"])).taskId)
+
+    def routed(self, description, **raw):
+        config = Entry(
+            "test",
+            task_patterns=["(#)([0-9]{1,})"],
+            routes=Routes(
+                tags={"meeting": 100},
+                projects={123: 200, "Internal": 201},
+                project_defaults={777: 300},
+            ),
+        )
+        return TogglEntry(dict(raw), 3600, "2016-01-01T09:09:09+00:00", 1, description, config).taskId
+
+    def test_find_task_id_by_tag(self):
+        self.assertEqual("100", self.routed("#5 weekly", tags=["other", "meeting"], pid=123))
+
+    def test_find_task_id_by_project(self):
+        self.assertEqual("200", self.routed("#5 review", pid=123))
+        self.assertEqual("201", self.routed("", project="Internal"))
+
+    def test_find_task_id_by_pattern_before_project_default(self):
+        self.assertEqual("5", self.routed("#5 review", pid=777))
+        self.assertEqual("300", self.routed("review", pid=777))
+
+    def test_find_task_id_not_routed(self):
+        self.assertEqual("5", self.routed("#5 review", pid=1, tags=["other"]))
+        self.assertIsNone(self.routed("review", pid=1))
+
+    def test_find_task_id_routes_only(self):
+        config = Entry.fromDict({"label": "test", "routes": {"tags": {"meeting": 100}}})
+
+        self.assertEqual([], config.task_patterns)
+        self.assertEqual(
+            "100", TogglEntry({"tags": ["meeting"]}, 3600, "2016-01-01T09:09:09+00:00", 1, "weekly", config).taskId
+        )
+        self.assertIsNone(TogglEntry({}, 3600, "2016-01-01T09:09:09+00:00", 2, "review #5", config).taskId)
+
+    def test_find_task_id_routes_skip_patterns(self):
+        with mock.patch("togglsync.toggl.re.findall") as findall:
+            self.assertEqual("100", self.routed("#5 weekly", tags=["meeting"]))
+
+        findall.assert_not_called()
+
     def test_repr(self):
         entry = TogglEntry(
             None,
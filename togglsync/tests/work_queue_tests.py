@@ -0,0 +1,158 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+
+import dateutil.tz
+
+from togglsync.config import Entry
+from togglsync.fake_server import FakeServer
+from togglsync.redmine_wrapper import RedmineHelper
+from togglsync.synchronizer import Synchronizer
+from togglsync.toggl import TogglHelper
+from togglsync.work_queue import QueueWorker, WorkQueue
+
+
+class WorkQueueTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.queue = WorkQueue(os.path.join(self.dir, "queue.db"), lease=60, max_attempts=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_lease_and_ack(self):
+        self.queue.put("test", "1", [{"id": 1}])
+
+        unit = self.queue.lease("a")
+
+        self.assertEqual(("test", "1", [{"id": 1}]), (unit["label"], unit["issue"], unit["entries"]))
+        self.assertIsNone(self.queue.lease("b"))
+        self.assertTrue(self.queue.ack(unit["id"], "a"))
+        self.assertEqual({"done": 1}, self.queue.stats())
+        self.assertEqual(1, self.queue.purge())
+
+    def test_expired_lease_reclaimed(self):
+        self.queue.put("test", "1", [])
+        unit = self.queue.lease("dead")
+
+        reclaimed = self.queue.lease("b", now=time.time() + 61)
+
+        self.assertEqual(unit["id"], reclaimed["id"])
+        # late ack of the dead worker is refused
+        self.assertFalse(self.queue.ack(unit["id"], "dead"))
+        self.assertTrue(self.queue.ack(unit["id"], "b"))
+
+    def test_extended_lease_not_reclaimed(self):
+        self.queue.put("test", "1", [])
+        unit = self.queue.lease("a")
+
+        self.assertTrue(self.queue.extend(unit["id"], "a", now=time.time() + 50))
+
+        self.assertIsNone(self.queue.lease("b", now=time.time() + 61))
+
+    def test_released_retried_later(self):
+        self.queue.put("test", "1", [])
+
+        self.queue.release(self.queue.lease("a")["id"], "a")
+
+        self.assertIsNone(self.queue.lease("a"))
+        self.assertIsNotNone(self.queue.lease("b", now=time.time() + 61))
+
+    def test_failed_after_max_attempts(self):
+        self.queue.put("test", "1", [])
+        later = time.time() + 3600
+
+        self.queue.release(self.queue.lease("a")["id"], "a")
+        self.queue.release(self.queue.lease("a", now=later)["id"], "a")
+
+        self.assertIsNone(self.queue.lease("a", now=later * 2))
+        self.assertEqual({"failed": 1}, self.queue.stats())
+
+    def test_failed_after_max_expired_leases(self):
+        self.queue.put("test", "1", [])
+        later = time.time() + 3600
+
+        self.queue.lease("dead")
+        self.queue.lease("dead", now=later)
+
+        self.assertIsNone(self.queue.lease("a", now=later * 2))
+        self.assertEqual({"failed": 1}, self.queue.stats())
+
+    def test_put_again_requeues(self):
+        self.queue.put("test", "1", [{"id": 1}])
+        self.queue.ack(self.queue.lease("a")["id"], "a")
+
+        self.queue.put("test", "1", [{"id": 2}])
+
+        self.assertEqual([{"id": 2}], self.queue.lease("a")["entries"])
+
+    def test_lease_of_known_labels(self):
+        self.queue.put("other", "1", [])
+        self.queue.put("test", "1", [])
+
+        self.assertEqual("test", self.queue.lease("a", ["test"])["label"])
+        self.assertIsNone(self.queue.lease("a", ["test"]))
+        self.assertIsNone(self.queue.lease("a", []))
+
+
+class QueueWorkerTests(unittest.TestCase):
+    config_entry = Entry("test", toggl_api_key="key", task_patterns=["(#)([0-9]{1,})"])
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.queue = WorkQueue(os.path.join(self.dir, "queue.db"))
+        self.server = FakeServer().start()
+
+        start = datetime.now(dateutil.tz.UTC) - timedelta(hours=2)
+        for i in range(12):
+            self.server.state.add_toggl_entry(
+                100 + i, (start + timedelta(minutes=i)).isoformat(), 3600, "work #{}".format(i % 6 + 1)
+            )
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.dir)
+
+    def synchronizer(self):
+        toggl = TogglHelper(self.server.urls["toggl"], self.config_entry)
+        redmine = RedmineHelper(self.server.urls["redmine"], "key", False)
+        return Synchronizer(None, redmine, toggl, None)
+
+    def test_workers_share_queue(self):
+        self.assertEqual(6, self.synchronizer().enqueue(self.queue, 1))
+        self.assertEqual(1, self.server.count("toggl"))
+        self.server.reset_calls()
+
+        synchronizers = [self.synchronizer() for _ in range(2)]
+        workers = [QueueWorker(self.queue, {"test": s}, "worker{}".format(i)) for i, s in enumerate(synchronizers)]
+        threads = [threading.Thread(target=w.run, args=(2,)) for w in workers]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(6, sum(w.done for w in workers))
+        self.assertEqual(12, sum(s.inserted for s in synchronizers))
+        self.assertEqual(12, len(self.server.state.redmine_time_entries))
+        # workers don't download toggl
+        self.assertEqual(0, self.server.count("toggl"))
+        self.assertEqual({"done": 6}, self.queue.stats())
+
+    def test_failed_unit_released(self):
+        self.synchronizer().enqueue(self.queue, 1)
+        self.server.state.redmine_issues = {1, 2, 3, 4, 5}
+
+        worker = QueueWorker(self.queue, {"test": self.synchronizer()})
+        worker.run()
+
+        self.assertEqual(5, worker.done)
+        self.assertEqual(1, worker.failed)
+        self.assertEqual({"done": 5, "pending": 1}, self.queue.stats())
+
+
+if __name__ == "__main__":
+    unittest.main()
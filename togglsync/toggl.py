@@ -1,6 +1,9 @@
+import copy
 import datetime
 import re
+import threading
 from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
 
 import dateutil.parser
 import dateutil.tz
@@ -43,11 +46,42 @@ class TogglEntry:
     def secondsToHours(seconds):
         return round(seconds / 3600.0, 2)
 
+    def forConfigEntry(self, config_entry: Entry):
+        """Returns the same entry matched with task patterns of another config entry"""
+        entry = copy.copy(self)
+        entry.config_entry = config_entry
+        entry.taskId = entry.findTaskId()
+        return entry
+
+    @property
+    def marker(self):
+        """Decorator added to destination entry comment to track toggl entry"""
+        return "[toggl#{}]".format(self.id)
+
     def is_valid(self):
         return self.taskId is not None and self.duration > 0
 
     def findTaskId(self):
-        if not self.description or not self.config_entry:
+        """Issue id by routing tables of config entry (see Routes), then by task patterns"""
+        if not self.config_entry:
+            return None
+
+        routes = self.config_entry.routes if self.raw_entry else None
+
+        if routes is not None:
+            taskId = routes.find(self.raw_entry)
+            if taskId is not None:
+                return taskId
+
+        taskId = self.findTaskIdInDescription()
+
+        if taskId is None and routes is not None:
+            return routes.default(self.raw_entry)
+
+        return taskId
+
+    def findTaskIdInDescription(self):
+        if not self.description:
             return None
 
         for pattern in self.config_entry.task_patterns:
@@ -100,9 +134,34 @@ class TogglHelper:
         start = DateTimeHelper.get_date_in_past(days)
         end = DateTimeHelper.get_today_midnight()
 
+        return self.get_range(start, end)
+
+    def get_range(self, start, end):
         print("\tStart:\t{}".format(start))
         print("\tEnd:\t{}".format(end))
 
+        return self.__get(start, end)
+
+    def get_entry(self, id):
+        """Single time entry, None if not found"""
+        print("Downloading entry: toggl#{}".format(id))
+
+        auth = (self.togglApiKey, "api_token")
+
+        r = requests.get(self.url + "time_entries/{}".format(int(id)), auth=auth)
+
+        if r.status_code == 404:
+            return None
+        if r.status_code != 200:
+            raise Exception("Not expected status code: {}".format(r.status_code))
+
+        data = r.json()
+        if not data or not data.get("data"):
+            return None
+
+        return TogglEntry.createFromEntry(data["data"], self.config_entry)
+
+    def __get(self, start, end):
         auth = (self.togglApiKey, "api_token")
         params = {"start_date": start, "end_date": end}
 
@@ -126,6 +185,156 @@ class TogglHelper:
         return [e for e in entries if e.is_valid()]
 
 
+class TogglReports:
+    """
+    Detailed report of whole toggl workspace, read with admin token once for all team members
+    API: https://github.com/toggl/toggl_api_docs/blob/master/reports/detailed.md
+
+    First page tells number of pages, the rest is read in parallel (`workers`). Report of
+    every period is read only once per run (periods within it are taken from it), entries
+    are returned in time entry format (with "uid" of their user). Report of single user is
+    filtered on server and is not kept.
+    """
+
+    default_url = "https://api.track.toggl.com/reports/api/v2/"
+
+    def __init__(self, api_key, workspace_id, url=None, workers=4):
+        self.api_key = api_key
+        self.workspace_id = workspace_id
+        self.url = url or TogglReports.default_url
+        self.workers = workers
+
+        self.lock = threading.Lock()
+        self.reports = {}
+
+    @classmethod
+    def fromConfig(cls, team):
+        return cls(
+            team["toggl_api_key"], team["workspace_id"], team.get("url"), team.get("workers", 4)
+        )
+
+    def get_range(self, start, end, user_id=None):
+        """
+        Entries of all users (or of given user) started in period (taken from already read
+        longer period if any)
+        """
+        start_dt = dateutil.parser.parse(start)
+        end_dt = dateutil.parser.parse(end)
+
+        with self.lock:
+            for (cached_start, cached_end), entries in self.reports.items():
+                if cached_start <= start_dt and end_dt <= cached_end:
+                    return [
+                        e
+                        for e in entries
+                        if start_dt <= dateutil.parser.parse(e["start"]) <= end_dt
+                        and (user_id is None or str(e["uid"]) == str(user_id))
+                    ]
+
+            if user_id is not None:
+                return self.__download(start, end, user_id)
+
+            entries = self.__download(start, end)
+            self.reports[(start_dt, end_dt)] = entries
+            return entries
+
+    def __download(self, start, end, user_id=None):
+        first = self.__page(start, end, 1, user_id)
+        pages = -(-first["total_count"] // first["per_page"]) if first["per_page"] else 1
+
+        print("Downloading workspace report: {} entries, {} pages".format(first["total_count"], pages))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            rest = list(
+                executor.map(lambda page: self.__page(start, end, page, user_id), range(2, pages + 1))
+            )
+
+        start_dt = dateutil.parser.parse(start)
+        end_dt = dateutil.parser.parse(end)
+
+        # report is filtered by dates only
+        return [
+            TogglReports.normalize(row)
+            for page in [first] + rest
+            for row in page["data"]
+            if start_dt <= dateutil.parser.parse(row["start"]) <= end_dt
+        ]
+
+    def __page(self, start, end, page, user_id=None):
+        params = {
+            "workspace_id": self.workspace_id,
+            "since": start[:10],
+            "until": end[:10],
+            "page": page,
+            "user_agent": "TogglSync",
+        }
+        if user_id is not None:
+            params["user_ids"] = user_id
+
+        r = requests.get(self.url + "details", auth=(self.api_key, "api_token"), params=params)
+
+        if r.status_code != 200:
+            raise Exception("Not expected status code: {}".format(r.status_code))
+
+        return r.json()
+
+    @staticmethod
+    def normalize(row):
+        """Report row as time entry (duration in seconds)"""
+        return {
+            "id": row["id"],
+            "uid": row.get("uid"),
+            "pid": row.get("pid"),
+            "project": row.get("project"),
+            "tags": row.get("tags") or [],
+            "description": row.get("description") or "",
+            "start": row["start"],
+            "duration": int(row["dur"] // 1000),
+        }
+
+
+class TogglTeamHelper(TogglHelper):
+    """
+    Toggl entries of single team member (toggl_user_id of config entry) taken from workspace
+    report shared by all config entries (see TogglReports)
+    """
+
+    def __init__(self, reports: TogglReports, config_entry: Entry, url=None):
+        super().__init__(url, config_entry)
+        self.reports = reports
+
+    def get_range(self, start, end):
+        print("\tStart:\t{}".format(start))
+        print("\tEnd:\t{}".format(end))
+
+        for raw in self.reports.get_range(start, end):
+            if str(raw["uid"]) == str(self.config_entry.toggl_user_id):
+                yield TogglEntry.createFromEntry(raw, self.config_entry)
+
+    def get_entry(self, id):
+        """
+        Single entry of the member: by api key of the member if configured, otherwise from
+        report of the member's last 90 days (report has no call for single entry)
+        """
+        if self.url and self.togglApiKey:
+            return super().get_entry(id)
+
+        print(
+            "Downloading entry: toggl#{} (report of user {})".format(
+                id, self.config_entry.toggl_user_id
+            )
+        )
+
+        start = DateTimeHelper.get_date_in_past(90)
+        end = DateTimeHelper.get_today_midnight()
+
+        for raw in self.reports.get_range(start, end, self.config_entry.toggl_user_id):
+            if raw["id"] == int(id):
+                return TogglEntry.createFromEntry(raw, self.config_entry)
+
+        return None
+
+
 if __name__ == "__main__":
 
     parser = ArgumentParser(description="Gets toggl entries for last n days")
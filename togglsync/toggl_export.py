@@ -0,0 +1,260 @@
+import csv
+import json
+import os
+import re
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import dateutil.parser
+import dateutil.tz
+
+from togglsync.config import Config, Entry
+from togglsync.toggl import TogglEntry, TogglHelper
+
+
+def _parse_chunk(rows, config_entry):
+    """Parses chunk of export rows (runs in worker process)"""
+    return [TogglEntry.createFromEntry(TogglFileHelper.normalize(r), config_entry) for r in rows]
+
+
+class TogglFileHelper(TogglHelper):
+    """
+    Provides toggl entries read from toggl export file instead of toggl api:
+
+        - detailed report CSV export with entry ids (Id column)
+        - JSON: list of time entries (as returned by api), detailed report ({"data": [...]})
+          or json lines
+
+    File is read as a stream. Big files are parsed (and matched with task patterns) in
+    process pool, chunk by chunk, with bounded number of chunks in flight.
+    """
+
+    chunk_size = 2000
+    # files bigger than this are parsed in process pool
+    pool_threshold = 16 * 1024 * 1024
+
+    json_read_size = 64 * 1024
+
+    # keys of detailed report before "data" (scalars, flat objects and lists of flat objects)
+    report_prefix_pattern = re.compile(
+        r'\s*\{\s*(?:"[^"]*"\s*:\s*(?:null|true|false|-?[0-9.eE+]+|"[^"]*"|\{[^{}]*\}'
+        r'|\[(?:[^\[\]{}]|\{[^{}]*\})*\])\s*,\s*)*"data"\s*:\s*\['
+    )
+
+    def __init__(self, path, config_entry: Entry, processes=None):
+        super().__init__(None, config_entry)
+        self.path = path
+        self.processes = processes if processes is not None else (os.cpu_count() or 1)
+
+    def get(self, days):
+        """All entries in file (period is defined by the export)"""
+        print("Reading entries from file: {}".format(self.path))
+
+        return self.__entries()
+
+    def get_range(self, start, end):
+        print("Reading entries from file: {}".format(self.path))
+        print("\tStart:\t{}".format(start))
+        print("\tEnd:\t{}".format(end))
+
+        start = dateutil.parser.parse(start)
+        end = dateutil.parser.parse(end)
+
+        return (
+            e for e in self.__entries() if start <= dateutil.parser.parse(e.start) <= end
+        )
+
+    def get_entry(self, id):
+        print("Reading entry toggl#{} from file: {}".format(id, self.path))
+
+        for e in self.__entries():
+            if e.id == int(id):
+                return e
+
+        return None
+
+    def __entries(self):
+        rows = self.rows()
+
+        if self.processes > 1 and os.path.getsize(self.path) > self.pool_threshold:
+            return self.__parse_in_pool(rows)
+
+        return (
+            TogglEntry.createFromEntry(TogglFileHelper.normalize(r), self.config_entry)
+            for r in rows
+        )
+
+    def __parse_in_pool(self, rows):
+        with ProcessPoolExecutor(max_workers=self.processes) as executor:
+            pending = deque()
+
+            for chunk in TogglFileHelper.chunks(rows, self.chunk_size):
+                pending.append(executor.submit(_parse_chunk, chunk, self.config_entry))
+
+                # backpressure: reading waits for parsing
+                if len(pending) >= 2 * self.processes:
+                    yield from pending.popleft().result()
+
+            while pending:
+                yield from pending.popleft().result()
+
+    def rows(self):
+        """Raw rows of export file (csv rows or json objects)"""
+        if self.path.lower().endswith(".csv"):
+            return self.__csv_rows()
+
+        return self.__json_rows()
+
+    def __csv_rows(self):
+        # exports may start with BOM
+        with open(self.path, newline="", encoding="utf-8-sig") as input:
+            for row in csv.DictReader(input):
+                yield row
+
+    def __json_rows(self):
+        with open(self.path, encoding="utf-8-sig") as input:
+            buffer = input.read(self.json_read_size)
+            start = buffer.lstrip()[:1]
+
+            if start == "[":
+                yield from self.__json_array(input, buffer, buffer.index("[") + 1)
+                return
+
+            report = self.report_prefix_pattern.match(buffer)
+            if report:
+                yield from self.__json_array(input, buffer, report.end())
+                return
+
+            # json lines
+            for line in TogglFileHelper.__lines(input, buffer):
+                if line.strip():
+                    yield json.loads(line)
+
+    @staticmethod
+    def __lines(input, buffer):
+        rest = ""
+
+        while buffer:
+            lines = (rest + buffer).split("\n")
+            rest = lines.pop()
+            yield from lines
+            buffer = input.read(TogglFileHelper.json_read_size)
+
+        yield rest
+
+    @staticmethod
+    def __json_array(input, buffer, pos):
+        """Yields objects of json array starting at `pos` of buffer, reads more when needed"""
+        decoder = json.JSONDecoder()
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+
+            if pos >= len(buffer):
+                more = input.read(TogglFileHelper.json_read_size)
+                if not more:
+                    raise Exception("Unexpected end of json file")
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+
+            if buffer[pos] == "]":
+                return
+
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                more = input.read(TogglFileHelper.json_read_size)
+                if not more:
+                    raise
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+
+            yield item
+
+            pos = end
+            if pos > TogglFileHelper.json_read_size:
+                buffer, pos = buffer[pos:], 0
+
+    @staticmethod
+    def chunks(rows, size):
+        chunk = []
+
+        for r in rows:
+            chunk.append(r)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def normalize(row):
+        """Converts export row to toggl api time entry (dict)"""
+        if "Start date" in row:
+            return TogglFileHelper.normalize_csv(row)
+
+        entry = dict(row)
+
+        if "duration" not in entry and "dur" in entry:
+            # detailed report: duration in milliseconds
+            entry["duration"] = int(entry["dur"]) // 1000
+
+        return entry
+
+    @staticmethod
+    def normalize_csv(row):
+        start = dateutil.parser.parse("{} {}".format(row["Start date"], row["Start time"]))
+        if start.tzinfo is None:
+            # exports are in timezone of user profile
+            start = start.replace(tzinfo=dateutil.tz.tzlocal())
+
+        id = row.get("Id") or row.get("ID") or row.get("id")
+        if not id:
+            # destination entries are tracked by toggl id, made up ids would not match later runs
+            raise Exception(
+                "Export without entry ids (Id column) can't be synchronized, use JSON export: {} {}".format(
+                    row.get("Start date"), row.get("Description", "")
+                )
+            )
+
+        entry = {
+            "id": int(id),
+            "start": start.isoformat(),
+            "duration": TogglFileHelper.parse_duration(row.get("Duration")),
+            "description": row.get("Description", ""),
+            "tags": [t.strip() for t in row.get("Tags", "").split(",") if t.strip()],
+        }
+
+        if row.get("Project"):
+            entry["project"] = row["Project"]
+
+        return entry
+
+    @staticmethod
+    def parse_duration(value):
+        """ "HH:MM:SS" (hours may exceed 24) to seconds"""
+        if not value:
+            return 0
+
+        seconds = 0
+        for part in value.strip().split(":"):
+            seconds = seconds * 60 + int(part)
+
+        return seconds
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Reads toggl entries from export file")
+
+    parser.add_argument("-f", "--file", help="Toggl export (csv or json)", required=True)
+    parser.add_argument("-n", "--num", help="Config entry number", default=0, type=int)
+
+    args = parser.parse_args()
+
+    config = Config.fromFile()
+
+    for entry in TogglFileHelper(args.file, config.entries[args.num]).get(0):
+        print(str(entry))
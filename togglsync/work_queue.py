@@ -0,0 +1,213 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class WorkQueue:
+    """
+    Durable queue of synchronization units (config entry label x issue) in sqlite file
+
+    Producer puts units with toggl entries of the issue (so workers don't download toggl
+    again), any number of workers (processes, or nodes sharing the file) lease units, sync
+    them and ack them. Leased unit not acked in `lease` seconds (dead or stuck worker) is
+    leased again by another worker. Failed unit is leased again after `retry` seconds (times
+    number of attempts), unit failing `max_attempts` times is marked failed, so is unit whose
+    last allowed lease expired (eg. it kills its workers).
+    Putting a unit which is already queued replaces its entries and queues it again.
+    """
+
+    PENDING = "pending"
+    LEASED = "leased"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, path, lease=300, max_attempts=5, retry=60):
+        self.path = path
+        self.lease_seconds = lease
+        self.max_attempts = max_attempts
+        self.retry = retry
+
+        with self.__connect() as db:
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS units (
+                    id INTEGER PRIMARY KEY,
+                    label TEXT NOT NULL,
+                    issue TEXT NOT NULL,
+                    entries TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    worker TEXT,
+                    -- end of lease of leased unit, time of retry of released one
+                    available_at REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    UNIQUE (label, issue)
+                )
+                """
+            )
+
+    @contextmanager
+    def __connect(self):
+        # connection per operation, so queue can be shared by threads and processes
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        finally:
+            db.close()
+
+    def put(self, label, issue, entries):
+        """Queues unit with raw toggl entries (dicts accepted by TogglEntry.createFromEntry)"""
+        with self.__connect() as db:
+            db.execute(
+                """
+                INSERT INTO units (label, issue, entries, state) VALUES (?, ?, ?, ?)
+                ON CONFLICT (label, issue) DO UPDATE SET
+                    entries = excluded.entries, state = excluded.state,
+                    worker = NULL, available_at = NULL, attempts = 0
+                """,
+                (label, str(issue), json.dumps(entries), WorkQueue.PENDING),
+            )
+
+    def lease(self, worker, labels=None, now=None):
+        """
+        Leases next pending (or expired) unit of given config entry labels (or any), returns
+        dict (id, label, issue, entries) or None
+        """
+        now = now if now is not None else time.time()
+        labels = list(labels) if labels is not None else None
+
+        with self.__connect() as db:
+            db.execute(
+                "UPDATE units SET state = ?, worker = NULL WHERE state = ? AND available_at < ? AND attempts >= ?",
+                (WorkQueue.FAILED, WorkQueue.LEASED, now, self.max_attempts),
+            )
+
+            row = db.execute(
+                """
+                SELECT id, label, issue, entries FROM units
+                WHERE state IN (?, ?) AND (available_at IS NULL OR available_at < ?) {}
+                ORDER BY id LIMIT 1
+                """.format(
+                    "AND label IN ({})".format(", ".join("?" * len(labels)))
+                    if labels is not None
+                    else ""
+                ),
+                [WorkQueue.PENDING, WorkQueue.LEASED, now] + (labels or []),
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            db.execute(
+                "UPDATE units SET state = ?, worker = ?, available_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (WorkQueue.LEASED, worker, now + self.lease_seconds, row[0]),
+            )
+
+        return {"id": row[0], "label": row[1], "issue": row[2], "entries": json.loads(row[3])}
+
+    def extend(self, id, worker, now=None):
+        """Extends lease of unit still held by worker, returns False if lease was lost"""
+        now = now if now is not None else time.time()
+        return self.__update(
+            "available_at = ?", (now + self.lease_seconds,), id, worker
+        )
+
+    def ack(self, id, worker):
+        """Marks unit done, returns False if lease was lost (unit is synced again by someone else)"""
+        return self.__update("state = ?", (WorkQueue.DONE,), id, worker)
+
+    def release(self, id, worker, now=None):
+        """Returns failed unit to queue for later retry (or marks it failed after max attempts)"""
+        now = now if now is not None else time.time()
+        return self.__update(
+            "state = CASE WHEN attempts >= ? THEN ? ELSE ? END, worker = NULL, available_at = ? + ? * attempts",
+            (self.max_attempts, WorkQueue.FAILED, WorkQueue.PENDING, now, self.retry),
+            id,
+            worker,
+        )
+
+    def __update(self, assignment, params, id, worker):
+        with self.__connect() as db:
+            cursor = db.execute(
+                "UPDATE units SET {} WHERE id = ? AND state = ? AND worker = ?".format(assignment),
+                params + (id, WorkQueue.LEASED, worker),
+            )
+            return cursor.rowcount == 1
+
+    def stats(self):
+        """Number of units by state"""
+        with self.__connect() as db:
+            return dict(db.execute("SELECT state, COUNT(*) FROM units GROUP BY state").fetchall())
+
+    def purge(self):
+        """Removes done units, returns their number"""
+        with self.__connect() as db:
+            return db.execute("DELETE FROM units WHERE state = ?", (WorkQueue.DONE,)).rowcount
+
+
+class QueueWorker:
+    """
+    Leases units from queue and synchronizes them with synchronizer of their config entry
+    (`synchronizers` by label), until queue is empty. Lease is extended while unit is synced.
+    """
+
+    def __init__(self, queue, synchronizers, name=None):
+        self.queue = queue
+        self.synchronizers = synchronizers
+        self.name = name or "{}:{}".format(socket.gethostname(), os.getpid())
+        self.done = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+
+    def run(self, threads=1):
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            futures = [
+                executor.submit(self.__loop, "{}:{}".format(self.name, i)) for i in range(threads)
+            ]
+            for f in futures:
+                f.result()
+
+        print("Queue units done: {}, failed: {}".format(self.done, self.failed))
+
+    def __loop(self, worker):
+        while True:
+            # units of config entries unknown here are left to other workers
+            unit = self.queue.lease(worker, self.synchronizers.keys())
+            if unit is None:
+                return
+
+            synchronizer = self.synchronizers[unit["label"]]
+            stop = threading.Event()
+            heartbeat = threading.Thread(target=self.__heartbeat, args=(unit["id"], worker, stop))
+            heartbeat.start()
+
+            try:
+                succeeded = synchronizer.sync_unit(unit["issue"], unit["entries"])
+            except Exception as exc:
+                print("Unit {} of {} failed: {}".format(unit["issue"], unit["label"], exc))
+                succeeded = False
+            finally:
+                stop.set()
+                heartbeat.join()
+
+            with self.lock:
+                if succeeded and self.queue.ack(unit["id"], worker):
+                    self.done += 1
+                elif not succeeded:
+                    self.queue.release(unit["id"], worker)
+                    self.failed += 1
+
+    def __heartbeat(self, id, worker, stop):
+        while not stop.wait(self.queue.lease_seconds / 3.0):
+            if not self.queue.extend(id, worker):
+                return